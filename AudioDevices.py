@@ -0,0 +1,309 @@
+import hashlib
+import importlib.util
+from collections import Counter
+import logging
+import sys
+import time
+from threading import Event, Lock, Thread
+from typing import NamedTuple
+
+__all__ = ["AudioDevice", "DeviceChange", "AudioDeviceBackend", "PyAudioBackend", "FakeAudioBackend",
+           "Win32DeviceNotifier", "DeviceWatcher", "DeviceChangeDebouncer", "default_backend"]
+
+
+class AudioDevice(NamedTuple):
+    """An audio device. PortAudio indices change when devices come and go, so they are not part of it."""
+    name: str
+    host_api: int
+    max_input_channels: int
+    max_output_channels: int
+
+
+class DeviceChange(NamedTuple):
+    """Result of a device check."""
+    fingerprint: str
+    added: tuple
+    removed: tuple
+
+    @property
+    def changed(self):
+        return bool(self.added or self.removed)
+
+
+def fingerprint(devices):
+    """
+    :param devices: Iterable of AudioDevice.
+    :return: Hex digest identifying the set of devices, independent of their order.
+    """
+    digest = hashlib.sha1()
+    for device in sorted(devices):
+        digest.update(repr(tuple(device)).encode())
+    return digest.hexdigest()
+
+
+class AudioDeviceBackend:
+    """
+    Enumerates audio devices. generation changes whenever the device list may have changed,
+    enumerate() is only worth calling when it did.
+    """
+
+    @property
+    def generation(self) -> int:
+        raise NotImplementedError
+
+    def enumerate(self) -> list[AudioDevice]:
+        raise NotImplementedError
+
+    @property
+    def notifies(self) -> bool:
+        """True if generation follows system notifications, then checking often costs nothing."""
+        return True
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+
+class Win32DeviceNotifier:
+    """
+    Counts WM_DEVICECHANGE broadcasts with a hidden window in a background thread.
+    Windows sends them for every device node change, so an unchanged count means an unchanged device list.
+    """
+    __window_class = "AudioDevicesNotifier"
+
+    def __init__(self):
+        self.logger = logging.getLogger(__class__.__name__)
+        self.generation = 0
+        self.__thread = None
+        self.__hwnd = None
+        self.__ready = Event()
+
+    def start(self):
+        if self.__thread is not None:
+            return
+        self.__thread = Thread(target=self.__run, name="Win32DeviceNotifier", daemon=True)
+        self.__thread.start()
+        self.__ready.wait(5)
+
+    def stop(self):
+        if self.__hwnd is not None:
+            import win32con
+            import win32gui
+            win32gui.PostMessage(self.__hwnd, win32con.WM_CLOSE, 0, 0)
+        if self.__thread is not None:
+            self.__thread.join()
+            self.__thread = None
+
+    def __run(self):
+        import win32api
+        import win32con
+        import win32gui
+
+        def window_proc(hwnd, msg, wparam, lparam):
+            if msg == win32con.WM_DEVICECHANGE:
+                self.generation += 1
+                return True
+            if msg == win32con.WM_CLOSE:
+                win32gui.DestroyWindow(hwnd)
+                return 0
+            if msg == win32con.WM_DESTROY:
+                win32gui.PostQuitMessage(0)
+                return 0
+            return win32gui.DefWindowProc(hwnd, msg, wparam, lparam)
+
+        window_class = win32gui.WNDCLASS()
+        window_class.hInstance = win32api.GetModuleHandle(None)
+        window_class.lpszClassName = self.__window_class
+        window_class.lpfnWndProc = window_proc
+        try:
+            win32gui.RegisterClass(window_class)
+        except win32gui.error:
+            # Already registered by an earlier notifier
+            pass
+        self.__hwnd = win32gui.CreateWindow(self.__window_class, self.__window_class, 0, 0, 0, 0, 0, 0, 0,
+                                            window_class.hInstance, None)
+        self.__ready.set()
+        win32gui.PumpMessages()
+        self.__hwnd = None
+
+
+class PyAudioBackend(AudioDeviceBackend):
+    """
+    Enumerates with PortAudio. PortAudio only sees device changes when it is initialized again,
+    so enumerate() does that, but with a notifier it is only called after the system reported a change.
+    Without a notifier every check enumerates.
+    """
+
+    def __init__(self, notifier: Win32DeviceNotifier = None):
+        import pyaudio
+        self.__pyaudio = pyaudio
+        self.notifier = notifier
+        self.__polls = 0
+
+    @property
+    def notifies(self):
+        return self.notifier is not None
+
+    @property
+    def generation(self):
+        if self.notifier is None:
+            self.__polls += 1
+            return self.__polls
+        return self.notifier.generation
+
+    def enumerate(self):
+        p = self.__pyaudio.PyAudio()
+        try:
+            devices = []
+            for i in range(p.get_device_count()):
+                info = p.get_device_info_by_index(i)
+                devices.append(AudioDevice(info["name"], info["hostApi"], info["maxInputChannels"], info["maxOutputChannels"]))
+            return devices
+        finally:
+            p.terminate()
+
+    def start(self):
+        if self.notifier is not None:
+            self.notifier.start()
+
+    def stop(self):
+        if self.notifier is not None:
+            self.notifier.stop()
+
+
+class FakeAudioBackend(AudioDeviceBackend):
+    """Device list set by hand, for tests."""
+
+    def __init__(self, devices=()):
+        self.__devices = list(devices)
+        self.__generation = 0
+        self.__lock = Lock()
+        self.enumerations = 0
+
+    @property
+    def generation(self):
+        return self.__generation
+
+    def enumerate(self):
+        self.enumerations += 1
+        with self.__lock:
+            return list(self.__devices)
+
+    def add_device(self, device: AudioDevice):
+        with self.__lock:
+            self.__devices.append(device)
+            self.__generation += 1
+
+    def remove_device(self, device: AudioDevice):
+        with self.__lock:
+            self.__devices.remove(device)
+            self.__generation += 1
+
+
+class DeviceWatcher:
+    """Keeps the last device list and reports what changed. Checks without a new backend generation cost nothing."""
+
+    def __init__(self, backend: AudioDeviceBackend):
+        self.logger = logging.getLogger(__class__.__name__)
+        self.backend = backend
+        self.__generation = backend.generation
+        self.devices = backend.enumerate()
+        self.fingerprint = fingerprint(self.devices)
+
+    def check(self, force: bool = False):
+        """
+        :param force: Enumerate even if the backend generation did not change.
+        :return: DeviceChange with the fingerprint of the current list and the devices added and removed since the last check.
+        """
+        generation = self.backend.generation
+        if generation == self.__generation and not force:
+            return DeviceChange(self.fingerprint, (), ())
+        self.__generation = generation
+        devices = self.backend.enumerate()
+        new_fingerprint = fingerprint(devices)
+        if new_fingerprint == self.fingerprint:
+            return DeviceChange(self.fingerprint, (), ())
+        # Counters keep devices listed twice with the same name apart
+        old, new = Counter(self.devices), Counter(devices)
+        added = tuple((new - old).elements())
+        removed = tuple((old - new).elements())
+        self.devices = devices
+        self.fingerprint = new_fingerprint
+        return DeviceChange(new_fingerprint, added, removed)
+
+
+class DeviceChangeDebouncer:
+    """
+    Merges the device changes of a burst, like a USB interface bringing up several devices one after another.
+    A burst ends when no change came in for settle_time seconds. A device added and removed again within
+    a burst does not show up in the merged change.
+    """
+
+    def __init__(self, settle_time: float = 3.0):
+        """
+        :param settle_time: Seconds without changes that end a burst.
+        """
+        self.settle_time = settle_time
+        self.__added = Counter()
+        self.__removed = Counter()
+        self.__fingerprint = None
+        self.__last_change = None
+        self.__events = 0
+
+    @property
+    def pending(self):
+        return self.__last_change is not None
+
+    def add(self, change: DeviceChange, now: float = None):
+        """Add a change to the current burst."""
+        if not change.changed:
+            return
+        self.__last_change = time.monotonic() if now is None else now
+        self.__events += 1
+        for device in change.added:
+            if self.__removed[device]:
+                self.__removed[device] -= 1
+            else:
+                self.__added[device] += 1
+        for device in change.removed:
+            if self.__added[device]:
+                self.__added[device] -= 1
+            else:
+                self.__removed[device] += 1
+        self.__fingerprint = change.fingerprint
+
+    def due(self, now: float = None):
+        """True if a burst settled, the next poll() returns it."""
+        if self.__last_change is None:
+            return False
+        now = time.monotonic() if now is None else now
+        return now - self.__last_change >= self.settle_time
+
+    def poll(self, now: float = None):
+        """
+        :return: (merged DeviceChange, number of changes merged) once the burst settled, else None.
+        """
+        if not self.due(now):
+            return None
+        change = DeviceChange(self.__fingerprint, tuple((+self.__added).elements()), tuple((+self.__removed).elements()))
+        events = self.__events
+        self.__added.clear()
+        self.__removed.clear()
+        self.__last_change = None
+        self.__events = 0
+        return change, events
+
+
+def default_backend() -> AudioDeviceBackend:
+    """
+    :return: PyAudioBackend, with a Win32DeviceNotifier on Windows with pywin32 installed.
+    """
+    notifier = None
+    if sys.platform == "win32":
+        if importlib.util.find_spec("win32gui") is not None:
+            notifier = Win32DeviceNotifier()
+        else:
+            logging.getLogger(__name__).warning("pywin32 not installed, audio devices are enumerated on every check")
+    return PyAudioBackend(notifier)
@@ -0,0 +1,51 @@
+import logging
+import sys
+import threading
+
+__all__ = ["install_exception_hooks", "install_tk_exception_hook"]
+
+
+def install_exception_hooks(logger: logging.Logger = None):
+    """
+    Log exceptions that end the main thread or any other thread, and the ones Python can only report,
+    like exceptions in MIDI callbacks called from rtmidi threads.
+    Without a console (pythonw) they would otherwise be lost. KeyboardInterrupt is left to the default hook.
+    """
+    logger = logger if logger is not None else logging.getLogger("Unhandled")
+    previous_excepthook = sys.excepthook
+
+    def excepthook(exc_type, exc_value, exc_traceback):
+        if issubclass(exc_type, KeyboardInterrupt):
+            previous_excepthook(exc_type, exc_value, exc_traceback)
+            return
+        logger.error(f"Unhandled exception: {exc_value}", exc_info=(exc_type, exc_value, exc_traceback))
+
+    def thread_excepthook(args: threading.ExceptHookArgs):
+        if args.exc_type is SystemExit:
+            return
+        name = args.thread.name if args.thread is not None else "unknown"
+        logger.error(f"Unhandled exception in thread {name}: {args.exc_value}",
+                     exc_info=(args.exc_type, args.exc_value, args.exc_traceback))
+
+    def unraisablehook(unraisable):
+        logger.error(f"{unraisable.err_msg or 'Exception ignored in'}: {unraisable.object!r}",
+                     exc_info=(unraisable.exc_type, unraisable.exc_value, unraisable.exc_traceback))
+
+    sys.excepthook = excepthook
+    threading.excepthook = thread_excepthook
+    sys.unraisablehook = unraisablehook
+
+
+def install_tk_exception_hook(root, logger: logging.Logger = None):
+    """
+    Log exceptions in callbacks of a Tk root and its widgets. Tk prints them to stderr instead of raising,
+    which is gone without a console.
+
+    :param root: Tk or CTk root window.
+    """
+    logger = logger if logger is not None else logging.getLogger("Unhandled")
+
+    def report_callback_exception(exc_type, exc_value, exc_traceback):
+        logger.error(f"Exception in Tk callback: {exc_value}", exc_info=(exc_type, exc_value, exc_traceback))
+
+    root.report_callback_exception = report_callback_exception
@@ -0,0 +1,88 @@
+import logging
+import os
+import queue
+from collections import deque
+from itertools import islice
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from threading import Lock
+
+__all__ = ["RingBufferHandler", "LazyQueueHandler", "rotating_file_handler", "start_queue_logging"]
+
+
+class RingBufferHandler(logging.Handler):
+    """
+    Keeps the last capacity log records in memory, numbered by a sequence number.
+    Readers remember the last number they saw and pull only newer records with since().
+    Records are formatted by the reader, emit() only appends.
+    """
+
+    def __init__(self, capacity: int = 5000, level=logging.NOTSET):
+        """
+        :param capacity: Number of records kept, older ones are dropped.
+        """
+        super().__init__(level)
+        self.capacity = capacity
+        self.__records = deque(maxlen=capacity)
+        self.__sequence = 0
+        self.__lock = Lock()
+
+    @property
+    def sequence(self):
+        """Sequence number of the newest record, 0 before the first."""
+        return self.__sequence
+
+    def emit(self, record: logging.LogRecord):
+        with self.__lock:
+            self.__sequence += 1
+            self.__records.append((self.__sequence, record))
+
+    def since(self, sequence: int):
+        """
+        :param sequence: Sequence number of the last record seen, 0 for all.
+        :return: (sequence number of the newest record, list of newer records, number of newer records already dropped)
+        """
+        with self.__lock:
+            newest = self.__sequence
+            count = min(newest - sequence, len(self.__records))
+            # Walk from the newest end, only the new records are touched
+            records = [record for _, record in islice(reversed(self.__records), max(count, 0))][::-1]
+        return newest, records, max(0, newest - sequence - count)
+
+
+class LazyQueueHandler(QueueHandler):
+    """
+    Puts records on the queue as they are. The stock QueueHandler formats them in the logging thread so they
+    can be pickled, in one process the listener thread can do that.
+    """
+
+    def prepare(self, record: logging.LogRecord):
+        return record
+
+
+def rotating_file_handler(filename: str, max_bytes: int = 5 * 1024 * 1024, backup_count: int = 3):
+    """
+    :return: RotatingFileHandler that starts every run with a new file, the last run is kept as the first backup.
+    """
+    handler = RotatingFileHandler(filename, maxBytes=max_bytes, backupCount=backup_count, encoding="utf-8", delay=True)
+    if os.path.exists(filename) and os.path.getsize(filename) > 0:
+        handler.doRollover()
+    return handler
+
+
+def start_queue_logging(*handlers: logging.Handler, level=logging.INFO) -> QueueListener:
+    """
+    Replace the handlers of the root logger by a queue. The given handlers run on the thread of the returned
+    listener, so logging threads never wait for the disk or the console. Stop the listener to flush the queue.
+
+    :param handlers: Handlers to run on the listener thread, their levels are respected.
+    :param level: Level of the root logger.
+    """
+    root = logging.getLogger()
+    for handler in list(root.handlers):
+        root.removeHandler(handler)
+    log_queue = queue.SimpleQueue()
+    root.addHandler(LazyQueueHandler(log_queue))
+    root.setLevel(level)
+    listener = QueueListener(log_queue, *handlers, respect_handler_level=True)
+    listener.start()
+    return listener
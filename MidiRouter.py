@@ -0,0 +1,332 @@
+import json
+import logging
+import os
+from typing import NamedTuple, Sequence
+
+__all__ = ["RouteRule", "MidiTransform", "MidiRouter", "BoundRouter", "message_types"]
+
+# Message type names as used by mido, channel messages map to their status nibble
+message_types = {
+    "note_off": 0x80,
+    "note_on": 0x90,
+    "polytouch": 0xA0,
+    "control_change": 0xB0,
+    "program_change": 0xC0,
+    "aftertouch": 0xD0,
+    "pitchwheel": 0xE0,
+    "sysex": 0xF0,
+    "clock": 0xF8,
+    "start": 0xFA,
+    "continue": 0xFB,
+    "stop": 0xFC,
+}
+
+# The FANTOM selects scenes with bank select and program change, this is the routing it had built in
+default_config = {
+    "scene_banks": [10880, 10883],
+    "initial_scene": [10880, 0],
+    "rules": [
+        {
+            "source": "FANTOM-06",
+            "types": ["note_off", "note_on", "control_change"],
+            "channels": None,
+            "scope": {"banks": [10880, 10880], "programs": [0, 0]},
+            "destination": "FANTOM filterd",
+        }
+    ],
+}
+
+
+# Marks a note or controller a transform drops
+_drop = 255
+
+
+def velocity_curve(curve):
+    """
+    :param curve: "linear", "soft", "hard" or an exponent (below 1 is softer, above 1 harder).
+    :return: 128 entry table of output velocities, 0 stays 0.
+    :raises ValueError: If the curve is unknown.
+    """
+    exponents = {"linear": 1.0, "soft": 0.6, "hard": 1.6}
+    if isinstance(curve, str):
+        if curve not in exponents:
+            raise ValueError(f"Unknown velocity curve: {curve}")
+        curve = exponents[curve]
+    return bytes([0] + [max(1, min(127, round(127 * (velocity / 127) ** curve))) for velocity in range(1, 128)])
+
+
+def _is_int(value, high: int):
+    # bool is an int subclass, true in a config is a mistake and not 1
+    return isinstance(value, int) and not isinstance(value, bool) and 0 <= value <= high
+
+
+def _range(section: dict, key: str, high: int):
+    """
+    :return: (low, high) of a range of a rule scope or transform, None if it is not given.
+    :raises ValueError: If it is not a range of two ints within 0 and high.
+    """
+    if key not in section:
+        return None
+    value = section[key]
+    if not isinstance(value, (list, tuple)) or len(value) != 2 or not all(_is_int(v, high) for v in value) \
+            or not value[0] <= value[1]:
+        raise ValueError(f"MIDI {key} must be a range [low, high] between 0 and {high}: {value}")
+    return tuple(value)
+
+
+class MidiTransform:
+    """
+    Transform of the messages of one rule, compiled into 128 entry tables:
+    note -> transposed note (zone and range checked), velocity -> curved velocity,
+    controller -> remapped controller and value -> scaled value.
+    Works on raw bytes and writes into its own buffer, the result is valid until the next call.
+    """
+
+    def __init__(self, transpose: int = 0, velocity: str | float = "linear", zone: Sequence[int] = (0, 127),
+                 cc_map: dict = None, cc_scale: Sequence[int] = (0, 127), channel: int = None):
+        """
+        :param transpose: Semitones to shift notes, notes shifted out of range are dropped.
+        :param velocity: Velocity curve, see velocity_curve().
+        :param zone: Lowest and highest note played, notes outside are dropped. Split the keyboard with a rule per zone.
+        :param cc_map: Controller number -> new controller number, None drops the controller.
+        :param cc_scale: Range the controller values are scaled to.
+        :param channel: Send on this channel (0-15), None keeps the channel.
+        """
+        low, high = zone
+        self.notes = bytes([note + transpose if low <= note <= high and 0 <= note + transpose <= 127 else _drop
+                            for note in range(128)])
+        self.velocities = velocity_curve(velocity)
+        cc_map = cc_map or {}
+        self.controllers = bytes([_drop if cc_map.get(cc, cc) is None else cc_map.get(cc, cc) for cc in range(128)])
+        low, high = cc_scale
+        self.values = bytes([round(low + (high - low) * value / 127) for value in range(128)])
+        self.channel = channel
+        self.buffer = bytearray(3)
+        self.short_buffer = bytearray(2)
+
+    @classmethod
+    def from_dict(cls, transform: dict):
+        """
+        :raises ValueError: If the transform is invalid.
+        """
+        if not isinstance(transform, dict) or not isinstance(transform.get("transpose", 0), int) \
+                or not isinstance(transform.get("cc_map", {}), dict):
+            raise ValueError(f"Invalid MIDI transform: {transform}")
+        zone = _range(transform, "zone", 127) or (0, 127)
+        cc_scale = _range(transform, "cc_scale", 127) or (0, 127)
+        # JSON object keys are strings, the targets have to be numbers already
+        try:
+            cc_map = {int(cc): target for cc, target in transform.get("cc_map", {}).items()}
+        except (TypeError, ValueError):
+            raise ValueError(f"MIDI transform cc_map keys must be controller numbers: {transform['cc_map']}")
+        if not all(_is_int(cc, 127) and (target is None or _is_int(target, 127)) for cc, target in cc_map.items()):
+            raise ValueError("MIDI transform controllers must be between 0 and 127")
+        channel = transform.get("channel")
+        if channel is not None and not _is_int(channel, 15):
+            raise ValueError("MIDI transform channel must be between 0 and 15")
+        velocity = transform.get("velocity", "linear")
+        if isinstance(velocity, bool) or not isinstance(velocity, (str, int, float)):
+            raise ValueError(f"MIDI transform velocity must be a curve name or an exponent: {velocity}")
+        return cls(transform.get("transpose", 0), velocity, zone, cc_map, cc_scale, channel)
+
+    def __call__(self, msg: Sequence[int]):
+        """
+        :param msg: Raw message bytes.
+        :return: The transformed message or None if it is dropped.
+        """
+        status = msg[0]
+        kind = status & 0xF0
+        if kind >= 0xF0 or len(msg) > 3:
+            return msg
+        out = self.buffer
+        out[0] = status if self.channel is None else kind | self.channel
+        if kind == 0x90 or kind == 0x80 or kind == 0xA0:
+            note = self.notes[msg[1]]
+            if note == _drop:
+                return None
+            out[1] = note
+            out[2] = self.velocities[msg[2]] if kind == 0x90 else msg[2]
+            return out
+        if kind == 0xB0:
+            controller = self.controllers[msg[1]]
+            if controller == _drop:
+                return None
+            out[1] = controller
+            out[2] = self.values[msg[2]]
+            return out
+        if self.channel is None:
+            return msg
+        # Other channel messages only change the channel
+        if len(msg) == 2:
+            out = self.short_buffer
+            out[0] = kind | self.channel
+        out[1] = msg[1]
+        if len(msg) == 3:
+            out[2] = msg[2]
+        return out
+
+
+class RouteRule(NamedTuple):
+    """
+    Forward messages of the given types and channels from a source to a destination.
+    Ports are matched by substring. scope limits the rule to a range of banks and programs of the current scene.
+    transform changes the messages on the way, None passes them through.
+    """
+    source: str | None
+    types: tuple
+    channels: tuple | None
+    banks: tuple | None
+    programs: tuple | None
+    destination: str
+    transform: MidiTransform | None = None
+
+    @classmethod
+    def from_dict(cls, rule: dict):
+        """
+        :raises ValueError: If the rule is invalid.
+        """
+        if not isinstance(rule, dict) or not isinstance(rule.get("types"), list):
+            raise ValueError(f"MIDI rule must be an object with a list of types: {rule}")
+        try:
+            types = tuple(message_types[name] for name in rule["types"])
+        except (KeyError, TypeError) as e:
+            raise ValueError(f"Unknown message type in MIDI rule: {e}")
+        channels = rule.get("channels")
+        if channels is not None:
+            if not isinstance(channels, list) or not all(_is_int(channel, 15) for channel in channels):
+                raise ValueError("MIDI rule channels must be a list of channels between 0 and 15")
+            channels = tuple(channels)
+        scope = rule.get("scope") or {}
+        if not isinstance(scope, dict):
+            raise ValueError(f"MIDI rule scope must be an object: {scope}")
+        # Bank numbers are 14 bit (MSB << 7 | LSB), programs 7 bit
+        banks = _range(scope, "banks", 16383)
+        programs = _range(scope, "programs", 127)
+        if not isinstance(rule.get("destination"), str):
+            raise ValueError("MIDI rule without destination port name")
+        if not isinstance(rule.get("source"), (str, type(None))):
+            raise ValueError(f"MIDI rule source must be a port name: {rule['source']}")
+        transform = MidiTransform.from_dict(rule["transform"]) if rule.get("transform") else None
+        return cls(rule.get("source"), types, channels, banks, programs, rule["destination"], transform)
+
+    def matches_source(self, port_name: str):
+        return self.source is None or self.source in port_name
+
+    def in_scope(self, bank: int, program: int):
+        return (self.banks is None or self.banks[0] <= bank <= self.banks[1]) and \
+            (self.programs is None or self.programs[0] <= program <= self.programs[1])
+
+    def status_bytes(self):
+        for status in self.types:
+            if status >= 0xF0:
+                yield status
+            else:
+                for channel in (self.channels if self.channels is not None else range(16)):
+                    yield status | channel
+
+
+class BoundRouter:
+    """
+    The rules of one source port compiled into a table indexed by the raw status byte.
+    Each entry is a tuple of (destination, transform or None), the table is rebuilt when the scene changes.
+    """
+
+    def __init__(self, router: "MidiRouter", source: str):
+        self.logger = logging.getLogger(__class__.__name__)
+        self.source = source
+        self.rules = [rule for rule in router.rules if rule.matches_source(source)]
+        self.scene_banks = router.scene_banks
+        self.bank_msb = 0
+        self.bank_lsb = 0
+        self.bank, self.program = router.initial_scene
+        self.destinations = tuple(dict.fromkeys(rule.destination for rule in self.rules))
+        self.table = ()
+        self.compile()
+
+    def compile(self):
+        """Build the table for the current scene."""
+        entries = [[] for _ in range(256)]
+        for rule in self.rules:
+            if rule.in_scope(self.bank, self.program):
+                route = (rule.destination, rule.transform)
+                for status in rule.status_bytes():
+                    if route not in entries[status]:
+                        entries[status].append(route)
+        # Equal entries share one tuple
+        shared = {}
+        self.table = tuple(shared.setdefault(tuple(entry), tuple(entry)) for entry in entries)
+
+    def __track_scene(self, msg):
+        status = msg[0] & 0xF0
+        if status == 0xB0:
+            if msg[1] == 0:  # Bank Select MSB
+                self.bank_msb = msg[2]
+            elif msg[1] == 32:  # Bank Select LSB
+                self.bank_lsb = msg[2]
+        else:
+            bank = (self.bank_msb << 7) + self.bank_lsb
+            if self.scene_banks[0] <= bank <= self.scene_banks[1]:
+                self.bank, self.program = bank, msg[1]
+                self.compile()
+                self.logger.info(f"Current Scene: bank {self.bank} program {self.program + 1}")
+            else:
+                self.logger.debug(f"Programm Change: bank {bank} program {msg[1] + 1}")
+
+    def route(self, msg: Sequence[int]):
+        """
+        :param msg: Raw message bytes.
+        :return: tuple of (destination, transform or None) for the message, do not modify it.
+        """
+        status = msg[0]
+        # Bank select and program change are the only messages that change the table
+        if status >= 0xB0 and status < 0xD0 and (status >= 0xC0 or msg[1] == 0 or msg[1] == 32):
+            self.__track_scene(msg)
+        return self.table[status]
+
+
+class MidiRouter:
+    """Routing rules loaded from config. bind() compiles them for one source port."""
+
+    def __init__(self, rules: list[RouteRule], scene_banks=(0, 16383), initial_scene=(0, 0)):
+        self.rules = list(rules)
+        self.scene_banks = tuple(scene_banks)
+        self.initial_scene = tuple(initial_scene)
+
+    @classmethod
+    def from_config(cls, config: dict):
+        """
+        :raises ValueError: If the config or a rule is invalid.
+        """
+        if not isinstance(config, dict) or not isinstance(config.get("rules", []), list):
+            raise ValueError("MIDI router config must be an object with a list of rules")
+        rules = [RouteRule.from_dict(rule) for rule in config.get("rules", [])]
+        scene_banks = _range(config, "scene_banks", 16383) or (0, 16383)
+        initial_scene = config.get("initial_scene", (0, 0))
+        if not isinstance(initial_scene, (list, tuple)) or len(initial_scene) != 2 \
+                or not _is_int(initial_scene[0], 16383) or not _is_int(initial_scene[1], 127):
+            raise ValueError(f"MIDI initial_scene must be [bank, program], bank up to 16383, program up to 127: {initial_scene}")
+        return cls(rules, scene_banks, initial_scene)
+
+    @classmethod
+    def load(cls, config_file: str = "midirouter.json"):
+        """
+        Load the rules from a JSON file. A missing file is created with the default rules.
+        """
+        logger = logging.getLogger(cls.__name__)
+        if not os.path.exists(config_file):
+            with open(config_file, "w") as file:
+                json.dump(default_config, file, indent=4)
+            return cls.from_config(default_config)
+        try:
+            with open(config_file, "r") as file:
+                return cls.from_config(json.load(file))
+        except (OSError, ValueError) as e:
+            logger.error(f"Invalid MIDI router config {config_file}, using the default rules: {e}")
+            return cls.from_config(default_config)
+
+    def bind(self, source: str):
+        return BoundRouter(self, source)
+
+    @property
+    def destinations(self):
+        return tuple(dict.fromkeys(rule.destination for rule in self.rules))
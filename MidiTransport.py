@@ -0,0 +1,351 @@
+import logging
+import queue
+import time
+from threading import Lock, Thread
+from typing import Callable, NamedTuple, Sequence
+import mido
+try:
+    import rtmidi
+except ImportError:
+    rtmidi = None
+
+__all__ = ["MidiTransport", "MidoTransport", "RtMidiTransport", "LoopbackTransport", "MidiInputPort", "MidiOutputPort",
+           "QueuedOutputPort", "QueueStats"]
+
+# Raw MIDI messages are passed around as sequences of ints (list, bytes, bytearray or memoryview)
+RawCallback = Callable[[Sequence[int]], None]
+
+
+class MidiInputPort:
+    """Open input port of a transport. Incoming messages are passed to the callback as raw bytes."""
+    closed = False
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def close(self):
+        self.closed = True
+
+
+class MidiOutputPort:
+    """Open output port of a transport."""
+    closed = False
+
+    def __init__(self, name: str):
+        self.name = name
+
+    def send(self, data: Sequence[int]):
+        """
+        Send one complete MIDI message.
+
+        :param data: Raw message bytes including status byte (and F0/F7 for sysex).
+        """
+        raise NotImplementedError
+
+    def close(self):
+        self.closed = True
+
+
+class QueueStats(NamedTuple):
+    """Counters of a QueuedOutputPort, latencies in seconds from send() until the port sent the message."""
+    sent: int
+    dropped: int
+    queued: int
+    average_latency: float
+    max_latency: float
+
+
+class QueuedOutputPort(MidiOutputPort):
+    """
+    Sends through another port from its own writer thread, so a slow or stalled port does not block the caller.
+    The queue is bounded, messages that do not fit are dropped and counted.
+    """
+
+    def __init__(self, port: MidiOutputPort, maxsize: int = 1024):
+        """
+        :param port: The port to send through, it is closed with this port.
+        :param maxsize: Number of messages that may wait.
+        """
+        super().__init__(port.name)
+        self.logger = logging.getLogger(__class__.__name__)
+        self.port = port
+        self.__queue = queue.Queue(maxsize)
+        self.__lock = Lock()
+        self.__sent = 0
+        self.__dropped = 0
+        self.__latency_total = 0.0
+        self.__latency_max = 0.0
+        # Set by close() when the port stalled, the writer then drops what is left instead of sending it
+        self.__abandoned = False
+        self.__thread = Thread(target=self.__write, name=f"MidiWriter {port.name}", daemon=True)
+        self.__thread.start()
+
+    def send(self, data: Sequence[int]):
+        if self.closed:
+            raise OSError(f"Output port {self.name} is closed")
+        try:
+            # Callers may reuse their buffers, queue a copy
+            self.__queue.put_nowait((time.perf_counter(), bytes(data)))
+        except queue.Full:
+            with self.__lock:
+                self.__dropped += 1
+
+    def __write(self):
+        while True:
+            queued_at, data = self.__queue.get()
+            try:
+                if data is None:
+                    return
+                if self.__abandoned:
+                    with self.__lock:
+                        self.__dropped += 1
+                    continue
+                try:
+                    self.port.send(data)
+                except Exception as e:
+                    self.logger.error(f"Error sending to {self.name}: {e}")
+                    continue
+                latency = time.perf_counter() - queued_at
+                with self.__lock:
+                    self.__sent += 1
+                    self.__latency_total += latency
+                    if latency > self.__latency_max:
+                        self.__latency_max = latency
+            finally:
+                self.__queue.task_done()
+
+    def flush(self):
+        """Wait until the queued messages are sent."""
+        self.__queue.join()
+
+    def stats(self, reset: bool = False) -> QueueStats:
+        """
+        :param reset: Start the counters over.
+        """
+        with self.__lock:
+            stats = QueueStats(self.__sent, self.__dropped, self.__queue.qsize(),
+                               self.__latency_total / self.__sent if self.__sent else 0.0, self.__latency_max)
+            if reset:
+                self.__sent = 0
+                self.__dropped = 0
+                self.__latency_total = 0.0
+                self.__latency_max = 0.0
+        return stats
+
+    def close(self, timeout: float = 1.0):
+        """
+        Send what is queued and close the port. A stalled port is given up after timeout seconds.
+        """
+        if self.closed:
+            return
+        self.closed = True
+        deadline = time.monotonic() + timeout
+        try:
+            self.__queue.put((0.0, None), timeout=timeout)
+            self.__thread.join(max(0.0, deadline - time.monotonic()))
+        except queue.Full:
+            pass
+        if self.__thread.is_alive():
+            # Do not send the rest to a closed port
+            self.__abandoned = True
+            self.logger.warning(f"{self.name} stalled, dropping {self.__queue.qsize()} queued messages")
+        self.port.close()
+
+
+class MidiTransport:
+    """Interface to open MIDI ports. Ports only deal with raw bytes."""
+
+    def get_input_names(self) -> list[str]:
+        raise NotImplementedError
+
+    def get_output_names(self) -> list[str]:
+        raise NotImplementedError
+
+    def open_input(self, name: str, callback: RawCallback) -> MidiInputPort:
+        raise NotImplementedError
+
+    def open_output(self, name: str) -> MidiOutputPort:
+        raise NotImplementedError
+
+
+class _MidoInputPort(MidiInputPort):
+    def __init__(self, name: str, callback: RawCallback):
+        super().__init__(name)
+        self.__port = mido.open_input(name, callback=lambda msg: callback(msg.bytes()))
+
+    @property
+    def closed(self):
+        return self.__port.closed
+
+    def close(self):
+        self.__port.close()
+
+
+class _MidoOutputPort(MidiOutputPort):
+    def __init__(self, name: str):
+        super().__init__(name)
+        self.__port = mido.open_output(name)
+
+    @property
+    def closed(self):
+        return self.__port.closed
+
+    def send(self, data: Sequence[int]):
+        self.__port.send(mido.Message.from_bytes(data))
+
+    def close(self):
+        self.__port.close()
+
+
+class MidoTransport(MidiTransport):
+    """Transport through mido ports. Every message is converted to and from mido.Message objects."""
+
+    def get_input_names(self):
+        return mido.get_input_names()
+
+    def get_output_names(self):
+        return mido.get_output_names()
+
+    def open_input(self, name, callback):
+        return _MidoInputPort(name, callback)
+
+    def open_output(self, name):
+        return _MidoOutputPort(name)
+
+
+class _RtMidiInputPort(MidiInputPort):
+    def __init__(self, name: str, callback: RawCallback):
+        super().__init__(name)
+        self.__midi_in = rtmidi.MidiIn()
+        ports = self.__midi_in.get_ports()
+        if name not in ports:
+            raise OSError(f"Unknown MIDI input port: {name}")
+        # mido passes sysex through, do the same
+        self.__midi_in.ignore_types(sysex=False, timing=True, active_sense=True)
+        self.__midi_in.open_port(ports.index(name))
+        # rtmidi calls back with ((message, delta time), data)
+        self.__midi_in.set_callback(lambda event, data=None: callback(event[0]))
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.__midi_in.cancel_callback()
+            self.__midi_in.close_port()
+
+
+class _RtMidiOutputPort(MidiOutputPort):
+    def __init__(self, name: str):
+        super().__init__(name)
+        self.__midi_out = rtmidi.MidiOut()
+        ports = self.__midi_out.get_ports()
+        if name not in ports:
+            raise OSError(f"Unknown MIDI output port: {name}")
+        self.__midi_out.open_port(ports.index(name))
+        self.__lock = Lock()
+
+    def send(self, data: Sequence[int]):
+        with self.__lock:
+            self.__midi_out.send_message(data)
+
+    def close(self):
+        if not self.closed:
+            self.closed = True
+            self.__midi_out.close_port()
+
+
+class RtMidiTransport(MidiTransport):
+    """Transport directly on python-rtmidi. Raw bytes are passed through without building mido.Message objects."""
+
+    def __init__(self):
+        if rtmidi is None:
+            raise ImportError("python-rtmidi is required for RtMidiTransport")
+
+    def get_input_names(self):
+        return rtmidi.MidiIn().get_ports()
+
+    def get_output_names(self):
+        return rtmidi.MidiOut().get_ports()
+
+    def open_input(self, name, callback):
+        return _RtMidiInputPort(name, callback)
+
+    def open_output(self, name):
+        return _RtMidiOutputPort(name)
+
+
+class _LoopbackInputPort(MidiInputPort):
+    def __init__(self, name: str, callback: RawCallback, transport: "LoopbackTransport"):
+        super().__init__(name)
+        self.callback = callback
+        self.__transport = transport
+
+    def close(self):
+        self.closed = True
+        self.__transport._remove_input(self)
+
+
+class _LoopbackOutputPort(MidiOutputPort):
+    def __init__(self, name: str, transport: "LoopbackTransport"):
+        super().__init__(name)
+        self.__transport = transport
+        self.sent = []
+
+    def send(self, data: Sequence[int]):
+        if self.closed:
+            raise OSError(f"Output port {self.name} is closed")
+        # Callers may reuse their buffers, keep a copy
+        data = bytes(data)
+        self.sent.append(data)
+        self.__transport.inject(self.name, data)
+
+
+class LoopbackTransport(MidiTransport):
+    """
+    In-memory transport for tests.
+    Everything sent to an output is recorded in its sent list and delivered to the inputs of the same name, like a loopMIDI port.
+    inject() simulates a message sent by a device.
+    """
+
+    def __init__(self, port_names: Sequence[str] = ()):
+        self.port_names = list(port_names)
+        self.__inputs = {}
+        self.outputs = {}
+        self.__lock = Lock()
+
+    def get_input_names(self):
+        return list(self.port_names)
+
+    def get_output_names(self):
+        return list(self.port_names)
+
+    def open_input(self, name, callback):
+        if name not in self.port_names:
+            raise OSError(f"Unknown MIDI input port: {name}")
+        port = _LoopbackInputPort(name, callback, self)
+        with self.__lock:
+            self.__inputs.setdefault(name, []).append(port)
+        return port
+
+    def open_output(self, name):
+        if name not in self.port_names:
+            raise OSError(f"Unknown MIDI output port: {name}")
+        port = _LoopbackOutputPort(name, self)
+        self.outputs[name] = port
+        return port
+
+    def inject(self, name: str, data: Sequence[int]):
+        """
+        Deliver a message to all open inputs of the given port.
+
+        :param name: Port name.
+        :param data: Raw message bytes.
+        """
+        with self.__lock:
+            ports = list(self.__inputs.get(name, ()))
+        for port in ports:
+            port.callback(data)
+
+    def _remove_input(self, port: _LoopbackInputPort):
+        with self.__lock:
+            if port in self.__inputs.get(port.name, ()):
+                self.__inputs[port.name].remove(port)
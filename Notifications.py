@@ -0,0 +1,123 @@
+import logging
+import time
+from collections import OrderedDict
+
+__all__ = ["NotificationBackend", "ToastBackend", "NullNotificationBackend", "FakeNotificationBackend",
+           "NotificationCoalescer", "default_backend"]
+
+
+class NotificationBackend:
+    """Shows a notification. show() may block until it is gone, it is called from a worker thread."""
+
+    def show(self, title: str, message: str):
+        raise NotImplementedError
+
+
+class ToastBackend(NotificationBackend):
+    """Windows toast notifications."""
+
+    def __init__(self, duration: str = "short"):
+        from win11toast import toast
+        self.__toast = toast
+        self.duration = duration
+
+    def show(self, title, message):
+        self.__toast(title, message, duration=self.duration)
+
+
+class NullNotificationBackend(NotificationBackend):
+    """Only logs the notifications."""
+
+    def __init__(self):
+        self.logger = logging.getLogger(__class__.__name__)
+
+    def show(self, title, message):
+        self.logger.info(f"Notification: {title} - {message}")
+
+
+class FakeNotificationBackend(NotificationBackend):
+    """Records the notifications in shown, for tests."""
+
+    def __init__(self):
+        self.shown = []
+
+    def show(self, title, message):
+        self.shown.append((title, message))
+
+
+class NotificationCoalescer:
+    """
+    Merges equal notifications and limits how often they are shown.
+    A notification waits window seconds, equal ones coming in meanwhile are merged into it and counted.
+    At most one notification is released every min_interval seconds, merging continues while it waits.
+    """
+
+    def __init__(self, window: float = 1.0, min_interval: float = 2.0, max_pending: int = 10):
+        """
+        :param window: Seconds a notification waits for equal ones.
+        :param min_interval: Seconds between two notifications.
+        :param max_pending: Notifications waiting at most, the oldest is dropped when another one comes in.
+        """
+        self.window = window
+        self.min_interval = min_interval
+        self.max_pending = max_pending
+        self.__pending = OrderedDict()
+        self.__next_release = 0.0
+        self.merged = 0
+        self.dropped = 0
+        self.released = 0
+
+    @property
+    def pending(self):
+        return len(self.__pending)
+
+    def add(self, title: str, message: str, now: float = None):
+        now = time.monotonic() if now is None else now
+        key = (title, message)
+        entry = self.__pending.get(key)
+        if entry is not None:
+            entry[0] += 1
+            self.merged += 1
+            return
+        if len(self.__pending) >= self.max_pending:
+            self.__pending.popitem(last=False)
+            self.dropped += 1
+        self.__pending[key] = [1, now]
+
+    def __due(self, now):
+        # The oldest notification comes first, the rate limit holds back all of them
+        _, (_, first_seen) = next(iter(self.__pending.items()))
+        return max(first_seen + self.window, self.__next_release) - now
+
+    def next_due(self, now: float = None):
+        """
+        :return: Seconds until poll() releases a notification, None if none is waiting.
+        """
+        if not self.__pending:
+            return None
+        return max(0.0, self.__due(time.monotonic() if now is None else now))
+
+    def poll(self, now: float = None):
+        """
+        :return: (title, message) of the notification to show now or None. Merged notifications carry their count.
+        """
+        now = time.monotonic() if now is None else now
+        if not self.__pending or self.__due(now) > 0:
+            return None
+        (title, message), (count, _) = self.__pending.popitem(last=False)
+        self.__next_release = now + self.min_interval
+        self.released += 1
+        if count > 1:
+            message = f"{message} ({count}x)"
+        return title, message
+
+
+def default_backend() -> NotificationBackend:
+    """
+    :return: ToastBackend, NullNotificationBackend if win11toast is not installed.
+    """
+    try:
+        return ToastBackend()
+    except ImportError:
+        logging.getLogger(__name__).warning("win11toast not installed, notifications are only logged")
+        return NullNotificationBackend()
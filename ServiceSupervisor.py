@@ -0,0 +1,184 @@
+import asyncio
+import logging
+import time
+from threading import Thread
+
+__all__ = ["Service", "ServiceUnhealthy", "ServiceSupervisor"]
+
+
+class ServiceUnhealthy(Exception):
+    """Raised by a service that has to be restarted."""
+
+
+class Service:
+    """
+    A managed part of the application. start() and stop() may block, they run in a worker thread.
+    The default serve() calls tick() every interval seconds and restarts the service when healthy() returns False.
+    """
+    name = "Service"
+    interval = 1.0
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+    def healthy(self) -> bool:
+        return True
+
+    async def tick(self):
+        pass
+
+    async def serve(self):
+        """Run until cancelled. Raising restarts the service after a backoff."""
+        while True:
+            await asyncio.sleep(self.interval)
+            await self.tick()
+            if not self.healthy():
+                raise ServiceUnhealthy(f"{self.name} is not healthy")
+
+
+class _Entry:
+    def __init__(self, service: Service, restart: bool, backoff_initial: float, backoff_max: float):
+        self.service = service
+        self.restart = restart
+        self.backoff_initial = backoff_initial
+        self.backoff_max = backoff_max
+        self.task = None
+        self.restarts = 0
+        self.started = False
+
+
+class ServiceSupervisor:
+    """
+    Runs services on one asyncio loop in a background thread.
+    A failing service is stopped and started again with exponential backoff, the backoff starts over
+    once the service ran for backoff_max seconds. stop() shuts the services down in reverse order.
+    """
+
+    def __init__(self):
+        self.logger = logging.getLogger(__class__.__name__)
+        self.loop = None
+        self.__thread = None
+        self.__entries = []
+
+    def add(self, service: Service, restart: bool = True, backoff_initial: float = 1.0, backoff_max: float = 60.0):
+        """
+        Add a service, it is started with the supervisor or right away if the supervisor runs.
+
+        :param service: The service.
+        :param restart: Restart the service when it fails.
+        :param backoff_initial: Seconds to wait before the first restart.
+        :param backoff_max: Upper limit of the wait between restarts.
+        """
+        entry = _Entry(service, restart, backoff_initial, backoff_max)
+        self.__entries.append(entry)
+        if self.loop is not None:
+            self.loop.call_soon_threadsafe(self.__spawn, entry)
+        return service
+
+    def __spawn(self, entry: _Entry):
+        entry.task = self.loop.create_task(self.__supervise(entry), name=entry.service.name)
+
+    async def __supervise(self, entry: _Entry):
+        service = entry.service
+        backoff = entry.backoff_initial
+        while True:
+            started_at = time.monotonic()
+            try:
+                starting = asyncio.ensure_future(asyncio.to_thread(service.start))
+                try:
+                    await asyncio.shield(starting)
+                except asyncio.CancelledError:
+                    # A cancel does not stop start in its thread, stop the service once it is up
+                    starting.add_done_callback(lambda future: self.__stop_late(service, future))
+                    raise
+                entry.started = True
+                self.logger.info(f"{service.name} started")
+                await service.serve()
+                self.logger.info(f"{service.name} finished")
+                return
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.logger.error(f"{service.name} failed: {e}", exc_info=not isinstance(e, (ServiceUnhealthy, OSError)))
+            finally:
+                if entry.started:
+                    entry.started = False
+                    try:
+                        await asyncio.shield(asyncio.to_thread(service.stop))
+                    except Exception as e:
+                        self.logger.error(f"{service.name} failed to stop: {e}", exc_info=True)
+            if not entry.restart:
+                return
+            if time.monotonic() - started_at > entry.backoff_max:
+                backoff = entry.backoff_initial
+            entry.restarts += 1
+            self.logger.info(f"Restarting {service.name} in {backoff:.1f}s (restart #{entry.restarts})")
+            await asyncio.sleep(backoff)
+            backoff = min(backoff * 2, entry.backoff_max)
+
+    def __stop_late(self, service: Service, future: asyncio.Future):
+        if future.cancelled() or future.exception() is not None:
+            return
+        self.logger.info(f"{service.name} finished starting after it was cancelled, stopping it")
+        try:
+            self.loop.run_in_executor(None, service.stop)
+        except RuntimeError:
+            # The executor is already shut down, only happens while stopping
+            service.stop()
+
+    def start(self):
+        """Start the loop thread and all services."""
+        if self.__thread is not None:
+            return
+        self.loop = asyncio.new_event_loop()
+        self.loop.set_exception_handler(self.__loop_exception)
+        for entry in self.__entries:
+            self.loop.call_soon(self.__spawn, entry)
+        self.__thread = Thread(target=self.loop.run_forever, name="ServiceSupervisor", daemon=True)
+        self.__thread.start()
+
+    def __loop_exception(self, loop, context):
+        # Failures of tasks the services create themselves, the services are supervised in __supervise
+        self.logger.error(f"Unhandled exception in the service loop: {context.get('message')}", exc_info=context.get("exception"))
+
+    async def __shutdown(self, timeout):
+        for entry in reversed(self.__entries):
+            if entry.task is None or entry.task.done():
+                continue
+            entry.task.cancel()
+            try:
+                await asyncio.wait_for(entry.task, timeout)
+            except (asyncio.CancelledError, asyncio.TimeoutError):
+                pass
+            except Exception as e:
+                self.logger.error(f"{entry.service.name} failed while stopping: {e}", exc_info=True)
+            self.logger.info(f"{entry.service.name} stopped")
+        # Join the worker threads of start, stop and the ticks
+        await asyncio.get_running_loop().shutdown_default_executor()
+
+    def stop(self, timeout: float = 5.0):
+        """
+        Stop all services in reverse order, then the loop.
+
+        :param timeout: Seconds to wait for each service.
+        """
+        if self.__thread is None:
+            return
+        future = asyncio.run_coroutine_threadsafe(self.__shutdown(timeout), self.loop)
+        try:
+            future.result()
+        finally:
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.__thread.join()
+            self.loop.close()
+            self.__thread = None
+            self.loop = None
+
+    def status(self):
+        """
+        :return: dict service name -> (running, restarts)
+        """
+        return {entry.service.name: (entry.started, entry.restarts) for entry in self.__entries}
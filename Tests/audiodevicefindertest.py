@@ -20,4 +20,20 @@ avg_init = sum([t[0] for t in time_list]) / len(time_list)
 avg_count = sum([t[1] for t in time_list]) / len(time_list)
 avg_term = sum([t[2] for t in time_list]) / len(time_list)
 print(f"Max Init: {max_init}, Max Count: {max_count}, Max Term: {max_term}")
-print(f"Avg Init: {avg_init}, Avg Count: {avg_count}, Avg Term: {avg_term}")
\ No newline at end of file
+print(f"Avg Init: {avg_init}, Avg Count: {avg_count}, Avg Term: {avg_term}")
+
+# The device watcher only enumerates when the system reported a change
+import os
+import sys
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+import AudioDevices
+backend = AudioDevices.default_backend()
+backend.start()
+watcher = AudioDevices.DeviceWatcher(backend)
+check_times = []
+for i in range(50):
+    start_time = time.time()
+    watcher.check()
+    check_times.append(time.time() - start_time)
+backend.stop()
+print(f"Watcher check: Max {max(check_times)}, Avg {sum(check_times) / len(check_times)}")
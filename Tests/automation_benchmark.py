@@ -0,0 +1,35 @@
+import os
+import sys
+import time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from XTouchVMautomation import AutomationKind, AutomationLane, AutomationPlayer
+
+# 8 lanes with a move every 10ms, played at 100 ticks per second.
+# The sink builds the same Voicemeeter script the App sends, but does not send it.
+rate = 100
+seconds = 5
+lanes = []
+for channel in range(8):
+    lane = AutomationLane(channel)
+    for i in range(rate * seconds):
+        lane.record(AutomationKind.GAIN, -60 + (i % 68), at=i / rate)
+    lanes.append(lane)
+
+moves_sent = 0
+def sink(moves):
+    global moves_sent
+    moves_sent += len(moves)
+    ";".join(f"Strip[{channel}].Gain={value}" for channel, kind, value in moves)
+
+player = AutomationPlayer(sink, rate=rate)
+player.play(lanes)
+start_time = time.perf_counter()
+process_start = time.process_time()
+while player.playing:
+    time.sleep(0.05)
+wall = time.perf_counter() - start_time
+cpu = time.process_time() - process_start
+
+print(f"{moves_sent}/{8 * rate * seconds} moves in {player.ticks} ticks, {wall:.2f}s wall for {seconds}s of automation")
+print(f"longest tick {player.max_step_time * 1000:.3f}ms of {1000 / rate:.0f}ms budget, {player.late_ticks} late ticks")
+print(f"CPU {cpu / wall * 100:.1f}% of one core")
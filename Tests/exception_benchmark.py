@@ -0,0 +1,54 @@
+import functools
+import logging
+import timeit
+
+# Call overhead of the metaclass audiomanager used to wrap every method of its handlers,
+# against plain methods with the exceptions logged at the thread and service boundaries.
+def log_exceptions(logger):
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            try:
+                return func(*args, **kwargs)
+            except Exception as e:
+                logger.error(f"Exception in {func.__name__}: {e}", exc_info=True)
+                raise
+        return wrapper
+    return decorator
+
+class ExceptionLoggingMeta(type):
+    def __new__(cls, name, bases, dct):
+        logger = logging.getLogger(name)
+        for attr, value in dct.items():
+            if callable(value):
+                dct[attr] = log_exceptions(logger)(value)
+        return super().__new__(cls, name, bases, dct)
+
+class Handler:
+    def __init__(self):
+        self.running = True
+        self.count = 0
+
+    def is_running(self):
+        return self.running
+
+    def on_message(self, msg):
+        self.count += 1
+
+class WrappedHandler(Handler, metaclass=ExceptionLoggingMeta):
+    # The same methods, wrapped by the metaclass
+    def is_running(self):
+        return self.running
+
+    def on_message(self, msg):
+        self.count += 1
+
+if __name__ == "__main__":
+    msg = bytes([0x90, 60, 100])
+    number = 1000000
+    for name, handler in (("wrapped by the metaclass", WrappedHandler()), ("plain", Handler())):
+        results = []
+        for statement in ("handler.is_running()", "handler.on_message(msg)"):
+            best = min(timeit.repeat(statement, globals={"handler": handler, "msg": msg}, number=number, repeat=5))
+            results.append(f"{statement} {best * 1e9 / number:.0f}ns")
+        print(f"{name}: {', '.join(results)}")
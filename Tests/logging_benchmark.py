@@ -0,0 +1,66 @@
+import logging
+import os
+import sys
+import tempfile
+import time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from LogBuffer import RingBufferHandler, rotating_file_handler, start_queue_logging
+from MidiRouter import MidiRouter, default_config
+
+# Latency of a MIDI input callback that logs every message at DEBUG, with the handlers called in the
+# callback thread and behind the queue listener. The console is os.devnull, a real console is slower.
+log_format = '[%(asctime)s][%(levelname)s][%(name)s] %(message)s'
+messages = [bytes([0x90, 36 + i % 48, 1 + i % 127]) for i in range(20000)]
+
+def make_handlers(directory):
+    log_file = rotating_file_handler(os.path.join(directory, "logfile.log"))
+    console = logging.StreamHandler(open(os.devnull, "w"))
+    log_buffer = RingBufferHandler()
+    for handler in (log_file, console, log_buffer):
+        handler.setFormatter(logging.Formatter(log_format))
+    return log_file, console, log_buffer
+
+def measure(name):
+    logger = logging.getLogger("FANTOM-08 MIDI Handler")
+    route = MidiRouter.from_config(default_config).bind("FANTOM-06").route
+    route(bytes([0xB0, 0, 85]))
+    route(bytes([0xB0, 32, 0]))
+    route(bytes([0xC0, 0]))
+    def callback(msg):
+        logger.debug("MIDI message %s", msg)
+        for destination, transform in route(msg):
+            pass
+    times = []
+    for msg in messages:
+        start_time = time.perf_counter()
+        callback(msg)
+        times.append(time.perf_counter() - start_time)
+    times.sort()
+    mean = sum(times) / len(times)
+    print(f"{name}: mean {mean * 1e6:.1f}us, p99 {times[len(times) * 99 // 100] * 1e6:.1f}us, max {times[-1] * 1e6:.0f}us")
+
+if __name__ == "__main__":
+    root = logging.getLogger()
+    with tempfile.TemporaryDirectory() as directory:
+        handlers = make_handlers(directory)
+        root.setLevel(logging.DEBUG)
+        for handler in handlers:
+            root.addHandler(handler)
+        measure("handlers in the callback thread")
+        for handler in handlers:
+            root.removeHandler(handler)
+            handler.close()
+
+    with tempfile.TemporaryDirectory() as directory:
+        handlers = make_handlers(directory)
+        listener = start_queue_logging(*handlers, level=logging.DEBUG)
+        start_time = time.perf_counter()
+        measure("queue listener")
+        listener.stop()
+        print(f"  queue written out after {time.perf_counter() - start_time:.2f}s, "
+              f"{handlers[2].sequence} records in the log window buffer")
+        for handler in handlers:
+            handler.close()
+
+    root.setLevel(logging.INFO)
+    measure("DEBUG disabled")
@@ -0,0 +1,149 @@
+import os
+import sys
+import time
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from MidiRouter import MidiRouter, default_config
+from MidiTransport import LoopbackTransport, MidiOutputPort, QueuedOutputPort
+
+# One second of a synthetic 10k msg/s stream of notes and CCs, pushed through the per message decision.
+# A handler gets raw messages and returns nothing. Sending goes to a loopback port, or to a counting
+# null port to see the decision alone.
+rate = 10000
+stream = []
+for i in range(rate):
+    channel = i % 4
+    if i % 3 == 0:
+        stream.append(bytes([0xB0 | channel, 1 + i % 8, i % 128]))
+    elif i % 3 == 1:
+        stream.append(bytes([0x90 | channel, 36 + i % 48, 1 + i % 127]))
+    else:
+        stream.append(bytes([0x80 | channel, 36 + (i - 1) % 48, 0]))
+# Select the routed scene first
+stream = [bytes([0xB0, 0, 85]), bytes([0xB0, 32, 0]), bytes([0xC0, 0])] + stream
+
+class NullPort:
+    def __init__(self):
+        self.sent = []
+    def send(self, msg):
+        self.sent.append(None)
+
+class StalledPort(MidiOutputPort):
+    # A loopMIDI port that takes 10ms per message
+    def __init__(self):
+        super().__init__("stalled")
+        self.sent = []
+    def send(self, msg):
+        time.sleep(0.01)
+        self.sent.append(None)
+
+def run(name, make_handler, runs=5, loopback=True, queued=False):
+    if loopback:
+        outport = LoopbackTransport(["FANTOM filterd"]).open_output("FANTOM filterd")
+    else:
+        outport = NullPort()
+        name += " (decision only)"
+    sent = outport.sent
+    if queued:
+        # Time in the input callback, the writer thread sends
+        outport = QueuedOutputPort(outport, maxsize=len(stream))
+        name += " (queued)"
+    handler = make_handler(outport)
+    best = None
+    for _ in range(runs):
+        if queued:
+            outport.flush()
+            outport.stats(reset=True)
+        sent.clear()
+        start_time = time.perf_counter()
+        for msg in stream:
+            handler(msg)
+        taken = time.perf_counter() - start_time
+        best = taken if best is None else min(best, taken)
+    if queued:
+        outport.flush()
+        stats = outport.stats()
+        name += f", latency avg {stats.average_latency * 1000:.2f}ms max {stats.max_latency * 1000:.2f}ms"
+        outport.close()
+    print(f"{name}: {best * 1e6 / len(stream):.2f}us per message, {len(sent)} forwarded, "
+          f"{best * 100:.1f}% of one core at {rate} msg/s")
+
+def run_stalled():
+    # The split rules to two destinations, one of them stalled
+    config = dict(transform_config, rules=[transform_config["rules"][0], dict(transform_config["rules"][1], destination="stalled")])
+    route = MidiRouter.from_config(config).bind("FANTOM-06").route
+    outports = {"FANTOM filterd": QueuedOutputPort(LoopbackTransport(["FANTOM filterd"]).open_output("FANTOM filterd")),
+                "stalled": QueuedOutputPort(StalledPort(), maxsize=256)}
+    longest = 0
+    for msg in stream:
+        start_time = time.perf_counter()
+        for destination, transform in route(msg):
+            msg_out = transform(msg) if transform is not None else msg
+            if msg_out is not None:
+                outports[destination].send(msg_out)
+        longest = max(longest, time.perf_counter() - start_time)
+    outports["FANTOM filterd"].flush()
+    for destination, outport in outports.items():
+        stats = outport.stats()
+        print(f"{destination}: {stats.sent} sent, {stats.dropped} dropped, {stats.queued} queued")
+        outport.close(timeout=0.1)
+    print(f"longest input callback with a stalled destination: {longest * 1e6:.1f}us")
+
+def float_program_handler(outport):
+    # The decision as FantomMidiHandler made it before the router
+    state = {"msb": 0, "lsb": 0, "program": 10880.001}
+    whitelisted_programs = [10880.001]
+    whitelisted_types = [0x80, 0x90, 0xB0]
+    def handler(msg):
+        status = msg[0] & 0xF0
+        if status == 0xB0:
+            if msg[1] == 0:
+                state["msb"] = msg[2]
+            elif msg[1] == 32:
+                state["lsb"] = msg[2]
+        elif status == 0xC0:
+            programm = (state["msb"] << 7) + state["lsb"] + (msg[1] + 1) / 1000.0
+            if 10880.001 <= programm <= 10883.128:
+                state["program"] = programm
+        if status in whitelisted_types and state["program"] in whitelisted_programs:
+            outport.send(msg)
+    return handler
+
+def router_handler(outport):
+    route = MidiRouter.from_config(default_config).bind("FANTOM-06").route
+    outports = {"FANTOM filterd": outport}
+    def handler(msg):
+        for destination, transform in route(msg):
+            outports[destination].send(msg)
+    return handler
+
+# The default rule split at middle C: the lower zone an octave down with a soft curve,
+# the upper zone with the mod wheel moved to expression and scaled to half range
+transform_config = {
+    "scene_banks": default_config["scene_banks"],
+    "initial_scene": default_config["initial_scene"],
+    "rules": [
+        dict(default_config["rules"][0], transform={"transpose": -12, "zone": [0, 59], "velocity": "soft"}),
+        dict(default_config["rules"][0], transform={"zone": [60, 127], "cc_map": {"1": 11}, "cc_scale": [0, 64]}),
+    ],
+}
+
+def transform_handler(outport):
+    route = MidiRouter.from_config(transform_config).bind("FANTOM-06").route
+    outports = {"FANTOM filterd": outport}
+    def handler(msg):
+        for destination, transform in route(msg):
+            if transform is not None:
+                msg_out = transform(msg)
+                if msg_out is not None:
+                    outports[destination].send(msg_out)
+            else:
+                outports[destination].send(msg)
+    return handler
+
+if __name__ == "__main__":
+    for loopback in (True, False):
+        run("float program whitelist", float_program_handler, loopback=loopback)
+        run("compiled router", router_handler, loopback=loopback)
+        run("compiled router with zone split and transforms", transform_handler, loopback=loopback)
+    run("compiled router", router_handler, queued=True)
+    run_stalled()
@@ -0,0 +1,43 @@
+import os
+import sys
+import time
+import tracemalloc
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from XTouchSysex import SysexTemplates
+
+# Full display (112 characters) plus color update, old list building against the preallocated templates
+text = "".join(chr(ord("A") + i % 26) for i in range(112))
+colors = (1, 2, 3, 4, 5, 6, 7, 0)
+runs = 10000
+
+def list_building():
+    prefix = [0xF0, 0x00, 0x00, 0x66, 0x15] + [0x12] + [0]
+    suffix = [0xF7]
+    display = prefix + [ord(c) for c in text] + suffix
+    color = [0xF0, 0x00, 0x00, 0x66, 0x15] + [0x72] + [c for c in colors] + suffix
+    return display, color
+
+templates = SysexTemplates()
+def template_patching():
+    with templates.lock:
+        display = templates.display_text(0, text)
+        color = templates.display_colors(colors)
+    return display, color
+
+assert bytes(template_patching()[0]) == bytes(list_building()[0])
+assert bytes(template_patching()[1]) == bytes(list_building()[1])
+
+for name, func in [("list building", list_building), ("templates", template_patching)]:
+    tracemalloc.start()
+    func()
+    baseline = tracemalloc.get_traced_memory()[0]
+    tracemalloc.reset_peak()
+    for i in range(runs):
+        func()
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    start_time = time.perf_counter()
+    for i in range(runs):
+        func()
+    per_call = (time.perf_counter() - start_time) / runs
+    print(f"{name}: peak {peak - baseline} bytes above baseline, {current - baseline} bytes retained, {per_call * 1e6:.2f}us per display + color update")
@@ -0,0 +1,54 @@
+import os
+import sys
+import time
+import mido
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+from MidiTransport import LoopbackTransport, MidoTransport, RtMidiTransport
+
+# Per message overhead of the MIDI transports.
+# Usage: python transport_benchmark.py [port name]
+# Without a port name only the loopback transport and the mido message conversion are measured.
+# With a port name (a loopMIDI port works best) mido and python-rtmidi send to it and receive the loop back.
+runs = 20000
+messages = [(0xE0 | (i % 8), i % 128, 64) for i in range(64)] + [(0x90, i % 32, 127) for i in range(64)]
+
+def bench_transport(name, transport, port_name):
+    received = 0
+    def callback(msg):
+        nonlocal received
+        received += 1
+    try:
+        inport = transport.open_input(port_name, callback)
+        outport = transport.open_output(port_name)
+    except Exception as e:
+        print(f"{name}: could not open {port_name}: {e}")
+        return
+    start_time = time.perf_counter()
+    for i in range(runs):
+        outport.send(messages[i % len(messages)])
+    send_time = time.perf_counter() - start_time
+    # Give the backend time to deliver the loop back
+    deadline = time.time() + 5
+    while received < runs and time.time() < deadline:
+        time.sleep(0.01)
+    inport.close()
+    outport.close()
+    print(f"{name}: {send_time / runs * 1e6:.2f}us per send, {received}/{runs} received")
+
+def bench_mido_conversion():
+    # The part the raw path skips: building a Message to send and converting it back to bytes on receive
+    start_time = time.perf_counter()
+    for i in range(runs):
+        mido.Message.from_bytes(messages[i % len(messages)]).bytes()
+    print(f"mido Message conversion: {(time.perf_counter() - start_time) / runs * 1e6:.2f}us per message")
+
+bench_transport("loopback", LoopbackTransport(["bench"]), "bench")
+bench_mido_conversion()
+
+if len(sys.argv) > 1:
+    port_name = sys.argv[1]
+    bench_transport("mido", MidoTransport(), port_name)
+    try:
+        bench_transport("rtmidi", RtMidiTransport(), port_name)
+    except ImportError as e:
+        print(f"rtmidi: {e}")
@@ -0,0 +1,206 @@
+import asyncio
+import logging
+from enum import Enum
+from typing import Callable, NamedTuple
+import mido
+from XTouchLib import XTouch, XTouchButton, XTouchButtonLED, XTouchEncoderRing, XTouchColor
+from MidiTransport import MidiTransport
+
+__all__ = ["AsyncXTouch", "XTouchEvent", "XTouchEventType"]
+
+
+class XTouchEventType(Enum):
+    """Enumeration for XTouch input event types."""
+    FADER = 0
+    ENCODER = 1
+    ENCODER_PRESS = 2
+    BUTTON = 3
+    TOUCH = 4
+
+
+class XTouchEvent(NamedTuple):
+    """
+    Input event of the XTouch device.
+
+    value holds the dB value for faders, the ticks for encoders and the pressed state for buttons, encoder presses and touches.
+    pos is only set for faders, button only for buttons and elapsed (time since the last event of the same control) only for presses and touches.
+    """
+    type: XTouchEventType
+    channel: int
+    value: float | int | bool
+    pos: int = None
+    button: XTouchButton = None
+    elapsed: float = None
+
+
+class AsyncXTouch:
+    """asyncio wrapper around XTouch exposing an event stream and batched output."""
+
+    def __init__(self, xtouch: XTouch = None, loop: asyncio.AbstractEventLoop = None, max_events: int = 0,
+                 direct_midi_hook_callback: Callable[[mido.Message], bool] = None):
+        """
+        Wrap an XTouch device. Has to be created while the event loop is running or with an explicit loop.
+
+        :param xtouch: The XTouch device to wrap. A new one is opened if None.
+        :param loop: The event loop events are delivered to.
+        :param max_events: Maximum number of queued events (0 for unlimited). Events are dropped if the queue is full.
+        :param direct_midi_hook_callback: Passed through to XTouch. Should return True if the message should be ignored.
+        """
+        self.logger = logging.getLogger("XTouch Async")
+        self.loop = loop if loop is not None else asyncio.get_running_loop()
+        self.xt = xtouch if xtouch is not None else XTouch()
+        self.__events = asyncio.Queue(max_events)
+        self.__pending = {}
+        self.__version_waiters = []
+        self.dropped_events = 0
+        self.xt.change_callback(fader_callback=self.__fader_callback,
+                                encoder_callback=self.__encoder_callback,
+                                encoder_press_callback=self.__encoder_press_callback,
+                                button_callback=self.__button_callback,
+                                touch_callback=self.__touch_callback,
+                                direct_midi_hook_callback=direct_midi_hook_callback,
+                                version_callback=self.__version_callback)
+
+    @classmethod
+    async def open(cls, timeout: float = 1.0, transport: MidiTransport = None, **kwargs):
+        """
+        Open the XTouch device without blocking the event loop and wait for its version response.
+
+        :param timeout: Seconds to wait for the handshake.
+        :param transport: MIDI transport used to open the device ports.
+        :raises OSError: If no device is found or it does not answer in time.
+        """
+        loop = asyncio.get_running_loop()
+        xtouch = await loop.run_in_executor(None, lambda: XTouch(transport=transport))
+        axt = cls(xtouch, loop=loop, **kwargs)
+        try:
+            await axt.handshake(timeout)
+        except OSError:
+            await axt.close()
+            raise
+        return axt
+
+    async def close(self):
+        """Close the device and end all running event streams."""
+        await self.loop.run_in_executor(None, self.xt.close)
+        self.__post(None)
+
+    async def handshake(self, timeout: float = 1.0):
+        """
+        Request the device version and wait for the answer.
+
+        :param timeout: Seconds to wait for the answer.
+        :return: The version string of the device.
+        :raises TimeoutError: If the device does not answer in time.
+        """
+        waiter = self.loop.create_future()
+        self.__version_waiters.append(waiter)
+        try:
+            await self.loop.run_in_executor(None, self.xt.request_version)
+            return await asyncio.wait_for(waiter, timeout)
+        except asyncio.TimeoutError:
+            self.xt.is_connected = False
+            raise TimeoutError(f"No version response received after {timeout} seconds")
+        finally:
+            if waiter in self.__version_waiters:
+                self.__version_waiters.remove(waiter)
+
+    async def events(self):
+        """
+        Stream the input events of the device.
+        The stream ends when the device is closed.
+        """
+        while True:
+            event = await self.__events.get()
+            if event is None:
+                self.__post(None)
+                return
+            yield event
+
+    # Output is collected and sent in one go by flush. Later calls for the same control replace earlier ones.
+    def set_display_text(self, channel: int, row: int, text: str):
+        self.__pending[("text", channel, row)] = (self.xt.set_display_text, (channel, row, text))
+
+    def set_display_color(self, channel: int, color: int | XTouchColor):
+        # Re-inserted so it is sent after a raw colour list queued before it
+        self.__pending.pop(("color", channel), None)
+        self.__pending[("color", channel)] = (self.xt.set_display_color, (channel, color))
+
+    def set_raw_display_color(self, colors: list[int | XTouchColor]):
+        # The list sets every channel, colours of single channels queued before it are superseded
+        for key in [key for key in self.__pending if key[0] == "color"]:
+            del self.__pending[key]
+        self.__pending[("color", None)] = (self.xt.set_raw_display_color, (colors,))
+
+    def set_fader(self, channel: int, db: float = None, pos: int = None):
+        self.__pending[("fader", channel)] = (self.xt.set_fader, (channel, db, pos))
+
+    def set_button_led(self, channel: int, button: XTouchButton | int, state: XTouchButtonLED | bool | int):
+        key = button.value if isinstance(button, XTouchButton) else button
+        self.__pending[("button", channel, key)] = (self.xt.set_button_led, (channel, button, state))
+
+    def set_encoder_ring(self, channel: int, value: int, mode: XTouchEncoderRing | int, light: bool = False):
+        self.__pending[("encoder", channel)] = (self.xt.set_encoder_ring, (channel, value, mode, light))
+
+    def set_level_meter(self, channel: int, level: int):
+        self.__pending[("level", channel)] = (self.xt.set_level_meter, (channel, level))
+
+    async def flush(self):
+        """
+        Send all pending output to the device in a single executor job.
+
+        :raises OSError: If the device disconnected.
+        """
+        if not self.__pending:
+            return
+        pending = list(self.__pending.values())
+        self.__pending.clear()
+        await self.loop.run_in_executor(None, self.__send_pending, pending)
+
+    @staticmethod
+    def __send_pending(pending):
+        for func, args in pending:
+            func(*args)
+
+    def __post(self, event):
+        # Called from the MIDI thread, the queue may only be touched from the loop
+        try:
+            self.loop.call_soon_threadsafe(self.__put, event)
+        except RuntimeError:
+            # Loop already closed
+            pass
+
+    def __put(self, event):
+        try:
+            self.__events.put_nowait(event)
+        except asyncio.QueueFull:
+            if event is None:
+                # The end of stream marker must not be lost
+                self.__events.get_nowait()
+                self.__events.put_nowait(event)
+            self.dropped_events += 1
+
+    def __fader_callback(self, channel, db, pos):
+        self.__post(XTouchEvent(XTouchEventType.FADER, channel, db, pos=pos))
+
+    def __encoder_callback(self, channel, ticks):
+        self.__post(XTouchEvent(XTouchEventType.ENCODER, channel, ticks))
+
+    def __encoder_press_callback(self, channel, state, elapsed):
+        self.__post(XTouchEvent(XTouchEventType.ENCODER_PRESS, channel, state, elapsed=elapsed))
+
+    def __button_callback(self, channel, button, state, elapsed):
+        self.__post(XTouchEvent(XTouchEventType.BUTTON, channel, state, button=button, elapsed=elapsed))
+
+    def __touch_callback(self, channel, state, elapsed):
+        self.__post(XTouchEvent(XTouchEventType.TOUCH, channel, state, elapsed=elapsed))
+
+    def __version_callback(self, version):
+        def resolve():
+            for waiter in self.__version_waiters:
+                if not waiter.done():
+                    waiter.set_result(version)
+        try:
+            self.loop.call_soon_threadsafe(resolve)
+        except RuntimeError:
+            pass
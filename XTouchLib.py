@@ -4,7 +4,10 @@ from typing import Callable
 import numpy as np
 import logging
 import time
+from threading import RLock
 from XTouchLibTypes import XTouchButton, XTouchButtonLED, XTouchEncoderRing, XTouchColor, XTouchState, XTouchStateUnchecked
+from XTouchSysex import SysexTemplates
+from MidiTransport import MidiTransport, MidoTransport
 
 __all__ = ["XTouch", "XTouchButton", "XTouchButtonLED", "XTouchEncoderRing", "XTouchColor", "XTouchState"]
 
@@ -16,8 +19,6 @@ class XTouch:
     __fader_pos = [-8192, -7700, -4340, 245, 4720, 8188]
     __sysex_prefix = [0xF0, 0x00, 0x00, 0x66, 0x15]
     __sysex_suffix = [0xF7]
-    __sysex_color_command = [0x72]
-    __sysex_display_command = [0x12]
     __sysex_device_query = [0x00]
     __max_pitchbend = 8188
     __min_pitchbend = -8192
@@ -26,7 +27,9 @@ class XTouch:
                  encoder_press_callback: Callable[[int, bool, float], None] = None,
                  button_callback: Callable[[int, XTouchButton, bool, float], None] = None,
                  touch_callback: Callable[[int, bool, float], None] = None,
-                 direct_midi_hook_callback: Callable[[mido.Message], bool] = None):
+                 direct_midi_hook_callback: Callable[[mido.Message], bool] = None,
+                 version_callback: Callable[[str], None] = None,
+                 transport: MidiTransport = None):
     
         """
         Initialize the XTouch device.
@@ -37,13 +40,14 @@ class XTouch:
         :param button_callback: Callback function for button events.
         :param touch_callback: Callback function for touch events.
         :param direct_midi_hook_callback: Callback function for direct MIDI messages. Callback function should return True if the message should be ignored.
+        :param version_callback: Callback function for version responses of the device.
+        :param transport: MIDI transport used to open the device ports. Defaults to mido.
         """
+        self.transport = transport if transport is not None else MidoTransport()
         try:
             input_name, output_name = self.__get_device_name()
         except OSError as e:
             raise e
-        self.input = mido.open_input(input_name, callback=self.__midi_callback)
-        self.output = mido.open_output(output_name)
         
         self.logger = logging.getLogger("XTouch Library")
         
@@ -51,6 +55,7 @@ class XTouch:
         
         self.version_response_received = False
         self.version_request_send_time = time.time()
+        self.version = None
         
         self.__fader_callback = fader_callback
         self.__encoder_callback = encoder_callback
@@ -58,14 +63,20 @@ class XTouch:
         self.__button_callback = button_callback
         self.__touch_callback = touch_callback
         self.__direct_midi_hook_callback = direct_midi_hook_callback
+        self.__version_callback = version_callback
         self.__note_timers = [time.time()] * 48
         
         self.__state = XTouchStateUnchecked()
+        # The MIDI callback and the setters both replace the state, each read-replace-assign holds the lock
+        self.__state_lock = RLock()
+        self.__templates = SysexTemplates()
         
-        self.output.send(mido.Message.from_bytes(self.__sysex_prefix + [0x13] + [0x00] + self.__sysex_suffix))
+        self.output = self.transport.open_output(output_name)
+        self.input = self.transport.open_input(input_name, self.__midi_callback)
         
-        for msg in self.__display_hello_msg():
-            self.__send_midi(msg)
+        self.request_version()
+        
+        self.__send_hello()
             
         
         # Initiating the handshake(Disabled for now as it is not required for the X-Touch to function and does not work properly)
@@ -77,9 +88,6 @@ class XTouch:
         Sometimes the Xtouch input breaks and the output is still working.
         Dont know if this problem is detectable on my side or if the Xtouch firmware just stops sending midi messages without closing the connection.
         """
-        def try_handshake():
-            self.output.send(mido.Message.from_bytes(self.__sysex_prefix + [0x13] + [0x00] + self.__sysex_suffix))
-        
         if self.input.closed and not self.output.closed:
             self.logger.error(f"FISHY STATE DETECTED input: {self.input.closed} output: {self.output.closed}")
             self.is_connected = False
@@ -92,16 +100,15 @@ class XTouch:
                 raise OSError("No version response received after 1 second")
             else:
                 self.version_response_received = False
-                self.version_request_send_time = time.time()
-                try_handshake()
+                self.request_version()
         
         
     
-    def __send_midi(self, msg: mido.Message):
+    def __send_midi(self, msg):
         """
         Send a MIDI message to the XTouch device.
 
-        :param msg: The MIDI message.
+        :param msg: The raw MIDI message bytes.
         """
         if not self.is_connected:
             return
@@ -118,6 +125,14 @@ class XTouch:
             #logging.error(e, exc_info=True)
             self.is_connected = False
             raise OSError("Error sending MIDI message likely the device disconnected")
+
+    def request_version(self):
+        """
+        Ask the XTouch device for its firmware version.
+        The answer is stored in version and passed to the version callback.
+        """
+        self.version_request_send_time = time.time()
+        self.__send_midi(self.__templates.version_query)
             
 
     def change_callback(self, fader_callback: Callable[[int, float, int], None] = None,
@@ -125,7 +140,8 @@ class XTouch:
                         encoder_press_callback: Callable[[int, bool, float], None] = None,
                         button_callback: Callable[[int, XTouchButton, bool, float], None] = None,
                         touch_callback: Callable[[int, bool, float], None] = None,
-                        direct_midi_hook_callback: Callable[[mido.Message], bool] = None):
+                        direct_midi_hook_callback: Callable[[mido.Message], bool] = None,
+                        version_callback: Callable[[str], None] = None):
         """
         Change the callback functions for the XTouch device.
 
@@ -135,6 +151,7 @@ class XTouch:
         :param button_callback: Callback function for button events.
         :param touch_callback: Callback function for touch events.
         :param direct_midi_hook_callback: Callback function for direct MIDI messages. Callback function should return True if the message should be ignored.
+        :param version_callback: Callback function for version responses of the device.
         """
         was_set = False
         if fader_callback is None or callable(fader_callback):
@@ -155,6 +172,9 @@ class XTouch:
         if direct_midi_hook_callback is None or callable(direct_midi_hook_callback):
             self.__direct_midi_hook_callback = direct_midi_hook_callback
             was_set = True
+        if version_callback is None or callable(version_callback):
+            self.__version_callback = version_callback
+            was_set = True
         if not was_set:
             raise ValueError("No valid callback functions provided")
         
@@ -174,55 +194,62 @@ class XTouch:
         :raises OSError: If no XTouch device is found.
         """
         try:
-            input_name = [name for name in mido.get_input_names() if "X-Touch-Ext" in name][0]
+            input_name = [name for name in self.transport.get_input_names() if "X-Touch-Ext" in name][0]
         except IndexError:
             raise OSError("No X-Touch-Ext input found")
         try:
-            output_name = [name for name in mido.get_output_names() if "X-Touch-Ext" in name][0]
+            output_name = [name for name in self.transport.get_output_names() if "X-Touch-Ext" in name][0]
         except IndexError:
             raise OSError("No X-Touch-Ext output found")
         return input_name, output_name
 
-    def __display_msg(self, dpstring, offset):
+    @staticmethod
+    def __pitchwheel_msg(channel, pitch):
+        pitch += 8192
+        return (0xE0 | channel, pitch & 0x7F, pitch >> 7)
+
+    @staticmethod
+    def __note_on_msg(note, velocity):
+        return (0x90, note, velocity)
+
+    @staticmethod
+    def __control_change_msg(control, value):
+        return (0xB0, control, value)
+
+    @staticmethod
+    def __aftertouch_msg(value):
+        return (0xD0, value)
+
+    def __send_display_text(self, dpstring, offset):
         """
-        Create a SysEx message to display text on the XTouch device.
+        Send a SysEx message to display text on the XTouch device.
 
         :param dpstring: The text to display.
         :param offset: The offset for the display.
-        :return: SysEx message.
         """
-        prefix = self.__sysex_prefix + self.__sysex_display_command + [offset]
-        suffix = self.__sysex_suffix
-        dpbytes = [ord(c) for c in dpstring]
-        msgbytearray = prefix + dpbytes + suffix
-        return mido.Message.from_bytes(msgbytearray)
+        # The template is reused, keep it locked until it is sent
+        with self.__templates.lock:
+            self.__send_midi(self.__templates.display_text(offset, dpstring))
 
-    def __display_color_msg(self, colors=None):
+    def __send_display_colors(self, colors=None):
         """
-        Create a SysEx message to set the display colors on the XTouch device.
-
-        :return: SysEx message.
+        Send a SysEx message to set the display colors on the XTouch device.
         """
         if colors is None:
             colors = self.__state.display_colors
-        prefix = self.__sysex_prefix + self.__sysex_color_command
-        suffix = self.__sysex_suffix
-        color_bytes = [color for color in colors]
-        msgbytearray = prefix + color_bytes + suffix
-        return mido.Message.from_bytes(msgbytearray)
+        with self.__templates.lock:
+            self.__send_midi(self.__templates.display_colors(colors))
 
-    def __display_hello_msg(self):
+    def __send_hello(self):
         """
-        Create a SysEx message to display a hello message on the XTouch device.
-
-        :return: SysEx message.
+        Bring the XTouch device to a defined initial state.
         """
         msglist = []
         for i in range(8):
             # Faders to minimum
-            msglist.append(mido.Message("pitchwheel", channel=i, pitch=4384))
+            msglist.append(self.__pitchwheel_msg(i, 4384))
             # Clear encoder rings
-            msglist.append(mido.Message("control_change", control=i + 48, value=0))
+            msglist.append(self.__control_change_msg(i + 48, 0))
             # Configure level meters
             """
             mode bit map in the form of (0000 0lps):
@@ -236,16 +263,14 @@ class XTouch:
         
         # Clear buttons
         for i in range(32):
-            msglist.append(mido.Message("note_on", note=i, velocity=0))
+            msglist.append(self.__note_on_msg(i, 0))
         
+        for msg in msglist:
+            self.__send_midi(msg)
         # Clear Display colors
-        msglist.append(self.__display_color_msg(colors=[7] * 8))
+        self.__send_display_colors(colors=[7] * 8)
         # Clear displays
-        mackie_string = [ord(" ")] * 7 * 16
-        msglist.append(mido.Message.from_bytes(self.__sysex_prefix + self.__sysex_display_command + [0x00] + mackie_string + self.__sysex_suffix))
-
-        
-        return msglist
+        self.__send_display_text(" " * 7 * 16, 0x00)
 
 
     def set_display_text(self, channel: int, row: int, text: str):
@@ -264,8 +289,9 @@ class XTouch:
         text = text[:7]
         text = text.ljust(7, " ")
         offset = channel * 7 + row * 8 * 7
-        self.__send_midi(self.__display_msg(text, offset))
-        self.__state.display_text = self.__state.display_text[:offset] + text + self.__state.display_text[offset + len(text):]
+        with self.__state_lock:
+            self.__send_display_text(text, offset)
+            self.__update_display_text(offset, text)
         
     def set_raw_display_text(self, offset: int, text: str):
         """
@@ -276,8 +302,14 @@ class XTouch:
         """
         if len(text) + offset > 112:
             raise IndexError("Text and offset exceed display length of 112 characters")
-        self.__send_midi(self.__display_msg(text, offset))
-        self.__state.display_text = self.__state.display_text[:offset] + text + self.__state.display_text[offset + len(text):]
+        with self.__state_lock:
+            self.__send_display_text(text, offset)
+            self.__update_display_text(offset, text)
+
+    def __update_display_text(self, offset: int, text: str):
+        with self.__state_lock:
+            old_text = self.__state.display_text
+            self.__state = self.__state.replace(display_text=old_text[:offset] + text + old_text[offset + len(text):])
 
     def set_display_color(self, channel: int, color: int):
         """
@@ -295,9 +327,11 @@ class XTouch:
         else:
             if not (0 <= color <= 7):
                 raise ValueError("Color must be between 0 and 7 or an instance of XTouchColor")
-        self.__display_colors[channel] = color
-        self.__send_midi(self.__display_color_msg())
-        self.__state.display_colors[channel] = color
+        with self.__state_lock:
+            colors = self.__state.display_colors
+            colors = colors[:channel] + (color,) + colors[channel + 1:]
+            self.__send_display_colors(colors)
+            self.__state = self.__state.replace(display_colors=colors)
         
     def set_raw_display_color(self, colors: list[int|XTouchColor]):
         if len(colors) != 8:
@@ -306,8 +340,9 @@ class XTouch:
             colors = [c.value for c in colors]
         elif not all((0 <= c <= 7 and isinstance(c, int)) for c in colors):
             raise ValueError("Colors must be between 0 and 7 or instances of XTouchColor")
-        self.__state.display_colors = colors
-        self.__send_midi(self.__display_color_msg())
+        with self.__state_lock:
+            self.__state = self.__state.replace(display_colors=colors)
+            self.__send_display_colors()
         
         
     def set_fader(self, channel: int, db: float=None, pos: int=None):
@@ -326,16 +361,29 @@ class XTouch:
         if db is not None:
             if db < self.__fader_db[0] or db > self.__fader_db[-1]:
                 raise ValueError(f"db value must be between {self.__fader_db[0]} and {self.__fader_db[-1]}")
-            value = np.interp(db, self.__fader_db, self.__fader_pos)
+            value = self.fader_db_to_pos(db)
         elif pos is not None:
             if pos < self.__min_pitchbend or pos > self.__max_pitchbend:
                 raise ValueError(f"pos value must be between {self.__min_pitchbend} and {self.__max_pitchbend}")
             value = pos
-        if not self.__state.faders[channel] == value:
-            self.__send_midi(mido.Message("pitchwheel", channel=channel, pitch=int(min(value, self.__max_pitchbend-30))))
-            self.__state.faders[channel] = value
+        value = int(value)
+        with self.__state_lock:
+            faders = self.__state.faders
+            if not faders[channel] == value:
+                self.__send_midi(self.__pitchwheel_msg(channel, min(value, self.__max_pitchbend-30)))
+                self.__state = self.__state.replace(faders=faders[:channel] + (value,) + faders[channel + 1:])
     
 
+    @classmethod
+    def fader_db_to_pos(cls, db: float) -> int:
+        """
+        Convert a dB value to a fader position as stored in the state.
+
+        :param db: The dB value, clamped to the fader range.
+        :return: The fader position.
+        """
+        return int(np.interp(db, cls.__fader_db, cls.__fader_pos))
+
     def set_button_led(self, channel: int, button: XTouchButton| int, state: XTouchButtonLED| bool| int):
         """
         :param channel: The channel of the button (must be between 0 and 7).
@@ -361,14 +409,17 @@ class XTouch:
             state = int(state)
         elif not (0 <= state <= 2):
             raise ValueError("State must be between 0 and 2 or an instance of XTouchButtonLED or bool")
-        if self.__state.button_leds[channel][button] == state:
-            return
-        # nice one liner to set the button led velocity
-        # if state is 0 velocity is 0, if state is 1 velocity is 127, if state is 2 velocity is 1 (for blinking)
-        velocity = 1 if state == 2 else state*127
-        int_button = button * 8 + channel
-        self.__send_midi(mido.Message("note_on", note=int_button, velocity=velocity))
-        self.__state.button_leds[channel][button] = state
+        with self.__state_lock:
+            button_leds = self.__state.button_leds
+            if button_leds[channel][button] == state:
+                return
+            # nice one liner to set the button led velocity
+            # if state is 0 velocity is 0, if state is 1 velocity is 127, if state is 2 velocity is 1 (for blinking)
+            velocity = 1 if state == 2 else state*127
+            int_button = button * 8 + channel
+            self.__send_midi(self.__note_on_msg(int_button, velocity))
+            leds = button_leds[channel][:button] + (state,) + button_leds[channel][button + 1:]
+            self.__state = self.__state.replace(button_leds=button_leds[:channel] + (leds,) + button_leds[channel + 1:])
     def set_encoder_ring(self, channel: int, value: int, mode: XTouchEncoderRing|int, light: bool=False):
         """
         Set the encoder ring mode and value on the XTouch device.
@@ -388,10 +439,15 @@ class XTouch:
                 raise ValueError("Mode must be between 0 and 3 or an instance of XTouchEncoderRing")
         if not (0 <= value <= 15):
             raise ValueError("Value must be between 0 and 15")
-        if light:
-            mode += 4
-        self.__send_midi(mido.Message("control_change", control=channel + 48, value=mode * 16 + value))
-        self.__state.encoder_rings[channel] = (mode, value, light)
+        ring = (mode, value, bool(light))
+        with self.__state_lock:
+            encoder_rings = self.__state.encoder_rings
+            if encoder_rings[channel] == ring:
+                return
+            if light:
+                mode += 4
+            self.__send_midi(self.__control_change_msg(channel + 48, mode * 16 + value))
+            self.__state = self.__state.replace(encoder_rings=encoder_rings[:channel] + (ring,) + encoder_rings[channel + 1:])
         
     def set_level_meter(self, channel: int, level: int):
         """
@@ -407,72 +463,90 @@ class XTouch:
             raise ValueError("Level must be between 0 and 13")
         if level == 13:
             level = 14
-        self.__send_midi(mido.Message("aftertouch", value=level + 16 * channel))
+        self.__send_midi(self.__aftertouch_msg(level + 16 * channel))
     
     
-    def __midi_callback(self, msg: mido.Message):
+    def __midi_callback(self, msg):
         """
         Handle incoming MIDI messages.
-        :param msg: The MIDI message.
+        :param msg: The raw MIDI message bytes.
         """
         try:
             if self.__direct_midi_hook_callback is not None:
-                boooo = self.__direct_midi_hook_callback(msg)
+                # Only built when someone wants to look at the message
+                boooo = self.__direct_midi_hook_callback(mido.Message.from_bytes(msg))
                 if boooo:
                     return
-            if msg.type == "pitchwheel":
+            status = msg[0] & 0xF0
+            if status == 0xE0:
+                # pitchwheel
+                channel = msg[0] & 0x0F
+                pitch = (msg[1] | msg[2] << 7) - 8192
+                if channel <= 7:
+                    # The hand moved the fader, remember where it is so it is not sent back.
+                    # The top of the travel reports up to 8191, states only hold positions up to __max_pitchbend
+                    position = min(pitch, self.__max_pitchbend)
+                    with self.__state_lock:
+                        faders = self.__state.faders
+                        self.__state = self.__state.replace(faders=faders[:channel] + (position,) + faders[channel + 1:])
                 if self.__fader_callback is not None:
-                    self.__fader_callback(msg.channel, np.interp(msg.pitch, self.__fader_pos, self.__fader_db), msg.pitch)
-            elif msg.type == "control_change":
+                    self.__fader_callback(channel, np.interp(pitch, self.__fader_pos, self.__fader_db), pitch)
+            elif status == 0xB0:
+                # control_change
                 if self.__encoder_callback is not None:
-                    ticks = msg.value % 64
-                    if msg.value < 64:
+                    value = msg[2]
+                    ticks = value % 64
+                    if value < 64:
                         ticks = -ticks
-                    self.__encoder_callback(msg.control - 16, ticks)
-            elif msg.type == "note_on":
-                if 0 <= msg.note <= 31:
-                    time_since_last = time.time() - self.__note_timers[msg.note]
-                    self.__note_timers[msg.note] = time.time()
+                    self.__encoder_callback(msg[1] - 16, ticks)
+            elif status == 0x90:
+                # note_on
+                note, velocity = msg[1], msg[2]
+                if 0 <= note <= 31:
+                    time_since_last = time.time() - self.__note_timers[note]
+                    self.__note_timers[note] = time.time()
                     button = None
-                    if msg.note <= 7:
+                    if note <= 7:
                         button = XTouchButton.REC
-                    elif 8 <= msg.note <= 15:
+                    elif 8 <= note <= 15:
                         button = XTouchButton.SOLO
-                    elif 16 <= msg.note <= 23:
+                    elif 16 <= note <= 23:
                         button = XTouchButton.MUTE
-                    elif 24 <= msg.note <= 31:
+                    elif 24 <= note <= 31:
                         button = XTouchButton.SELECT
-                    channel = msg.note % 8
-                    if msg.velocity == 127:
+                    channel = note % 8
+                    if velocity == 127:
                         if self.__button_callback is not None:
                             self.__button_callback(channel, button, True, time_since_last)
                     else:
                         if self.__button_callback is not None:
                             self.__button_callback(channel, button, False, time_since_last)
-                elif 32 <= msg.note <= 39:
-                    time_since_last = time.time() - self.__note_timers[msg.note]
-                    self.__note_timers[msg.note] = time.time()
-                    if msg.velocity == 127:
+                elif 32 <= note <= 39:
+                    time_since_last = time.time() - self.__note_timers[note]
+                    self.__note_timers[note] = time.time()
+                    if velocity == 127:
                         if self.__encoder_press_callback is not None:
-                            self.__encoder_press_callback(msg.note - 32, True, time_since_last)
+                            self.__encoder_press_callback(note - 32, True, time_since_last)
                     else:
                         if self.__encoder_press_callback is not None:
-                            self.__encoder_press_callback(msg.note - 32, False, time_since_last)
-                elif 104 <= msg.note <= 111:
-                    time_since_last = time.time() - self.__note_timers[msg.note-104+40]
-                    self.__note_timers[msg.note-104+40] = time.time()
-                    if msg.velocity == 127:
+                            self.__encoder_press_callback(note - 32, False, time_since_last)
+                elif 104 <= note <= 111:
+                    time_since_last = time.time() - self.__note_timers[note-104+40]
+                    self.__note_timers[note-104+40] = time.time()
+                    if velocity == 127:
                         if self.__touch_callback is not None:
-                            self.__touch_callback(msg.note - 104, True, time_since_last)
+                            self.__touch_callback(note - 104, True, time_since_last)
                     else:
                         if self.__touch_callback is not None:
-                            self.__touch_callback(msg.note - 104, False, time_since_last)
-            elif msg.type == "sysex":
-                self.logger.debug(msg.hex())
-                if 0 <= msg.data[4] <= 4 or msg.data[4] == 0x13 or msg.data[4] == 0x14:
-                    self.__handle_sysex_handshake(msg)
+                            self.__touch_callback(note - 104, False, time_since_last)
+            elif msg[0] == 0xF0:
+                # sysex, data without the F0 and F7 framing
+                data = msg[1:-1]
+                self.logger.debug(bytes(msg).hex(" ").upper())
+                if 0 <= data[4] <= 4 or data[4] == 0x13 or data[4] == 0x14:
+                    self.__handle_sysex_handshake(data)
             else:
-                print(msg)
+                print(mido.Message.from_bytes(msg))
         except Exception as e:
             self.logger.error(e, exc_info=True)
             
@@ -480,25 +554,31 @@ class XTouch:
     
     @property
     def state(self):
-        return XTouchState(self.__state.copy())
+        """
+        Snapshot of the current state. States are immutable, so taking a snapshot does not copy anything.
+        The fields were validated by the setters, so they are not validated again.
+        """
+        return XTouchState(self.__state, validate=False)
     
     @state.setter
-    def state(self, state: XTouchState):
-        if not isinstance(state, XTouchState):
+    def state(self, state: XTouchStateUnchecked):
+        """
+        Bring the device to the given state. Only the differences to the current state are sent.
+        """
+        if not isinstance(state, XTouchStateUnchecked):
             raise ValueError("State must be an instance of XTouchState")
-        if state.display_colors != self.__state.display_colors:
-            self.set_raw_display_color(state.display_colors)
-        if state.display_text != self.__state.display_text:
-            self.set_raw_display_text(0, state.display_text)
-        for i in range(8):
-            if state.faders[i] != self.__state.faders[i]:
-                self.set_fader(i, pos=state.faders[i])
-            if state.button_leds[i] != self.__state.button_leds[i]:
-                for j in range(4):
-                    if state.button_leds[i][j] != self.__state.button_leds[i][j]:
-                        self.set_button_led(i, j, state.button_leds[i][j])
-            if state.encoder_rings[i] != self.__state.encoder_rings[i]:
-                self.set_encoder_ring(i, state.encoder_rings[i][1], state.encoder_rings[i][0], state.encoder_rings[i][2])
+        with self.__state_lock:
+            diff = self.__state.diff(state)
+            if diff.display_colors is not None:
+                self.set_raw_display_color(list(diff.display_colors))
+            for offset, text in diff.display_text:
+                self.set_raw_display_text(offset, text)
+            for channel, pos in diff.faders:
+                self.set_fader(channel, pos=pos)
+            for channel, button, led in diff.button_leds:
+                self.set_button_led(channel, button, led)
+            for channel, (mode, value, light) in diff.encoder_rings:
+                self.set_encoder_ring(channel, value, mode, light)
         
     
     
@@ -523,11 +603,11 @@ class XTouch:
         r[3] = 0x7F & (c[1] - c[2] + (0xF0 ^ (c[3] << 4)))
         return r
 
-    def __handle_sysex_handshake(self, msg):
+    def __handle_sysex_handshake(self, data):
         """
         Handle the SysEx handshake process.
 
-        :param msg: The SysEx message.
+        :param data: The SysEx data without F0 and F7.
         :raises ConnectionError: If the handshake fails.
         """
         # Handshake Procedure:
@@ -539,31 +619,33 @@ class XTouch:
         sysex_host_query_response = 0x2  # 7 bytes serial number and 4 bytes response code sent by host
         sysex_host_accept = 0x3  # 7 bytes serial number sent by device
         sysex_host_reject = 0x4  # 7 bytes serial number sent by device
-        sysex_version_query = 0x13  # 0x00 as parameter sent by host
         sysex_version_response = 0x14  # 5 bytes version by device
         sysex_command_byte = 4
-        print(hex(msg.data[sysex_command_byte]))
-        print(msg.data)
-        if msg.data[sysex_command_byte] == sysex_host_query_connection:
+        print(hex(data[sysex_command_byte]))
+        print(data)
+        if data[sysex_command_byte] == sysex_host_query_connection:
             print("Handshake response sent")
-            response = self.__sysex_prefix + [sysex_host_query_response] + list(msg.data[5:12]) + list(self.__generate_response_code(list(msg.data[12:16]))) + self.__sysex_suffix
-            print("Responding with: ", (mido.Message.from_bytes(response)).hex())
-            self.__send_midi(mido.Message.from_bytes(response))
-            self.__send_midi(mido.Message.from_bytes(self.__sysex_prefix + [sysex_version_query] + [0x00] + self.__sysex_suffix))
-        elif msg.data[sysex_command_byte] == sysex_host_accept:
+            response = self.__sysex_prefix + [sysex_host_query_response] + list(data[5:12]) + list(self.__generate_response_code(list(data[12:16]))) + self.__sysex_suffix
+            print("Responding with: ", bytes(response).hex(" ").upper())
+            self.__send_midi(response)
+            self.request_version()
+        elif data[sysex_command_byte] == sysex_host_accept:
             self.logger.info("Handshake successful")
             print("Handshake successful")
-            self.__send_midi(mido.Message.from_bytes(self.__sysex_prefix + [sysex_version_query] + [0x00] + self.__sysex_suffix))
-        elif msg.data[sysex_command_byte] == sysex_host_reject:
+            self.request_version()
+        elif data[sysex_command_byte] == sysex_host_reject:
             self.logger.error("Handshake failed")
             print("Handshake failed")
             self.input.close()
             self.output.close()
             raise ConnectionError("Handshake failed")
-        elif msg.data[sysex_command_byte] == sysex_version_response:
+        elif data[sysex_command_byte] == sysex_version_response:
             # v.v.v.v.v
             self.version_response_received = True
-            vstring = [chr(c) for c in msg.data[5:]]
+            vstring = [chr(c) for c in data[5:]]
             vstring = "".join(vstring)
+            self.version = vstring
             self.logger.info(f"X-Touch Device version: {vstring}")
+            if self.__version_callback is not None:
+                self.__version_callback(vstring)
             
@@ -1,13 +1,20 @@
 from XTouchLib2Channel import *
-import mido
+from MidiTransport import MidiTransport, MidoTransport
 
 class XTouch:
-    def __init__(self):
-        
+    def __init__(self, transport: MidiTransport = None):
+        """
+        :param transport: MIDI transport used to open the device ports. Defaults to mido.
+        """
+        self.transport = transport if transport is not None else MidoTransport()
         self.__input_name, self.__output_name = self.__get_device_name()
-        self.__midi_in = mido.open_input(self.__input_name)
-        self.__midi_out = mido.open_output(self.__output_name)
-        self.__channels = [Channel(i, self.__color_callback, self.__midi_out_callback) for i in range(8)]
+        self.__midi_in = self.transport.open_input(self.__input_name, self.__midi_callback)
+        self.__midi_out = self.transport.open_output(self.__output_name)
+        self.__state = ChannelStateBlock()
+        self.__channels = [Channel(i, self.__state) for i in range(8)]
+        # Bring the device to the initial state
+        self.__state.mark_all_dirty()
+        self.flush()
     
     def __get_device_name(self):
         """
@@ -17,30 +24,55 @@ class XTouch:
         :raises OSError: If no XTouch device is found.
         """
         try:
-            input_name = [name for name in mido.get_input_names() if "X-Touch-Ext" in name][0]
+            input_name = [name for name in self.transport.get_input_names() if "X-Touch-Ext" in name][0]
         except IndexError:
             raise OSError("No X-Touch-Ext input found")
         try:
-            output_name = [name for name in mido.get_output_names() if "X-Touch-Ext" in name][0]
+            output_name = [name for name in self.transport.get_output_names() if "X-Touch-Ext" in name][0]
         except IndexError:
             raise OSError("No X-Touch-Ext output found")
         return input_name, output_name
     
-    def __color_callback(self):
-        colors = [channel.display_color for channel in self.__channels]
-        self.__midi_out.send(XTutils.color_message(colors))
+    def __midi_callback(self, msg):
+        # Input is not handled by the v2 library yet
+        pass
+    
+    def flush(self):
+        """
+        Send everything that changed since the last flush.
+        Channel setters only mark their fields dirty, nothing reaches the device before this is called.
+        """
+        self.__state.send_dirty(self.__midi_out.send)
     
-    def __midi_out_callback(self, msg: mido.Message):
-        self.__midi_out.send(msg)
+    @property
+    def dirty(self):
+        """True if there are changes waiting for flush()."""
+        return self.__state.dirty
     
     @property
     def channels(self):
         return self.__channels
-    
+
     @channels.setter
     def channels(self, value):
-        if not isinstance(value, List[Channel]):
+        """
+        Take over the state of 8 channels. The channel objects stay views on this device's state block,
+        the values are written through and sent with the next flush().
+        """
+        if not isinstance(value, list) or not all(isinstance(channel, Channel) for channel in value):
             raise ValueError("Channels must be a list of Channel objects")
         if len(value) != 8:
             raise ValueError("Channels must be a list of length 8")
-        self.__channels = value
\ No newline at end of file
+        for channel, source in zip(self.__channels, value):
+            if channel is source:
+                continue
+            channel.display_color = source.display_color
+            channel.display_text = source.display_text
+            channel.fader = source.fader
+            channel.rec_button = source.rec_button
+            channel.solo_button = source.solo_button
+            channel.mute_button = source.mute_button
+            channel.select_button = source.select_button
+            channel.encoder_mode = source.encoder_mode
+            channel.encoder_pos = source.encoder_pos
+            channel.encoder_led = source.encoder_led
@@ -1,7 +1,10 @@
 import mido
+from array import array
 from enum import Enum
+from threading import Lock
 from typing import Callable, List
 import numpy as np
+from XTouchSysex import SysexTemplates
 
 class XTouchColor(Enum):
     """Enumeration for XTouch colors."""
@@ -35,207 +38,292 @@ class XTutils:
     sysex_display_command = [0x12]
     max_pitchbend = 8188
     min_pitchbend = -8192
+    templates = SysexTemplates()
 
-    def text_display_message(self, text: str, offset: int = 0):
+    @classmethod
+    def text_display_message(cls, text: str, offset: int = 0):
         """Create a sysex message for displaying text on the XTouch display."""
         if offset < 0 or offset > 112:
             raise ValueError("Offset must be between 0 and 112")
         if len(text) > 112 - offset:
             raise ValueError("Text is too long")
-        bytes = self.sysex_prefix + self.sysex_display_command + [offset] + [ord(c) for c in text]
-        return mido.Message('sysex', data=bytes)
-    
-    def fader_pos_to_db(self, pos: int):
+        with cls.templates.lock:
+            return mido.Message.from_bytes(cls.templates.display_text(offset, text))
+
+    @classmethod
+    def fader_pos_to_db(cls, pos: int):
         """Convert XTouch fader position to dB value."""
-        if self.min_pitchbend <= pos <= self.max_pitchbend:
+        if not cls.min_pitchbend <= pos <= cls.max_pitchbend:
             raise ValueError("Fader position out of range")
-        return np.interp(pos, self.fader_pos, self.fader_db)
-    
-    def fader_db_to_pos(self, db: float):
+        return np.interp(pos, cls.fader_pos, cls.fader_db)
+
+    @classmethod
+    def fader_db_to_pos(cls, db: float):
         """Convert dB value to XTouch fader position."""
         if db < -70 or db > 8:
             raise ValueError("dB value out of range")
-        return np.interp(db, self.fader_db, self.fader_pos)
-    
-    def color_message(self, colors: List[int]):
+        return np.interp(db, cls.fader_db, cls.fader_pos)
+
+    @classmethod
+    def color_message(cls, colors: List[int]):
         """Create a sysex message for setting the color of a channel."""
         if len(colors) != 8:
             raise ValueError("Colors must be a list of 8 integers")
-        bytes = self.sysex_prefix + self.sysex_color_command + colors
-        return mido.Message('sysex', data=bytes)
+        with cls.templates.lock:
+            return mido.Message.from_bytes(cls.templates.display_colors(colors))
+
+
+class ChannelStateBlock:
+    """
+    State of all 8 strips with one array per field, indexed by channel.
+    Changes only set dirty bits, send_dirty() turns everything that changed into MIDI messages.
+    """
+
+    def __init__(self):
+        self.lock = Lock()
+        self.templates = SysexTemplates()
+        # 16 cells of 7 characters, upper row first
+        self.display_text = bytearray(b" " * 112)
+        self.__display_text_view = memoryview(self.display_text)
+        self.display_color = array("B", [XTouchColor.WHITE.value] * 8)
+        self.fader = array("h", [0] * 8)
+        self.encoder_pos = array("B", [0] * 8)
+        self.encoder_mode = array("B", [XTouchEncoderRing.DOT.value] * 8)
+        self.encoder_led = array("B", [0] * 8)
+        # Indexed by button * 8 + channel which is also the note number of the button
+        self.button_leds = array("B", [XTouchButtonLED.OFF.value] * 32)
+        self.level_meter = array("B", [0] * 8)
+
+        # Dirty bit masks, one bit per channel (per cell for the text, per note for the buttons)
+        self.dirty_text = 0
+        self.dirty_color = False
+        self.dirty_fader = 0
+        self.dirty_encoder = 0
+        self.dirty_buttons = 0
+        self.dirty_level_meter = 0
+
+    @property
+    def dirty(self):
+        return bool(self.dirty_text or self.dirty_color or self.dirty_fader or self.dirty_encoder or self.dirty_buttons or self.dirty_level_meter)
+
+    def mark_all_dirty(self):
+        """Mark everything dirty so the next flush sends the whole state."""
+        with self.lock:
+            self.dirty_text = 0xFFFF
+            self.dirty_color = True
+            self.dirty_fader = 0xFF
+            self.dirty_encoder = 0xFF
+            self.dirty_buttons = 0xFFFFFFFF
+
+    def send_dirty(self, send: Callable[[bytes], None]):
+        """
+        Encode all dirty fields into raw MIDI messages, send them and clear the dirty bits.
+        Neighbouring dirty text cells are sent as one sysex message.
+        :param send: Called with every raw message. The bytes are only valid during the call.
+        """
+        with self.lock:
+            if self.dirty_text:
+                cell = 0
+                while cell < 16:
+                    if self.dirty_text >> cell & 1:
+                        start = cell
+                        while cell < 16 and self.dirty_text >> cell & 1:
+                            cell += 1
+                        with self.templates.lock:
+                            send(self.templates.display_text(start * 7, self.__display_text_view[start * 7:cell * 7]))
+                    cell += 1
+                self.dirty_text = 0
+            if self.dirty_color:
+                with self.templates.lock:
+                    send(self.templates.display_colors(self.display_color))
+                self.dirty_color = False
+            if self.dirty_fader:
+                for channel in range(8):
+                    if self.dirty_fader >> channel & 1:
+                        pitch = self.fader[channel] + 8192
+                        send((0xE0 | channel, pitch & 0x7F, pitch >> 7))
+                self.dirty_fader = 0
+            if self.dirty_encoder:
+                for channel in range(8):
+                    if self.dirty_encoder >> channel & 1:
+                        value = self.encoder_pos[channel] + self.encoder_mode[channel] * 16 + self.encoder_led[channel] * 64
+                        send((0xB0, channel + 48, value))
+                self.dirty_encoder = 0
+            if self.dirty_buttons:
+                for note in range(32):
+                    if self.dirty_buttons >> note & 1:
+                        # if state is 0 velocity is 0, if state is 1 velocity is 127, if state is 2 velocity is 1 (for blinking)
+                        state = self.button_leds[note]
+                        velocity = 1 if state == 2 else state * 127
+                        send((0x90, note, velocity))
+                self.dirty_buttons = 0
+            if self.dirty_level_meter:
+                for channel in range(8):
+                    if self.dirty_level_meter >> channel & 1:
+                        send((0xD0, self.level_meter[channel] + 16 * channel))
+                self.dirty_level_meter = 0
 
 
 class Channel:
+    """View on one strip of a ChannelStateBlock. Setters only change the block, nothing is sent before XTouch.flush()."""
 
-    def __init__(self, channel: int, color_callback: Callable[[None],None], midi_out_callback: Callable[[mido.Message],None]):
+    def __init__(self, channel: int, state: ChannelStateBlock):
         self.__channel: int = channel
-        
-        self.__midi_send = midi_out_callback
-        self.__color_callback = color_callback
-        
-        # Actual state variables
-        self.__display_text_list = [" "*7]*2
-        self.__display_color: int = XTouchColor.WHITE.value
-        self.__fader_pos: int = 0
-        self.__encoder_pos: int = 0
-        self.__encoder_mode: int = XTouchEncoderRing.DOT.value
-        self.__encoder_led: int = 0
-        self.__button_leds = [XTouchButtonLED.OFF.value]*4
-
-
-    
+        self.__state = state
+        self.__bit = 1 << channel
+
     @property
     def channel(self):
         """The channel number of the strip."""
         return self.__channel
-    
+
     @property
     def display_color(self):
-        return self.__display_color
-    
+        return self.__state.display_color[self.__channel]
+
     @display_color.setter
     def display_color(self, color: XTouchColor|int):
-        old_color = self.__display_color
         if isinstance(color, XTouchColor):
-            self.__display_color = color.value
-        elif isinstance(color, int):
-            self.__display_color = color
-        else:
+            color = color.value
+        elif not isinstance(color, int) or not 0 <= color <= 7:
             raise ValueError("Invalid color type")
-        if old_color != self.__display_color:
-            self.__color_callback()
-    
+        state = self.__state
+        with state.lock:
+            if state.display_color[self.__channel] != color:
+                state.display_color[self.__channel] = color
+                state.dirty_color = True
+
     @property
     def display_text(self):
-        return self.__display_text_list
-    
+        text = self.__state.display_text
+        offset = self.__channel * 7
+        return [text[offset:offset + 7].decode("ascii"), text[offset + 56:offset + 63].decode("ascii")]
+
     @display_text.setter
     def display_text(self, text_list: List[str]):
-        if not isinstance(text_list, List[str]):
+        if not isinstance(text_list, list) or not all(isinstance(t, str) for t in text_list):
             raise ValueError("Text list must be a list of strings")
         if len(text_list) != 2:
             raise ValueError("Text list must be of length 2")
-        i=0
-        for t in text_list:
+        for i, t in enumerate(text_list):
             if len(t) > 7:
                 raise ValueError(f"Text cannot be longer than 7 characters line:{i} text:{t}")
-            if any(ord(c) > 127 for c in t):
+            if not t.isascii():
                 raise ValueError(f"Text must be ASCII line:{i} text:{t}")
-            if t != self.__display_text_list[i]:
-                self.__display_text_list[i] = t
-                self.__midi_send(XTutils.text_display_message(t, ( self.__channel*7 + i*7*8 )))
-            i+=1
-    
+        state = self.__state
+        with state.lock:
+            for i, t in enumerate(text_list):
+                cell = self.__channel + i * 8
+                new = t.ljust(7).encode("ascii")
+                if state.display_text[cell * 7:cell * 7 + 7] != new:
+                    state.display_text[cell * 7:cell * 7 + 7] = new
+                    state.dirty_text |= 1 << cell
+
     @property
     def fader(self):
-        return self.__fader_pos
-    
+        return self.__state.fader[self.__channel]
+
     @fader.setter
     def fader(self, pos: int):
         if not isinstance(pos, int):
             raise ValueError("Fader position must be an integer")
         if pos < -8192 or pos > 8188:
             raise ValueError("Fader position out of range")
-        if pos != self.__fader_pos:
-            self.__fader_pos = pos
-            self.__midi_send(mido.Message('pitchwheel', channel=self.__channel, pitch=pos))
-    
+        state = self.__state
+        with state.lock:
+            if state.fader[self.__channel] != pos:
+                state.fader[self.__channel] = pos
+                state.dirty_fader |= self.__bit
+
     @property
     def fader_db(self):
-        return XTutils.fader_pos_to_db(self.__fader_pos)
-    
+        return XTutils.fader_pos_to_db(self.fader)
+
     @fader_db.setter
     def fader_db(self, db: float):
         if not isinstance(db, float):
             raise ValueError("Fader dB value must be a float")
         pos = XTutils.fader_db_to_pos(db)
         self.fader = int(pos)
-        
-    def __button_setter_factory(self, button: int):
-        def button_setter(state: XTouchButtonLED|int|bool):
+
+    def __button_setter_factory(button: int):
+        def button_setter(self, state: XTouchButtonLED|int|bool):
             if isinstance(state, XTouchButtonLED):
                 state = state.value
             elif isinstance(state, bool):
                 state = int(state)
             elif not (0 <= state <= 2):
                 raise ValueError("State must be between 0 and 2 or an instance of XTouchButtonLED or bool")
-            
-            if state != self.__button_leds[button]:
-                # nice one liner to set the button led velocity
-                # if state is 0 velocity is 0, if state is 1 velocity is 127, if state is 2 velocity is 1 (for blinking)
-                velocity = 1 if state == 2 else state*127
-                int_button = button * 8 + self.__channel
-                self.__button_leds[button] = state
-                self.__midi_send(mido.Message('control_change', channel=self.__channel, control=int_button, value=velocity))
+            note = button * 8 + self.channel
+            block = self.__state
+            with block.lock:
+                if block.button_leds[note] != state:
+                    block.button_leds[note] = state
+                    block.dirty_buttons |= 1 << note
         return button_setter
-    
-    def __button_getter_factory(self, button: int):
-        def button_getter():
-            return self.__button_leds[button]
+
+    def __button_getter_factory(button: int):
+        def button_getter(self):
+            return self.__state.button_leds[button * 8 + self.channel]
         return button_getter
-    
+
     rec_button = property(__button_getter_factory(0), __button_setter_factory(0), None, "The record button state")
     solo_button = property(__button_getter_factory(1), __button_setter_factory(1), None, "The solo button state")
     mute_button = property(__button_getter_factory(2), __button_setter_factory(2), None, "The mute button state")
     select_button = property(__button_getter_factory(3), __button_setter_factory(3), None, "The select button state")
-    
-    
-    def __update_encoder(self):
-        self.__midi_send(mido.Message('control_change', control=self.__channel + 48, value=self.__encoder_pos + self.__encoder_mode*16 + self.__encoder_led*64))
-    
+
+
+    def __set_encoder_field(self, field: array, value: int):
+        state = self.__state
+        with state.lock:
+            if field[self.__channel] != value:
+                field[self.__channel] = value
+                state.dirty_encoder |= self.__bit
+
     @property
     def encoder_mode(self):
-        return self.__encoder_mode
-    
+        return self.__state.encoder_mode[self.__channel]
+
     @encoder_mode.setter
     def encoder_mode(self, mode: XTouchEncoderRing|int):
         if isinstance(mode, XTouchEncoderRing):
             mode = mode.value
         elif not (0 <= mode <= 3):
             raise ValueError("Encoder mode must be between 0 and 3 or an instance of XTouchEncoderRing")
-        if mode != self.__encoder_mode:
-            self.__encoder_mode = mode
-            self.__update_encoder()
-    
+        self.__set_encoder_field(self.__state.encoder_mode, mode)
+
     @property
     def encoder_pos(self):
-        return self.__encoder_pos
-    
+        return self.__state.encoder_pos[self.__channel]
+
     @encoder_pos.setter
     def encoder_pos(self, pos: int):
         if not isinstance(pos, int):
             raise ValueError("Encoder position must be an integer")
         if not 0 <= pos <= 11:
             raise ValueError("Encoder position must be between 0 and 11")
-        if pos != self.__encoder_pos:
-            self.__encoder_pos = pos
-            self.__update_encoder()
-    
+        self.__set_encoder_field(self.__state.encoder_pos, pos)
+
     @property
     def encoder_led(self):
-        return self.__encoder_led
-    
+        return self.__state.encoder_led[self.__channel]
+
     @encoder_led.setter
     def encoder_led(self, led: int|bool):
         if isinstance(led, bool):
             led = int(led)
         elif not (((led == 0) or (led == 1)) and isinstance(led, int)):
             raise ValueError("Encoder LED must be between 0 or 1 or an instance of bool")
+        self.__set_encoder_field(self.__state.encoder_led, led)
 
-        if led != self.__encoder_led:
-            self.__encoder_led = led
-            self.__update_encoder()
-    
     def level_meter_impulse(self, level: int):
         if not isinstance(level, int):
             raise ValueError("Level must be an integer")
         if not 0 <= level <= 13:
             raise ValueError("Level must be between 0 and 13")
-        
+
         level = 14 if level == 13 else level
-        self.__midi_send(mido.Message("aftertouch", value=level + 16*self.__channel))
-        
-        
-    
-    
-    
\ No newline at end of file
+        state = self.__state
+        with state.lock:
+            state.level_meter[self.__channel] = level
+            state.dirty_level_meter |= self.__bit
@@ -1,4 +1,5 @@
 from enum import Enum
+import itertools
 
 class XTouchColor(Enum):
     """Enumeration for XTouch colors."""
@@ -31,114 +32,226 @@ class XTouchButtonLED(Enum):
     ON = 1
     BLINK = 2
     
+# Versions are unique across all states, equal versions always mean equal content
+_state_versions = itertools.count(1)
+
+_default_display_colors = (7,) * 8
+_default_display_text = " " * 112
+_default_button_leds = ((0,) * 4,) * 8
+_default_encoder_rings = ((0, 0, False),) * 8
+_default_faders = (-8192,) * 8
+
+
+class XTouchStateDiff:
+    """
+    Changes needed to get from one XTouch state to another.
+
+    display_colors is None or the new color tuple, all other fields are lists of changed items:
+    display_text (offset, text), button_leds (channel, button, state), encoder_rings (channel, (mode, value, light)) and faders (channel, pos).
+    """
+    __slots__ = ("display_colors", "display_text", "button_leds", "encoder_rings", "faders")
+
+    def __init__(self):
+        self.display_colors = None
+        self.display_text = []
+        self.button_leds = []
+        self.encoder_rings = []
+        self.faders = []
+
+    def __bool__(self):
+        return self.display_colors is not None or bool(self.display_text or self.button_leds or self.encoder_rings or self.faders)
+
+    def __repr__(self):
+        return f"XTouchStateDiff(display_colors={self.display_colors}, display_text={self.display_text}, button_leds={self.button_leds}, encoder_rings={self.encoder_rings}, faders={self.faders})"
+
+
+def _text_runs(old: str, new: str, merge_gap: int = 8):
+    """
+    Find the changed parts of the display text.
+    Runs closer than merge_gap characters are merged as a sysex message costs 8 bytes of framing.
+    """
+    runs = []
+    start = end = None
+    for i in range(min(len(old), len(new))):
+        if old[i] != new[i]:
+            if start is None:
+                start = i
+            elif i - end > merge_gap:
+                runs.append((start, new[start:end]))
+                start = i
+            end = i + 1
+    if start is not None:
+        runs.append((start, new[start:end]))
+    return runs
+
+
 class XTouchStateUnchecked:
-    def __init__(self, no_init=False):
-        if no_init:
-            return
-        self.display_colors = [7] * 8
-        self.display_text = " " * 112
-        self.button_leds = [[0] * 4 for _ in range(8)]
-        self.encoder_rings = [(0,0,False)] * 8
-        self.faders = [-8192] * 8
+    """
+    Immutable state of the XTouch surface.
+    All fields are tuples which are shared between states, use replace() to get a changed copy.
+    Every state gets a new version, so comparing and copying states is cheap.
+    """
+    __slots__ = ("display_colors", "display_text", "button_leds", "encoder_rings", "faders", "version")
+    fields = ("display_colors", "display_text", "button_leds", "encoder_rings", "faders")
+
+    def __init__(self, display_colors=None, display_text=None, button_leds=None, encoder_rings=None, faders=None):
+        self.__init_fields(self, {
+            "display_colors": _default_display_colors if display_colors is None else display_colors,
+            "display_text": _default_display_text if display_text is None else display_text,
+            "button_leds": _default_button_leds if button_leds is None else button_leds,
+            "encoder_rings": _default_encoder_rings if encoder_rings is None else encoder_rings,
+            "faders": _default_faders if faders is None else faders,
+        })
+
+    @staticmethod
+    def __init_fields(state, fields):
+        set_field = object.__setattr__
+        for name, value in fields.items():
+            if name == "display_text":
+                value = value.ljust(112)
+            elif name in ("button_leds", "encoder_rings"):
+                if not isinstance(value, tuple) or not all(isinstance(item, tuple) for item in value):
+                    value = tuple(tuple(item) for item in value)
+            elif not isinstance(value, tuple):
+                value = tuple(value)
+            set_field(state, name, value)
+        set_field(state, "version", next(_state_versions))
+
+    def __setattr__(self, name, value):
+        raise AttributeError("XTouch states are immutable, use replace()")
+
+    def replace(self, **changes):
+        """
+        Create a copy of the state with some fields replaced. Unchanged fields are shared.
+        :return: New state of the same type.
+        """
+        state = object.__new__(type(self))
+        fields = {name: getattr(self, name) for name in self.fields}
+        for name in changes:
+            if name not in fields:
+                raise AttributeError(f"Unknown XTouch state field: {name}")
+        fields.update(changes)
+        self.__init_fields(state, fields)
+        return state
 
     def __eq__(self, other):
-        return self.display_colors == other.display_colors and self.display_text == other.display_text and self.button_leds == other.button_leds and self.encoder_rings == other.encoder_rings and self.faders == other.faders
+        if self is other:
+            return True
+        if not isinstance(other, XTouchStateUnchecked):
+            return NotImplemented
+        if self.version == other.version:
+            return True
+        return all(getattr(self, name) is getattr(other, name) or getattr(self, name) == getattr(other, name) for name in self.fields)
 
     def copy(self):
         """
         Create a copy of the XTouch state.
+        States are immutable, so this is the state itself.
         :return: Copy of the XTouch state.
         """
-        state = XTouchStateUnchecked(no_init=True)
-        state.display_colors = self.display_colors.copy()
-        state.display_text = self.display_text
-        state.button_leds = [buttons.copy() for buttons in self.button_leds]
-        state.encoder_rings = self.encoder_rings.copy()
-        state.faders = self.faders.copy()
-        return state
+        return self
 
-class XTouchState:
-    def __init__(self, initial_state: XTouchStateUnchecked = XTouchStateUnchecked()):
-        self.__display_colors = initial_state.display_colors
-        self.__diplay_text = initial_state.display_text
-        self.__button_leds = initial_state.button_leds
-        self.__encoder_rings = initial_state.encoder_rings
-        self.__faders = initial_state.faders
-        
+    def diff(self, target: "XTouchStateUnchecked"):
+        """
+        Get the changes needed to get from this state to the target state.
+        Fields shared between both states are skipped without comparing them.
+        :param target: The state to go to.
+        :return: XTouchStateDiff
+        """
+        diff = XTouchStateDiff()
+        if self is target or self.version == target.version:
+            return diff
+        if self.display_colors is not target.display_colors and self.display_colors != target.display_colors:
+            diff.display_colors = target.display_colors
+        if self.display_text is not target.display_text and self.display_text != target.display_text:
+            diff.display_text = _text_runs(self.display_text, target.display_text)
+        if self.faders is not target.faders and self.faders != target.faders:
+            diff.faders = [(channel, pos) for channel, pos in enumerate(target.faders) if pos != self.faders[channel]]
+        if self.button_leds is not target.button_leds:
+            for channel in range(8):
+                old, new = self.button_leds[channel], target.button_leds[channel]
+                if old is not new and old != new:
+                    diff.button_leds.extend((channel, button, state) for button, state in enumerate(new) if state != old[button])
+        if self.encoder_rings is not target.encoder_rings and self.encoder_rings != target.encoder_rings:
+            diff.encoder_rings = [(channel, ring) for channel, ring in enumerate(target.encoder_rings) if ring != self.encoder_rings[channel]]
+        return diff
 
 
-    def __eq__(self, other):
-        return self.__display_colors == other.display_colors and self.__diplay_text == other.display_text and self.__button_leds == other.button_leds and self.__encoder_rings == other.encoder_rings and self.__faders == other.faders
-    
-    def copy(self):
+def _validate_display_text(text):
+    if len(text) > 112:
+        raise ValueError("Display text cannot be longer than 112 characters")
+    if not text.isascii():
+        raise ValueError("Display text must be ASCII")
+
+def _validate_display_colors(colors):
+    if len(colors) != 8:
+        raise ValueError("Color list must be of length 8")
+    if any(color not in range(8) for color in colors):
+        raise ValueError("Invalid color value")
+
+def _validate_button_leds(button_leds):
+    if len(button_leds) != 8:
+        raise ValueError("Button LED list must be of length 8")
+    if any(len(leds) != 4 for leds in button_leds):
+        raise ValueError("Each button LED list must be of length 4")
+    if any(led not in range(3) for leds in button_leds for led in leds):
+        raise ValueError("Invalid LED value")
+
+def _validate_encoder_rings(encoder_rings):
+    if len(encoder_rings) != 8:
+        raise ValueError("Encoder ring list must be of length 8")
+    if any(len(ring) != 3 for ring in encoder_rings):
+        raise ValueError("Each encoder ring list must be of length 3")
+    if any(ring[0] not in range(4) for ring in encoder_rings):
+        raise ValueError("Invalid encoder ring mode")
+    if any(ring[1] not in range(16) for ring in encoder_rings):
+        raise ValueError("Invalid encoder ring value")
+    if any(ring[2] not in [True, False] for ring in encoder_rings):
+        raise ValueError("Invalid encoder ring LED value")
+
+def _validate_faders(faders):
+    if len(faders) != 8:
+        raise ValueError("Fader list must be of length 8")
+    if any(not -8192 <= fader <= 8188 for fader in faders):
+        raise ValueError("Invalid fader value")
+
+
+class XTouchState(XTouchStateUnchecked):
+    """
+    Validated immutable state of the XTouch surface.
+    Only the fields that change are validated, states created from an XTouchState are not validated again.
+    """
+    __slots__ = ()
+    __validators = {
+        "display_colors": _validate_display_colors,
+        "display_text": _validate_display_text,
+        "button_leds": _validate_button_leds,
+        "encoder_rings": _validate_encoder_rings,
+        "faders": _validate_faders,
+    }
+
+    def __init__(self, initial_state: XTouchStateUnchecked = None, validate: bool = True):
         """
-        Create a copy of the XTouch state.
-        :return: Copy of the XTouch state.
+        :param initial_state: The state to take the fields and version from. Default state if None.
+        :param validate: Validate the fields. Skipped for XTouchState instances as they are already valid.
+        :raises ValueError: If a field is invalid.
         """
-        state = XTouchState()
-        state.display_colors = self.display_colors.copy()
-        state.display_text = self.display_text
-        state.button_leds = self.button_leds.copy()
-        state.encoder_rings = self.encoder_rings.copy()
-        state.faders = self.faders.copy()
-        return state
-    
-    @property
-    def display_text(self):
-        return self.__diplay_text
-    @display_text.setter
-    def display_text(self, text: str):
-        if len(text) > 112:
-            raise ValueError("Display text cannot be longer than 112 characters")
-        if any(ord(c) > 127 for c in text):
-            raise ValueError("Display text must be ASCII")
-        self.__diplay_text = text
-    @property
-    def display_colors(self):
-        return self.__display_colors
-    @display_colors.setter
-    def display_colors(self, colors: list):
-        if len(colors) != 8:
-            raise ValueError("Color list must be of length 8")
-        if any(color not in range(8) for color in colors):
-            raise ValueError("Invalid color value")
-        self.__display_colors = colors
-    @property
-    def button_leds(self):
-        return self.__button_leds
-    @button_leds.setter
-    def button_leds(self, button_leds: list):
-        if len(button_leds) != 8:
-            raise ValueError("Button LED list must be of length 8")
-        if any(len(leds) != 4 for leds in button_leds):
-            raise ValueError("Each button LED list must be of length 4")
-        if any(led not in range(3) for leds in button_leds for led in leds):
-            raise ValueError("Invalid LED value")
-        self.__button_leds = button_leds
-    @property
-    def encoder_rings(self):
-        return self.__encoder_rings
-    @encoder_rings.setter
-    def encoder_rings(self, encoder_rings: list):
-        if len(encoder_rings) != 8:
-            raise ValueError("Encoder ring list must be of length 8")
-        if any(len(ring) != 3 for ring in encoder_rings):
-            raise ValueError("Each encoder ring list must be of length 3")
-        if any(ring[0] not in range(4) for ring in encoder_rings):
-            raise ValueError("Invalid encoder ring mode")
-        if any(ring[1] not in range(16) for ring in encoder_rings):
-            raise ValueError("Invalid encoder ring value")
-        if any(ring[2] not in [True, False] for ring in encoder_rings):
-            raise ValueError("Invalid encoder ring LED value")
-        self.__encoder_rings = encoder_rings
-
-    @property
-    def faders(self):
-        return self.__faders
-    @faders.setter
-    def faders(self, faders: list):
-        if len(faders) != 8:
-            raise ValueError("Fader list must be of length 8")
-        if any(fader not in range(-8192, 8188) for fader in faders):
-            raise ValueError("Invalid fader value")
-        self.__faders = faders
+        if initial_state is None:
+            initial_state = XTouchStateUnchecked()
+        elif validate and not isinstance(initial_state, XTouchState):
+            for name in self.fields:
+                self.__validators[name](getattr(initial_state, name))
+        set_field = object.__setattr__
+        for name in self.fields + ("version",):
+            set_field(self, name, getattr(initial_state, name))
+
+    def replace(self, **changes):
+        """
+        Create a copy of the state with some fields replaced. Only the replaced fields are validated.
+        :return: New XTouchState.
+        :raises ValueError: If a field is invalid.
+        """
+        for name, value in changes.items():
+            if name in self.__validators:
+                self.__validators[name](value)
+        return super().replace(**changes)
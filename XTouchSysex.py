@@ -0,0 +1,66 @@
+from threading import Lock
+
+__all__ = ["SysexTemplates"]
+
+
+class SysexTemplates:
+    """
+    Preallocated sysex frames for the X-Touch.
+    The builders patch their frame in place and return a memoryview of it, no lists or messages are built.
+    A returned view is only valid until the next call of the same builder, hold lock while building and sending.
+    """
+    sysex_prefix = b"\xF0\x00\x00\x66\x15"
+    sysex_suffix = 0xF7
+    display_command = 0x12
+    color_command = 0x72
+    version_query_command = 0x13
+    display_length = 112
+    # Prefix, command and offset
+    __display_header = len(sysex_prefix) + 2
+    __color_header = len(sysex_prefix) + 1
+
+    def __init__(self):
+        self.lock = Lock()
+        self.__display = bytearray(self.sysex_prefix + bytes([self.display_command, 0x00]) + b" " * self.display_length + bytes([self.sysex_suffix]))
+        self.__display_view = memoryview(self.__display)
+        self.__color = bytearray(self.sysex_prefix + bytes([self.color_command]) + b"\x07" * 8 + bytes([self.sysex_suffix]))
+        self.__color_view = memoryview(self.__color)
+        self.__version_query = memoryview(self.sysex_prefix + bytes([self.version_query_command, 0x00, self.sysex_suffix]))
+
+    def display_text(self, offset: int, text: str | bytes | bytearray | memoryview):
+        """
+        Patch the display text frame.
+
+        :param offset: Offset of the first character (0-111).
+        :param text: ASCII text or bytes to display.
+        :return: memoryview of the complete sysex message.
+        :raises ValueError: If the text does not fit on the display.
+        """
+        length = len(text)
+        if offset < 0 or offset + length > self.display_length:
+            raise ValueError("Text and offset exceed display length of 112 characters")
+        if isinstance(text, str):
+            text = text.encode("ascii")
+        start = self.__display_header
+        frame = self.__display
+        frame[start - 1] = offset
+        self.__display_view[start:start + length] = text
+        # The end byte moves with the text length, whatever is behind it is not sent
+        frame[start + length] = self.sysex_suffix
+        return self.__display_view[:start + length + 1]
+
+    def display_colors(self, colors):
+        """
+        Patch the display color frame.
+
+        :param colors: 8 color values (0-7).
+        :return: memoryview of the complete sysex message.
+        """
+        start = self.__color_header
+        self.__color[start:start + 8] = colors
+        return self.__color_view
+
+    @property
+    def version_query(self):
+        """memoryview of the version query message. It never changes."""
+        return self.__version_query
@@ -1,12 +1,17 @@
 from XTouchLib import *
 import logging
 import voicemeeterlib as voicemeeter
-from threading import Thread
+from threading import Thread, Lock, RLock
 import time
 import XTouchVMinterface as xtvmi
 import XtouchVMconfig as xtcfg
+import XTouchVMrender as xtrender
+import XTouchVMprofiler as xtprof
+import XTouchVMscenes as xtscenes
+import XTouchVMautomation as xtauto
 import mido
 import islocked
+import sys
 from enum import Enum
 
 
@@ -44,6 +49,126 @@ class Scheduler:
     def clear(self):
         self.tasks = []
 
+class TickExecutor:
+    """
+    Runs the work of one tick in priority order within a time budget.
+    Every job returns whether it had something to do, its cost is tracked as a moving average of those runs.
+    A job that is not expected to fit into what is left of the budget is deferred to the next tick instead of
+    running late. After max_deferrals ticks in a row it runs anyway, so low priorities never starve.
+    """
+    def __init__(self, budget: float = 0.08, max_deferrals: int = 5, alpha: float = 0.2):
+        """
+        :param budget: Seconds per tick the jobs may take.
+        :param max_deferrals: Ticks a job may be deferred in a row.
+        :param alpha: Weight of the latest run in the cost average.
+        """
+        self.budget = budget
+        self.max_deferrals = max_deferrals
+        self.alpha = alpha
+        # [priority, name, job, estimated cost, deferred in a row]
+        self.__jobs = []
+        self.deferrals = {}
+        self.overruns = 0
+
+    def add_job(self, name: str, priority: int, job):
+        """
+        :param name: Name used in the report.
+        :param priority: Lower runs first.
+        :param job: Callable without arguments returning True if it did some work.
+        """
+        self.__jobs.append([priority, name, job, 0.0, 0])
+        self.__jobs.sort(key=lambda entry: entry[0])
+        self.deferrals[name] = 0
+
+    def run_tick(self):
+        """
+        Run the jobs of one tick.
+
+        :return: Seconds taken.
+        """
+        start = time.perf_counter()
+        for index, entry in enumerate(self.__jobs):
+            priority, name, job, cost, deferred = entry
+            elapsed = time.perf_counter() - start
+            # The highest priority always runs
+            if index > 0 and elapsed + cost > self.budget and deferred < self.max_deferrals:
+                entry[4] += 1
+                self.deferrals[name] += 1
+                continue
+            entry[4] = 0
+            job_start = time.perf_counter()
+            if job():
+                entry[3] = cost + self.alpha * (time.perf_counter() - job_start - cost)
+        taken = time.perf_counter() - start
+        if taken > self.budget:
+            self.overruns += 1
+        return taken
+
+    def report(self):
+        costs = ", ".join(f"{name} {cost * 1000:.1f}ms" for priority, name, job, cost, deferred in self.__jobs)
+        deferrals = ", ".join(f"{name} {count}" for name, count in self.deferrals.items())
+        return f"Tick costs: {costs}; deferrals: {deferrals}; overruns: {self.overruns}"
+
+class FaderArbiter:
+    """
+    Decides when the motor faders may follow Voicemeeter.
+    A touched fader is held where the hand put it, after release it settles for a moment
+    before one reconciling position is sent. Positions within tolerance are not sent at all.
+    """
+    def __init__(self, settle_time: float = 0.3, tolerance: int = 32):
+        """
+        :param settle_time: Seconds a released fader is still held, Voicemeeter needs a tick to report the final gain.
+        :param tolerance: Pitchbend distance between hand and target that is not worth moving the motor for.
+        """
+        self.settle_time = settle_time
+        self.tolerance = tolerance
+        self.__touched = [False] * 8
+        self.__settle_until = {}
+        self.__lock = Lock()
+        self.suppressed = 0
+
+    def touch(self, channel: int, state: bool):
+        with self.__lock:
+            self.__touched[channel] = state
+            if state:
+                self.__settle_until.pop(channel, None)
+            else:
+                self.__settle_until[channel] = time.monotonic() + self.settle_time
+
+    def held(self, channel: int, now: float = None):
+        now = time.monotonic() if now is None else now
+        return self.__touched[channel] or self.__settle_until.get(channel, 0) > now
+
+    def expire(self, now: float = None):
+        """
+        End the settle windows whose time is up.
+
+        :return: True if a fader was released and needs reconciling.
+        """
+        now = time.monotonic() if now is None else now
+        with self.__lock:
+            settled = [channel for channel, until in self.__settle_until.items() if until <= now]
+            for channel in settled:
+                del self.__settle_until[channel]
+        return bool(settled)
+
+    def arbitrate(self, target, device):
+        """
+        Replace the target positions that must not be sent by the device positions.
+
+        :param target: Target positions of the 8 faders.
+        :param device: Positions the device is known to be at.
+        :return: tuple of positions
+        """
+        now = time.monotonic()
+        faders = []
+        for channel, (target_pos, device_pos) in enumerate(zip(target, device)):
+            if not target_pos == device_pos and (self.held(channel, now) or abs(target_pos - device_pos) <= self.tolerance):
+                self.suppressed += 1
+                target_pos = device_pos
+            faders.append(target_pos)
+        return tuple(faders)
+
 class MatrixMode:
     def __init__(self, xtouch: XTouch, vm = voicemeeter.api("potato")):
         self.terminate = False
@@ -54,37 +179,76 @@ class MatrixMode:
 
 
 class App:
-    def __init__(self, vme = voicemeeter.api("potato")):
+    def __init__(self, vme = voicemeeter.api("potato"), profile_vm: bool = False, lock_provider: islocked.LockProvider = None):
+        """
+        :param vme: Logged in voicemeeterlib api.
+        :param profile_vm: Count and time every Voicemeeter api access and log a report every 10 seconds.
+        :param lock_provider: Source of the screen lock state, defaults to islocked.default_provider().
+        """
         self.xt = XTouch()
         self.running = True
-        vme.event.pdirty = True
-        vme.event.ldirty = True
-        self.vm = vme
-        
-        self.invoke_full_refresh = False
-        self.scheduler = Scheduler()
-        self.levels = [0] * 16
-        self.channel_mount_list_list_default = [[3,4,5,6,7,9,10,12],[8,9,10,11,12,13,14,15],[0,1,2,3,4,5,6,7]]
-        self.channel_mount_list_list_names = ["Home","Outputs","Inputs"]
-        self.channel_mount_list_list = [list.copy() for list in self.channel_mount_list_list_default]
-        self.channel_mount_list_index = 0
-        self.channel_mount_list = self.channel_mount_list_list[0]
+        self.closed = False
+        self.close_lock = Lock()
+        self.lock_provider = lock_provider if lock_provider is not None else islocked.default_provider()
+        try:
+            self.vm_stats = None
+            if profile_vm:
+                self.vm_stats = xtprof.VMCallStats()
+                vme = xtprof.VMProxy(vme, self.vm_stats)
+            vme.event.pdirty = True
+            vme.event.ldirty = True
+            self.vm = vme
         
-        self.shortcut_mode = 0
-        self.shortcut_text_default = "Mode"
-        self.shortcut_text = self.shortcut_text_default
+            self.invoke_full_refresh = False
+            # Set on unlock, the mirror has to be read again before the refresh
+            self.resync = False
+            self.scheduler = Scheduler()
+            self.levels = [0] * 16
+            self.channel_mount_list_list_default = [[3,4,5,6,7,9,10,12],[8,9,10,11,12,13,14,15],[0,1,2,3,4,5,6,7]]
+            self.channel_mount_list_list_names = ["Home","Outputs","Inputs"]
+            self.channel_mount_list_list = [list.copy() for list in self.channel_mount_list_list_default]
+            self.channel_mount_list_index = 0
+            self.channel_mount_list = self.channel_mount_list_list[0]
         
-        self.denoiser_text_default = "Dnoiser"
-        self.denoiser_text = self.denoiser_text_default
+            self.shortcut_mode = 0
+            # Texts temporarily replacing display cells
+            self.overlays = xtrender.OverlayLayer()
+            self.render_lock = RLock()
+            self.arbiter = FaderArbiter()
+            # Set when the controls or the displays have to be brought to the target state on the next tick
+            self.controls_pending = False
+            self.display_pending = False
+            self.executor = TickExecutor()
+            self.executor.add_job("controls", 0, self.reconcile_controls)
+            self.executor.add_job("meters", 1, self.reconcile_levels)
+            self.executor.add_job("displays", 2, self.reconcile_displays)
+            self.executor.add_job("housekeeping", 3, self.housekeeping)
         
-        self.vmint = xtvmi.VMInterfaceFunctions(self.vm)
-        self.vmstate = xtvmi.VMInterfaceFunctions.VMState()
-        self.slockd = self.ScreenLockDetector(xtouch=self.xt)
-        self.set_callbacks()
-        self.config = xtcfg.Config()
-        self.vmstate.sync(self.vm)
-        self.update_parameters()
-        self.update_displays()
+            self.vmint = xtvmi.VMInterfaceFunctions(self.vm)
+            self.vmstate = xtvmi.VMInterfaceFunctions.VMState()
+            self.slockd = self.ScreenLockDetector(xtouch=self.xt, provider=self.lock_provider)
+            self.lock_provider.add_listener(self.lock_changed)
+            self.set_callbacks()
+            self.config = xtcfg.Config()
+            self.frames = xtrender.PageFrames(self.config)
+            self.config_changed = False
+            self.config_service = xtcfg.ConfigService(self.config)
+            self.config_service.add_listener(self.config_changed_callback)
+            self.scenes = xtscenes.SceneEngine(self.vm, self.config, self.vmstate)
+            # Automation lanes per Voicemeeter channel, REC arms a lane, SELECT plays all lanes
+            self.automation_lanes = {channel: xtauto.AutomationLane(channel) for channel in range(16)}
+            self.automation_armed = set()
+            self.automation_player = xtauto.AutomationPlayer(self.play_automation_moves)
+            self.sync()
+            self.redraw()
+            # The background threads start last, a construction that failed before leaves none running
+            self.lock_provider.start()
+            self.config_service.start()
+        except BaseException:
+            # The caller gets no App to close
+            self.lock_provider.stop()
+            self.xt.close()
+            raise
         
 
     def set_callbacks(self):
@@ -96,143 +260,228 @@ class App:
                                 encoder_press_callback=self.encoder_press_callback)
 
     def close(self):
+        """Stop the background threads and close the X-Touch, calls after the first do nothing."""
+        with self.close_lock:
+            if self.closed:
+                return
+            self.closed = True
         self.running = False
+        self.lock_provider.stop()
+        self.config_service.stop()
+        self.automation_player.stop()
         self.xt.close()
         time.sleep(0.1)
         del self.xt
 
-    def update_displays(self):
-        self.xt.set_display_text(0, 0, self.channel_mount_list_list_names[self.channel_mount_list_index])
-        self.xt.set_display_text(2, 0, self.shortcut_text)
-        if self.channel_mount_list_index == 0:
-            self.xt.set_display_text(1, 0, self.denoiser_text)
+    def config_changed_callback(self, channels: set[int]):
+        # Called from the watcher thread, the frames are rebuilt on the next tick
+        self.config_changed = True
+
+    def lock_changed(self, locked: bool):
+        if not locked:
+            # Polling was paused, catch up with everything that changed meanwhile
+            self.resync = True
+            self.invoke_full_refresh = True
+
+    def page(self, index):
+        return xtrender.Page(index, self.channel_mount_list_list_names[index], tuple(self.channel_mount_list_list[index]))
+
+    def current_page(self):
+        return self.page(self.channel_mount_list_index)
+
+    def sync(self):
+        """Read the Voicemeeter parameters and keep the frames of all pages up to date."""
+        if self.vmstate.sync(self.vm):
+            self.frames.warm(self.vmstate, [self.page(i) for i in range(len(self.channel_mount_list_list))])
+
+    def render(self):
+        """Render the target state from the Voicemeeter mirror."""
+        target = self.frames.render(self.vmstate, self.current_page(),
+                                    overlays=self.overlays, shortcut_active=not self.shortcut_mode == 0)
+        faders = self.arbiter.arbitrate(target.faders, self.xt.state.faders)
+        if not faders == target.faders:
+            target = target.replace(faders=faders)
+        if self.automation_armed or self.automation_player.playing:
+            target = target.replace(button_leds=self.automation_leds(target.button_leds))
+        return target
+
+    def automation_leds(self, button_leds):
+        """Light REC on armed channels and SELECT on channels being played back."""
+        playing = self.automation_player.playing
+        leds = []
+        for channel, channel_leds in enumerate(button_leds):
+            vchannel = self.channel_mount_list[channel]
+            channel_leds = list(channel_leds)
+            if vchannel in self.automation_armed:
+                channel_leds[XTouchButton.REC.value] = XTouchButtonLED.ON.value
+            if playing and len(self.automation_lanes[vchannel]):
+                channel_leds[XTouchButton.SELECT.value] = XTouchButtonLED.ON.value
+            leds.append(tuple(channel_leds))
+        return tuple(leds)
+
+    def toggle_automation_arm(self, vchannel):
+        if vchannel in self.automation_armed:
+            self.automation_armed.discard(vchannel)
+            if not self.automation_armed:
+                self.automation_player.stop_recording()
         else:
-            self.xt.set_display_text(1, 0, " ")
-        colors = [0] * 8
-        for i in range(8):
-            chanconfig = self.config.settings["channels"][self.channel_mount_list[i]]
-            colors[i] = chanconfig["color"]
-            self.xt.set_display_text(i, 1, chanconfig["name"])
-        self.xt.set_raw_display_color(colors)
-    
+            self.automation_player.stop()
+            self.automation_lanes[vchannel].arm(self.automation_player.start_recording())
+            self.automation_armed.add(vchannel)
+
+    def toggle_automation_playback(self):
+        if self.automation_player.playing:
+            self.automation_player.stop()
+        else:
+            self.automation_armed.clear()
+            self.automation_player.stop_recording()
+            self.automation_player.play(self.automation_lanes.values())
+
+    def record_automation(self, vchannel, kind: xtauto.AutomationKind, value: float):
+        if vchannel in self.automation_armed:
+            self.automation_lanes[vchannel].record(kind, value)
+
+    def play_automation_moves(self, moves):
+        """
+        Sink of the automation player, runs in its thread.
+        All moves of a tick go to Voicemeeter in one request, mounted gains also move the motor faders.
+        """
+        script = []
+        faders = {}
+        for vchannel, kind, value in moves:
+            name = f"Strip[{vchannel}]" if self.vmint.is_strip(vchannel) else f"Bus[{vchannel - 8}]"
+            if kind == xtauto.AutomationKind.GAIN.value:
+                script.append(f"{name}.Gain={value:.1f}")
+                if vchannel in self.channel_mount_list:
+                    faders[self.channel_mount_list.index(vchannel)] = value
+            elif kind == xtauto.AutomationKind.MUTE.value:
+                script.append(f"{name}.Mute={int(value)}")
+            elif kind == xtauto.AutomationKind.SOLO.value:
+                script.append(f"{name}.Solo={int(value)}")
+        self.vm.sendtext(";".join(script))
+        with self.render_lock:
+            for channel, value in faders.items():
+                if not self.arbiter.held(channel):
+                    self.xt.set_fader(channel, pos=XTouch.fader_db_to_pos(min(8, value)))
+
+    def show_overlay(self, cell, text, duration=None):
+        """Show an overlay and write only its display cell, the next render keeps it."""
+        self.overlays.show(cell, text, duration)
+        with self.render_lock:
+            self.xt.set_display_text(cell[0], cell[1], xtrender.cell_text(text))
+
+    def redraw(self):
+        """Render the target state and send what differs from the device."""
+        with self.render_lock:
+            self.xt.state = self.render()
+
+    def reconcile_controls(self):
+        """Tick job: bring faders, LEDs and encoder rings to the target state."""
+        if self.vm.pdirty:
+            self.sync()
+            self.display_pending = True
+        elif not self.controls_pending:
+            return False
+        self.controls_pending = False
+        with self.render_lock:
+            target = self.render()
+            self.xt.state = self.xt.state.replace(faders=target.faders, button_leds=target.button_leds,
+                                                  encoder_rings=target.encoder_rings)
+        return True
+
+    def reconcile_displays(self):
+        """Tick job: bring display texts and colors to the target state."""
+        if not self.display_pending:
+            return False
+        self.display_pending = False
+        with self.render_lock:
+            target = self.render()
+            self.xt.state = self.xt.state.replace(display_text=target.display_text, display_colors=target.display_colors)
+        return True
+
+    def reconcile_levels(self):
+        """Tick job: update the level meters."""
+        if not self.vm.ldirty:
+            return False
+        self.update_levels()
+        return True
+
+    def housekeeping(self):
+        """Tick job: due scheduler tasks, fader settle windows and overlay expiry."""
+        self.scheduler.run_due()
+        if self.config_changed:
+            self.config_changed = False
+            self.frames.invalidate()
+            # The diff against the device sends only the cells of the changed channels
+            self.display_pending = True
+        if self.arbiter.expire():
+            self.controls_pending = True
+        if self.overlays.expire():
+            self.display_pending = True
+        return True
+
     def update_levels(self):
         for i in range(8):
             level = level_interpolation(self.vmint.get_level(self.channel_mount_list[i]))
             if not level == 0:
                 self.xt.set_level_meter(i, level)
-                
-    def update_parameters(self):
-        any_solos = False
-        for i in range(8):
-            channel = self.channel_mount_list[i]
-            params = self.vmint.get_channel_params(channel)
-            self.xt.set_button_led(i, XTouchButton.MUTE, params.mute)
-            if self.vmint.is_strip(channel):
-                self.xt.set_button_led(i, XTouchButton.SOLO, params.solo)
-                if params.solo:
-                    any_solos = True
-            self.xt.set_fader(i, db=min(8,params.gain))
-        if any_solos:
-            for i in range(8):
-                channel = self.channel_mount_list[i]
-                if self.vmint.is_strip(channel):
-                    params = self.vmint.get_channel_params(channel)
-                    if not params.solo and not params.mute:
-                        self.xt.set_button_led(i, XTouchButton.MUTE, XTouchButtonLED.BLINK)
-        self.update_encoder_rings()
 
     def full_refresh(self):
-        self.update_parameters()
-        self.update_displays()
-        self.update_levels()
-        self.update_encoder_rings()
-        self.invoke_full_refresh = False
+        with self.render_lock:
+            self.invoke_full_refresh = False
+            self.redraw()
+            self.update_levels()
         
     def run(self):
         time_taken = 0
         while self.running:
             time_start = time.time()
-            if self.invoke_full_refresh:
+            if self.lock_provider.locked:
+                # Nobody is looking, leave meters and Voicemeeter alone until the screen is unlocked
+                pass
+            elif self.invoke_full_refresh:
+                if self.resync:
+                    self.resync = False
+                    self.sync()
                 self.full_refresh()
             else:
-                if self.vm.ldirty:
-                    self.update_levels()
-                if self.vm.pdirty:
-                    self.update_parameters()
-            self.scheduler.run_due()
+                self.executor.run_tick()
             time_taken = time.time()-time_start
+            if self.vm_stats is not None:
+                self.vm_stats.tick()
+                if self.vm_stats.ticks % 100 == 0:
+                    logging.info(self.vm_stats.report())
             if time_taken < 0.1:
                 time.sleep(0.1-time_taken)
             else:
-                logging.warning(f"LAG: Time taken: {time_taken} seconds")
-    
+                logging.warning(f"LAG: Time taken: {time_taken} seconds. {self.executor.report()}")
     
-    def shortcut_functions(self):
-        '''
-        shortcut functions changing multiple parameters at once
-        '''
-        def vr_mode(self: App):
-            self.vm.strip[0].mute = True
-            self.vm.strip[1].mute = False
-            self.vm.bus[4].mute = False
-            self.vm.bus[2].mute = True
-            self.vm.bus[3].mute = True
-        
-        def desktop_mode(self: App):
-            self.vm.strip[0].mute = False
-            self.vm.strip[1].mute = True
-            self.vm.bus[4].mute = True
-            self.vm.bus[2].mute = False
-            self.vm.bus[3].mute = False
-        return [
-            ("DESKTOP", desktop_mode),
-            ("VR", vr_mode),
-            ]
     
     def shortcut_callback(self):
+        """Recall the next scene of the config."""
+        names = self.scenes.names
+        if not names:
+            return
         self.shortcut_mode += 1
-        if self.shortcut_mode >= len(self.shortcut_functions()):
+        if self.shortcut_mode >= len(names):
             self.shortcut_mode = 0
-        self.shortcut_functions()[self.shortcut_mode][1](self)
-        self.shortcut_text = self.shortcut_functions()[self.shortcut_mode][0]
-        def reset_shortcut_text():
-            self.shortcut_text = self.shortcut_text_default
-            self.update_displays()
-        self.scheduler.cancel_task("reset_shortcut_text")
-        self.scheduler.add_task(reset_shortcut_text, 10, "reset_shortcut_text")
-    
-    def update_encoder_rings(self):
-        #channel 1 encoder ring
-        if self.channel_mount_list_index == 0:
-            self.xt.set_encoder_ring(channel=0, value=0, mode=XTouchEncoderRing.WRAP)
-        elif self.channel_mount_list_index == 2:
-            self.xt.set_encoder_ring(channel=0, value=1, mode=XTouchEncoderRing.PAN)
-        elif self.channel_mount_list_index == 1:
-            self.xt.set_encoder_ring(channel=0, value=11, mode=XTouchEncoderRing.PAN)
-        
-        #channel 2 encoder ring
-        self.xt.set_encoder_ring(channel=1, value=int(self.vm.strip[4].denoiser.knob) + 1, mode=XTouchEncoderRing.WRAP, light=False)
-        
-        #channel 3 encoder ring
-        self.xt.set_encoder_ring(channel=2, value=0, mode=XTouchEncoderRing.WRAP, light=(not self.shortcut_mode == 0))
+        self.scenes.recall(names[self.shortcut_mode])
+        self.overlays.show(xtrender.shortcut_label_cell, names[self.shortcut_mode], 10)
+        self.redraw()
     
     def encoder_callback(self, channel, ticks):
         if channel == 0:
             self.channel_mount_list_index -= ticks
             self.channel_mount_list_index = self.channel_mount_list_index % len(self.channel_mount_list_list)
             self.channel_mount_list = self.channel_mount_list_list[self.channel_mount_list_index]
-            self.invoke_full_refresh = True
+            # The frames of all pages are cached, flip right away, the meters follow on the next tick
+            self.redraw()
         elif channel == 1:
             if self.channel_mount_list_index == 0:
                 nv = self.vm.strip[4].denoiser.knob - ticks
                 self.vm.strip[4].denoiser.knob = min(10, max(0, nv))
-                self.denoiser_text = f"{self.vm.strip[4].denoiser.knob}".rjust(7)
-                self.invoke_full_refresh = True
-                self.scheduler.cancel_task("reset_denoiser_text")
-                def reset_denoiser_text():
-                    self.denoiser_text = self.denoiser_text_default
-                    self.update_displays()
-                self.scheduler.add_task(reset_denoiser_text, 5, "reset_denoiser_text")
+                self.overlays.show(xtrender.denoiser_label_cell, f"{self.vm.strip[4].denoiser.knob}".rjust(7), 5)
+                self.redraw()
         elif 6 <= channel <= 7:
             vchannel = self.channel_mount_list[channel]
             new_channel = (vchannel - ticks) % 16
@@ -244,10 +493,9 @@ class App:
         if state and channel == 0:
             self.channel_mount_list_index = 0
             self.channel_mount_list = self.channel_mount_list_list[self.channel_mount_list_index]
-            self.invoke_full_refresh = True
+            self.redraw()
         if state and channel == 2:
             self.shortcut_callback()
-            self.invoke_full_refresh = True
         if state and channel == 7:
             self.channel_mount_list[channel] = self.channel_mount_list_list_default[self.channel_mount_list_index][channel]
             self.invoke_full_refresh = True
@@ -259,10 +507,14 @@ class App:
             self.invoke_full_refresh = True
     
     def fader_touch_callback(self, channel, state, time_pressed):
+        self.arbiter.touch(channel, state)
         if state:
-            self.xt.set_display_text(channel, 1, f"{self.vmint.get_channel_params(self.channel_mount_list[channel]).gain:.1f}dB".rjust(7))
+            self.show_overlay((channel, 1), f"{self.vmint.get_channel_params(self.channel_mount_list[channel]).gain:.1f}dB".rjust(7))
         else:
-            self.update_displays()
+            # The tick puts the label back and moves the fader once it settled
+            self.overlays.hide((channel, 1))
+            self.display_pending = True
+            self.controls_pending = True
 
 
     def button_callback(self, channel: int, button: XTouchButton, state: bool, time_pressed: float):
@@ -271,11 +523,19 @@ class App:
                 channel = self.channel_mount_list[channel]
                 params = self.vmint.get_channel_params(channel)
                 params.mute = not params.mute
+                self.record_automation(channel, xtauto.AutomationKind.MUTE, params.mute)
             elif button == XTouchButton.SOLO:
                 channel = self.channel_mount_list[channel]
                 if self.vmint.is_strip(channel):
                     params = self.vmint.get_channel_params(channel)
                     params.solo = not params.solo
+                    self.record_automation(channel, xtauto.AutomationKind.SOLO, params.solo)
+            elif button == XTouchButton.REC:
+                self.toggle_automation_arm(self.channel_mount_list[channel])
+                self.redraw()
+            elif button == XTouchButton.SELECT:
+                self.toggle_automation_playback()
+                self.redraw()
 
 
 
@@ -283,39 +543,41 @@ class App:
         vchannel = self.channel_mount_list[channel]
         params = self.vmint.get_channel_params(vchannel)
         params.gain = max(-60,round(db,1))
-        self.xt.set_display_text(channel, 1, f"{params.gain:.1f}dB".rjust(7))
+        self.record_automation(vchannel, xtauto.AutomationKind.GAIN, params.gain)
+        # Runs for every pitchwheel message of a move, only the gain cell is written here
+        self.show_overlay((channel, 1), f"{params.gain:.1f}dB".rjust(7))
 
 
 
 
 
     class ScreenLockDetector:
-        def __init__(self, xtouch: XTouch):
-            self.next_check = time.time()
-            self.locked = False
+        def __init__(self, xtouch: XTouch, provider: islocked.LockProvider):
             self.note_count = 0
             self.xt = xtouch
+            self.provider = provider
             self.xtstate_backup = self.xt.state
             self.message_is_displayed = False
+            self.provider.add_listener(self.lock_changed)
+
+        @property
+        def locked(self):
+            return self.provider.locked
+
+        def lock_changed(self, locked: bool):
+            if not locked and self.message_is_displayed:
+                self.xt.state = self.xtstate_backup
+                self.message_is_displayed = False
             
         def direct_midi_hook(self, msg: mido.Message):
-            if time.time() > self.next_check:
-                if islocked.islocked():
-                    self.locked = True
-                    self.next_check = time.time() + 1
-                else:
-                    self.locked = False
-                    self.next_check = time.time() + 1
-                    if self.message_is_displayed:
-                        self.xt.state = self.xtstate_backup
-                        self.message_is_displayed = False
+            # Only reads the flag published by the provider, no system calls on the MIDI thread
+            locked = self.provider.locked
             if msg.type == "note_on":
-                prev_note_count = self.note_count
                 if msg.velocity == 0:
                     self.note_count -= 1
                 else:
                     self.note_count += 1
-                if self.locked:
+                if locked:
                     if self.message_is_displayed and self.note_count == 0:
                         self.xt.state = self.xtstate_backup
                         self.message_is_displayed = False
@@ -324,12 +586,12 @@ class App:
                         self.xt.set_raw_display_color([XTouchColor.RED]*8)
                         self.xt.set_raw_display_text(0, ("SCREEN SYSTEM "*4+"LOCKED SPERRE "*4))
                         self.message_is_displayed = True
-            return self.locked
+            return locked
 
 if __name__ == "__main__":
     logging.basicConfig(level=logging.INFO)
     with voicemeeter.api("potato") as vm:
-        app = App(vme=vm)
+        app = App(vme=vm, profile_vm="--profile-vm" in sys.argv)
         try:
             app.run()
         except Exception as e:
@@ -0,0 +1,233 @@
+import logging
+import time
+from array import array
+from enum import Enum
+from threading import Event, Lock, Thread
+from typing import Callable, Iterable
+
+__all__ = ["AutomationKind", "AutomationLane", "TimerWheel", "AutomationPlayer"]
+
+
+class AutomationKind(Enum):
+    """Enumeration for the recorded parameters."""
+    GAIN = 0
+    MUTE = 1
+    SOLO = 2
+
+
+class AutomationLane:
+    """
+    Recorded moves of one Voicemeeter channel (0-15), stored in parallel arrays sorted by time.
+    Times are seconds since the origin the lane was armed with.
+    """
+
+    def __init__(self, channel: int):
+        self.channel = channel
+        self.times = array("d")
+        self.kinds = array("b")
+        self.values = array("d")
+        self.origin = time.monotonic()
+
+    def arm(self, origin: float = None):
+        """
+        Clear the lane and measure its times from origin.
+
+        :param origin: time.monotonic() the times count from, defaults to now.
+                       Lanes recorded together share the origin of AutomationPlayer.start_recording().
+        """
+        self.times = array("d")
+        self.kinds = array("b")
+        self.values = array("d")
+        self.origin = time.monotonic() if origin is None else origin
+
+    def record(self, kind: AutomationKind | int, value: float, at: float = None):
+        """
+        Append a move.
+
+        :param kind: The parameter that moved.
+        :param value: Its new value.
+        :param at: Seconds since the origin, defaults to now.
+        :raises ValueError: If the time is before the last recorded move.
+        """
+        if at is None:
+            at = time.monotonic() - self.origin
+        if self.times and at < self.times[-1]:
+            raise ValueError("Moves must be recorded in time order")
+        self.times.append(at)
+        self.kinds.append(kind.value if isinstance(kind, AutomationKind) else kind)
+        self.values.append(value)
+
+    @property
+    def duration(self):
+        return self.times[-1] if self.times else 0.0
+
+    def __len__(self):
+        return len(self.times)
+
+
+class TimerWheel:
+    """
+    Hashed timer wheel. Items are scheduled for an absolute tick and come out of advance() on exactly that tick.
+    Scheduling and advancing cost O(1) per item, independent of how many items wait.
+    """
+
+    def __init__(self, slots: int = 256):
+        self.slots = [[] for _ in range(slots)]
+        self.tick = 0
+
+    def schedule(self, tick: int, item):
+        """
+        :param tick: Absolute tick, ticks already passed are due on the next advance().
+        :param item: Anything, handed back by advance().
+        """
+        tick = max(tick, self.tick)
+        self.slots[tick % len(self.slots)].append((tick, item))
+
+    def advance(self):
+        """
+        Move to the next tick.
+
+        :return: list of the items due on the current tick.
+        """
+        slot = self.slots[self.tick % len(self.slots)]
+        due = []
+        if slot:
+            # Items of later turns stay in the slot
+            waiting = []
+            for entry in slot:
+                if entry[0] == self.tick:
+                    due.append(entry[1])
+                else:
+                    waiting.append(entry)
+            slot[:] = waiting
+        self.tick += 1
+        return due
+
+    def clear(self):
+        for slot in self.slots:
+            slot.clear()
+        self.tick = 0
+
+
+class AutomationPlayer:
+    """
+    Plays automation lanes in its own thread at a fixed tick rate.
+    Moves are quantised to the tick, all moves of one tick are handed to the sink in one call.
+    A late thread catches up by running the missed ticks, so playback does not drift.
+    """
+
+    def __init__(self, sink: Callable[[list[tuple[int, int, float]]], None], rate: int = 100, slots: int = 256):
+        """
+        :param sink: Called with a list of (channel, kind, value) per tick that has moves.
+        :param rate: Ticks per second.
+        :param slots: Slots of the timer wheel, lanes are fed into the wheel this many ticks ahead.
+        """
+        self.logger = logging.getLogger(__name__)
+        self.sink = sink
+        self.rate = rate
+        self.wheel = TimerWheel(slots)
+        self.__lanes = []
+        self.__cursors = []
+        self.__lock = Lock()
+        self.__stop = Event()
+        self.__thread = None
+        self.origin = None
+        self.ticks = 0
+        self.late_ticks = 0
+        self.max_step_time = 0.0
+        self.step_time = 0.0
+
+    @property
+    def playing(self):
+        return self.__thread is not None and self.__thread.is_alive()
+
+    def start_recording(self):
+        """
+        :return: Origin of the current take, started now if there is none.
+                 Lanes armed with it during the take play back in sync.
+        """
+        if self.origin is None:
+            self.origin = time.monotonic()
+        return self.origin
+
+    def stop_recording(self):
+        """End the take, the next start_recording() starts a new one."""
+        self.origin = None
+
+    def load(self, lanes: Iterable[AutomationLane]):
+        """Start over with the given lanes."""
+        with self.__lock:
+            self.__lanes = [lane for lane in lanes if len(lane)]
+            self.__cursors = [0] * len(self.__lanes)
+            self.wheel.clear()
+
+    def __fill(self):
+        # Feed the moves of the next wheel turn, older ones are already in the wheel
+        horizon = self.wheel.tick + len(self.wheel.slots)
+        for index, lane in enumerate(self.__lanes):
+            cursor = self.__cursors[index]
+            times = lane.times
+            while cursor < len(times):
+                tick = round(times[cursor] * self.rate)
+                if tick >= horizon:
+                    break
+                self.wheel.schedule(tick, (lane.channel, lane.kinds[cursor], lane.values[cursor]))
+                cursor += 1
+            self.__cursors[index] = cursor
+
+    def finished(self):
+        with self.__lock:
+            return all(cursor >= len(lane) for cursor, lane in zip(self.__cursors, self.__lanes)) \
+                and not any(self.wheel.slots)
+
+    def step(self):
+        """
+        Run one tick.
+
+        :return: Number of moves sent.
+        """
+        start_time = time.perf_counter()
+        with self.__lock:
+            if self.wheel.tick % len(self.wheel.slots) == 0:
+                self.__fill()
+            moves = self.wheel.advance()
+        if moves:
+            self.sink(moves)
+        self.step_time = time.perf_counter() - start_time
+        self.max_step_time = max(self.max_step_time, self.step_time)
+        self.ticks += 1
+        return len(moves)
+
+    def play(self, lanes: Iterable[AutomationLane] = None):
+        """
+        Start playback in the background.
+
+        :param lanes: Lanes to play, defaults to the loaded ones.
+        """
+        self.stop()
+        if lanes is not None:
+            self.load(lanes)
+        self.__stop.clear()
+        self.__thread = Thread(target=self.__run, name="AutomationPlayer", daemon=True)
+        self.__thread.start()
+
+    def stop(self):
+        self.__stop.set()
+        if self.__thread is not None:
+            self.__thread.join()
+            self.__thread = None
+
+    def __run(self):
+        period = 1 / self.rate
+        start = time.perf_counter()
+        while not self.__stop.is_set():
+            if self.finished():
+                break
+            due = start + self.wheel.tick * period
+            wait = due - time.perf_counter()
+            if wait > 0:
+                self.__stop.wait(wait)
+            elif wait < -period:
+                self.late_ticks += 1
+            self.step()
+        self.logger.info(f"Playback ended after {self.ticks} ticks, {self.late_ticks} late, longest tick {self.max_step_time * 1000:.2f}ms")
@@ -23,23 +23,41 @@ class VMInterfaceFunctions:
         else:
             raise IndexError(f"Channel out of range (0-15): {channel}")
     
-    def is_strip(self, channel):
+    @staticmethod
+    def is_strip(channel):
         return 0 <= channel <= 7
     
     
         
     class VMState:
+        """
+        Mirror of the Voicemeeter parameters shown on the XTouch.
+        Channels 0-7 are strips, 8-15 are buses. version changes whenever sync() sees a change.
+        """
         def __init__(self):
             self.mutes = [False] * 16
             self.solos = [False] * 8
             self.gains = [0] * 16
+            self.denoiser = 0
+            self.version = 0
 
         def sync(self, vm = voicemeeter.api("potato")):
+            """
+            Read the parameters from Voicemeeter.
+            :return: True if anything changed.
+            """
+            mutes = [False] * 16
+            gains = [0] * 16
             for i in range(8):
-                self.mutes[i] = vm.strip[i].mute
-                self.gains[i] = vm.strip[i].gain
+                mutes[i] = vm.strip[i].mute
+                gains[i] = vm.strip[i].gain
                 o = i+8
-                self.mutes[o] = vm.bus[i].mute
-                self.gains[o] = vm.bus[i].gain
-            for i in range(8):
-                self.solos[i] = vm.strip[i].solo
+                mutes[o] = vm.bus[i].mute
+                gains[o] = vm.bus[i].gain
+            solos = [vm.strip[i].solo for i in range(8)]
+            denoiser = vm.strip[4].denoiser.knob
+            if mutes == self.mutes and solos == self.solos and gains == self.gains and denoiser == self.denoiser:
+                return False
+            self.mutes, self.solos, self.gains, self.denoiser = mutes, solos, gains, denoiser
+            self.version += 1
+            return True
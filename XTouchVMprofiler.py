@@ -0,0 +1,157 @@
+import time
+from threading import Lock
+
+__all__ = ["VMCallStats", "VMProxy"]
+
+# Values of these types are what the Voicemeeter DLL returns, everything else is a
+# container of the api object (strip, bus, denoiser, ...) and is wrapped instead of counted
+_value_types = (bool, int, float, str, bytes, tuple, list, type(None))
+
+
+def _is_value(value):
+    # strip and bus are tuples of containers, levels.all is a tuple of values
+    if isinstance(value, (tuple, list)):
+        return not value or isinstance(value[0], _value_types)
+    return isinstance(value, _value_types)
+
+
+class VMCallStats:
+    """
+    Counts and times the Voicemeeter API accesses made through a VMProxy, keyed by path like strip[3].gain.
+    tick() closes the current tick, totals keep running over all ticks.
+    """
+
+    def __init__(self):
+        self.__lock = Lock()
+        # path -> [gets, sets, calls, seconds]
+        self.__totals = {}
+        self.__tick = {}
+        self.ticks = 0
+        self.last_tick = {}
+
+    def record(self, path: str, kind: int, seconds: float):
+        """
+        :param path: Attribute path of the access.
+        :param kind: 0 for get, 1 for set, 2 for a method call.
+        :param seconds: Time spent in the api.
+        """
+        with self.__lock:
+            entry = self.__tick.get(path)
+            if entry is None:
+                entry = self.__tick[path] = [0, 0, 0, 0.0]
+            entry[kind] += 1
+            entry[3] += seconds
+
+    def tick(self):
+        """
+        Close the current tick and add it to the totals.
+
+        :return: dict path -> [gets, sets, calls, seconds] of the closed tick.
+        """
+        with self.__lock:
+            current, self.__tick = self.__tick, {}
+        for path, entry in current.items():
+            total = self.__totals.get(path)
+            if total is None:
+                total = self.__totals[path] = [0, 0, 0, 0.0]
+            for i in range(4):
+                total[i] += entry[i]
+        self.ticks += 1
+        self.last_tick = current
+        return current
+
+    @staticmethod
+    def summarize(entries: dict):
+        """
+        :return: (number of accesses, seconds) of a tick or the totals.
+        """
+        return sum(e[0] + e[1] + e[2] for e in entries.values()), sum(e[3] for e in entries.values())
+
+    def hottest(self, n: int = 10):
+        """
+        :param n: Number of paths to return.
+        :return: list of (path, gets, sets, calls, seconds), most time spent first.
+        """
+        ranked = sorted(self.__totals.items(), key=lambda item: item[1][3], reverse=True)
+        return [(path, *entry) for path, entry in ranked[:n]]
+
+    def report(self, n: int = 10):
+        """Text report of the last tick and the hottest paths so far."""
+        count, seconds = self.summarize(self.last_tick)
+        total_count, total_seconds = self.summarize(self.__totals)
+        lines = [f"Voicemeeter api: last tick {count} accesses {seconds * 1000:.2f}ms, "
+                 f"{self.ticks} ticks {total_count} accesses {total_seconds * 1000:.1f}ms "
+                 f"({total_count / max(1, self.ticks):.1f} per tick)"]
+        for path, gets, sets, calls, path_seconds in self.hottest(n):
+            lines.append(f"  {path}: {gets} get {sets} set {calls} call {path_seconds * 1000:.1f}ms")
+        return "\n".join(lines)
+
+    def reset(self):
+        with self.__lock:
+            self.__totals = {}
+            self.__tick = {}
+            self.ticks = 0
+            self.last_tick = {}
+
+
+class VMProxy:
+    """
+    Stands in for a voicemeeterlib api object and records every attribute get, set and method call in a VMCallStats.
+    Containers (strip[3], strip[3].denoiser, event, ...) are wrapped again, so paths are tracked all the way down.
+    """
+
+    def __init__(self, target, stats: VMCallStats, path: str = ""):
+        object.__setattr__(self, "_VMProxy__target", target)
+        object.__setattr__(self, "_VMProxy__stats", stats)
+        object.__setattr__(self, "_VMProxy__path", path)
+
+    def __child_path(self, name):
+        return f"{self.__path}.{name}" if self.__path else name
+
+    def __getattr__(self, name):
+        path = self.__child_path(name)
+        start = time.perf_counter()
+        value = getattr(self.__target, name)
+        seconds = time.perf_counter() - start
+        if _is_value(value):
+            self.__stats.record(path, 0, seconds)
+            return value
+        if callable(value):
+            return self.__wrap_method(value, path)
+        return VMProxy(value, self.__stats, path)
+
+    def __wrap_method(self, method, path):
+        stats = self.__stats
+        path += "()"
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return method(*args, **kwargs)
+            finally:
+                stats.record(path, 2, time.perf_counter() - start)
+        return timed
+
+    def __setattr__(self, name, value):
+        start = time.perf_counter()
+        setattr(self.__target, name, value)
+        self.__stats.record(self.__child_path(name), 1, time.perf_counter() - start)
+
+    def __getitem__(self, index):
+        value = self.__target[index]
+        if _is_value(value):
+            return value
+        return VMProxy(value, self.__stats, f"{self.__path}[{index}]")
+
+    def __len__(self):
+        return len(self.__target)
+
+    def __iter__(self):
+        for index in range(len(self.__target)):
+            yield self[index]
+
+    def __enter__(self):
+        self.__target.__enter__()
+        return self
+
+    def __exit__(self, *exc):
+        return self.__target.__exit__(*exc)
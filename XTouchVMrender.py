@@ -0,0 +1,228 @@
+from collections.abc import Mapping
+from threading import Lock
+from typing import NamedTuple
+import time
+from XTouchLib import XTouch, XTouchButton, XTouchButtonLED, XTouchEncoderRing
+from XTouchLibTypes import XTouchStateUnchecked
+import XTouchVMinterface as xtvmi
+import XtouchVMconfig as xtcfg
+
+__all__ = ["Page", "PageFrames", "OverlayLayer", "render_surface"]
+
+# Labels of the upper row, overlays replace them while a value is shown
+home_page = 0
+page_label_cell = (0, 0)
+denoiser_label_cell = (1, 0)
+shortcut_label_cell = (2, 0)
+denoiser_label = "Dnoiser"
+shortcut_label = "Mode"
+
+# Position of the page encoder ring for each page
+page_rings = {
+    0: (XTouchEncoderRing.WRAP.value, 0),
+    1: (XTouchEncoderRing.PAN.value, 11),
+    2: (XTouchEncoderRing.PAN.value, 1),
+}
+
+
+class Page(NamedTuple):
+    """A page of channels mounted on the 8 strips."""
+    index: int
+    name: str
+    mount: tuple
+
+
+def cell_text(text: str):
+    """Cut or pad a text to the 7 characters of a display cell."""
+    return text[:7].ljust(7, " ")
+
+
+class OverlayLayer(Mapping):
+    """
+    Display cells temporarily shown above the page, keyed by (channel, row).
+    Each cell can expire on its own, call expire() regularly and redraw when it returns True.
+    As a mapping it yields the texts of the visible cells.
+    """
+
+    def __init__(self):
+        self.__cells = {}
+        self.__lock = Lock()
+
+    def show(self, cell: tuple[int, int], text: str, duration: float = None):
+        """
+        Show a text in a display cell.
+
+        :param cell: (channel, row) of the cell.
+        :param text: Text to show, cut or padded to 7 characters.
+        :param duration: Seconds until the cell is hidden again, None to keep it until hide().
+        """
+        expires = None if duration is None else time.monotonic() + duration
+        with self.__lock:
+            self.__cells[cell] = (cell_text(text), expires)
+
+    def hide(self, cell: tuple[int, int]):
+        with self.__lock:
+            self.__cells.pop(cell, None)
+
+    def expire(self, now: float = None):
+        """
+        Hide all cells whose time is up.
+
+        :return: True if a cell was hidden.
+        """
+        now = time.monotonic() if now is None else now
+        with self.__lock:
+            expired = [cell for cell, (text, expires) in self.__cells.items() if expires is not None and expires <= now]
+            for cell in expired:
+                del self.__cells[cell]
+        return bool(expired)
+
+    def __getitem__(self, cell):
+        return self.__cells[cell][0]
+
+    def __iter__(self):
+        with self.__lock:
+            return iter(list(self.__cells))
+
+    def __len__(self):
+        return len(self.__cells)
+
+    def items(self):
+        with self.__lock:
+            return [(cell, text) for cell, (text, expires) in self.__cells.items()]
+
+
+def static_frame(config: xtcfg.Config, page: Page):
+    """
+    Parts of a page that only depend on the config.
+
+    :return: (display text of 112 characters without overlays, display colors)
+    """
+    compiled = config.compiled
+    top = [" " * 7] * 8
+    top[page_label_cell[0]] = cell_text(page.name)
+    if page.index == home_page:
+        top[denoiser_label_cell[0]] = cell_text(denoiser_label)
+    top[shortcut_label_cell[0]] = cell_text(shortcut_label)
+    bottom = [compiled.names[channel] for channel in page.mount]
+    return "".join(top) + "".join(bottom), tuple(compiled.colors[channel] for channel in page.mount)
+
+
+def dynamic_frame(mirror: xtvmi.VMInterfaceFunctions.VMState, page: Page):
+    """
+    Parts of a page that follow the Voicemeeter parameters.
+
+    :return: (button leds, faders, encoder rings without the shortcut ring)
+    """
+    vmint = xtvmi.VMInterfaceFunctions
+    any_solos = any(mirror.solos[channel] for channel in page.mount if vmint.is_strip(channel))
+    button_leds = []
+    faders = []
+    for channel in page.mount:
+        leds = [XTouchButtonLED.OFF.value] * 4
+        mute = mirror.mutes[channel]
+        leds[XTouchButton.MUTE.value] = int(mute)
+        if vmint.is_strip(channel):
+            solo = mirror.solos[channel]
+            leds[XTouchButton.SOLO.value] = int(solo)
+            if any_solos and not solo and not mute:
+                leds[XTouchButton.MUTE.value] = XTouchButtonLED.BLINK.value
+        button_leds.append(tuple(leds))
+        faders.append(XTouch.fader_db_to_pos(min(8, mirror.gains[channel])))
+
+    encoder_rings = [(XTouchEncoderRing.DOT.value, 0, False)] * 8
+    mode, value = page_rings[page.index]
+    encoder_rings[0] = (mode, value, False)
+    encoder_rings[1] = (XTouchEncoderRing.WRAP.value, int(mirror.denoiser) + 1, False)
+    return tuple(button_leds), tuple(faders), tuple(encoder_rings)
+
+
+def compose(static, dynamic, overlays: Mapping[tuple[int, int], str] = None, shortcut_active: bool = False):
+    """
+    Combine a static and a dynamic frame with the overlays to the target state.
+
+    :return: XTouchStateUnchecked
+    """
+    text, colors = static
+    button_leds, faders, encoder_rings = dynamic
+    if overlays:
+        # Only the overlaid cells differ from the page, the state diff sends just those
+        cells = [text[i:i + 7] for i in range(0, 112, 7)]
+        for (channel, row), overlay in overlays.items():
+            cells[row * 8 + channel] = cell_text(overlay)
+        text = "".join(cells)
+    if shortcut_active:
+        encoder_rings = list(encoder_rings)
+        encoder_rings[2] = (XTouchEncoderRing.WRAP.value, 0, True)
+        encoder_rings = tuple(encoder_rings)
+    return XTouchStateUnchecked(
+        display_colors=colors,
+        display_text=text,
+        button_leds=button_leds,
+        encoder_rings=encoder_rings,
+        faders=faders,
+    )
+
+
+def render_surface(mirror: xtvmi.VMInterfaceFunctions.VMState, config: xtcfg.Config, page: Page,
+                   overlays: Mapping[tuple[int, int], str] = None, shortcut_active: bool = False):
+    """
+    Build the complete target state of the XTouch from the Voicemeeter mirror.
+    Has no side effects, assigning the result to XTouch.state sends only what differs from the device.
+
+    :param mirror: Synced Voicemeeter parameters.
+    :param config: The channel configuration.
+    :param page: The page to show.
+    :param overlays: Texts replacing display cells, keyed by (channel, row).
+    :param shortcut_active: Light the shortcut encoder ring.
+    :return: XTouchStateUnchecked
+    """
+    return compose(static_frame(config, page), dynamic_frame(mirror, page), overlays, shortcut_active)
+
+
+class PageFrames:
+    """
+    Cache of the rendered frames of all pages.
+    Static frames are built once per page and mount, dynamic frames are rebuilt when the mirror version changes.
+    Keep all pages warm with warm() after each sync, then a page flip is only a lookup and a diff.
+    """
+
+    def __init__(self, config: xtcfg.Config):
+        self.config = config
+        self.__static = {}
+        self.__dynamic = {}
+
+    def invalidate(self):
+        """Drop all cached frames, e.g. after the config changed."""
+        self.__static.clear()
+        self.__dynamic.clear()
+
+    def static(self, page: Page):
+        key = (page.index, page.name, page.mount)
+        frame = self.__static.get(key)
+        if frame is None:
+            frame = self.__static[key] = static_frame(self.config, page)
+        return frame
+
+    def dynamic(self, mirror: xtvmi.VMInterfaceFunctions.VMState, page: Page):
+        key = (page.index, page.mount)
+        cached = self.__dynamic.get(key)
+        if cached is None or cached[0] != mirror.version:
+            cached = self.__dynamic[key] = (mirror.version, dynamic_frame(mirror, page))
+        return cached[1]
+
+    def warm(self, mirror: xtvmi.VMInterfaceFunctions.VMState, pages):
+        """
+        Build the frames of the given pages ahead of time.
+
+        :param mirror: Synced Voicemeeter parameters.
+        :param pages: Iterable of Page.
+        """
+        for page in pages:
+            self.static(page)
+            self.dynamic(mirror, page)
+
+    def render(self, mirror: xtvmi.VMInterfaceFunctions.VMState, page: Page,
+               overlays: Mapping[tuple[int, int], str] = None, shortcut_active: bool = False):
+        """Same as render_surface, from the cached frames."""
+        return compose(self.static(page), self.dynamic(mirror, page), overlays, shortcut_active)
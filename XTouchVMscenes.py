@@ -0,0 +1,151 @@
+import logging
+import re
+import time
+import voicemeeterlib as voicemeeter
+import XTouchVMinterface as xtvmi
+import XtouchVMconfig as xtcfg
+
+__all__ = ["SceneEngine"]
+
+_parameter_pattern = re.compile(r"^(strip|bus)\[([0-7])\]\.(.+)$")
+
+
+def _mirror_field(parameter: str):
+    """
+    :return: (attribute of the mirror, index in it or None), None if the mirror does not track the parameter.
+    """
+    match = _parameter_pattern.match(parameter)
+    if match is None:
+        return None
+    kind, index, name = match.group(1), int(match.group(2)), match.group(3)
+    channel = index if kind == "strip" else index + 8
+    if name == "mute":
+        return "mutes", channel
+    if name == "gain":
+        return "gains", channel
+    if name == "solo" and kind == "strip":
+        return "solos", index
+    if name == "denoiser.knob" and kind == "strip" and index == 4:
+        return "denoiser", None
+    return None
+
+
+def _mirrored_value(mirror: xtvmi.VMInterfaceFunctions.VMState, parameter: str):
+    """
+    :return: The mirrored value of a parameter, None if the mirror does not track it.
+    """
+    field = _mirror_field(parameter)
+    if field is None:
+        return None
+    attribute, index = field
+    if index is None:
+        return getattr(mirror, attribute)
+    value = getattr(mirror, attribute)[index]
+    # Mutes and solos are mirrored as bool, scenes hold them as 0/1
+    return int(value) if attribute != "gains" else value
+
+
+def _store_mirrored_value(mirror: xtvmi.VMInterfaceFunctions.VMState, parameter: str, value):
+    """
+    Write a sent value into the mirror, parameters the mirror does not track are ignored.
+    """
+    field = _mirror_field(parameter)
+    if field is None:
+        return
+    attribute, index = field
+    if index is None:
+        setattr(mirror, attribute, value)
+    elif attribute == "gains":
+        getattr(mirror, attribute)[index] = value
+    else:
+        getattr(mirror, attribute)[index] = bool(value)
+
+
+def _script_name(parameter: str):
+    # strip[0].mute -> Strip[0].mute, the Voicemeeter script syntax
+    return parameter[0].upper() + parameter[1:]
+
+
+class SceneEngine:
+    """
+    Named scenes of Voicemeeter parameters from the config.
+    A recall only sends the parameters that differ from the mirrored state, all in one request,
+    and writes them into the mirror.
+    """
+
+    def __init__(self, vm: voicemeeter.api, config: xtcfg.Config, mirror: xtvmi.VMInterfaceFunctions.VMState):
+        """
+        :param vm: Logged in voicemeeterlib api.
+        :param config: Config holding the scenes.
+        :param mirror: Synced Voicemeeter parameters to diff against.
+        """
+        self.logger = logging.getLogger(__name__)
+        self.vm = vm
+        self.config = config
+        self.mirror = mirror
+        self.last_latency = 0.0
+
+    @property
+    def names(self) -> list[str]:
+        return list(self.config.settings["scenes"])
+
+    def diff(self, name: str):
+        """
+        :param name: Name of the scene.
+        :return: dict of the parameters of the scene that differ from the mirror.
+        :raises KeyError: If the scene does not exist.
+        """
+        scene = self.config.settings["scenes"][name]
+        changes = {}
+        for parameter, value in scene.items():
+            current = _mirrored_value(self.mirror, parameter)
+            # Parameters the mirror does not know are always sent
+            if current is None or not current == value:
+                changes[parameter] = value
+        return changes
+
+    def recall(self, name: str):
+        """
+        Bring Voicemeeter to a scene.
+
+        :param name: Name of the scene.
+        :return: Number of parameters sent.
+        :raises KeyError: If the scene does not exist.
+        """
+        start_time = time.perf_counter()
+        changes = self.diff(name)
+        if changes:
+            self.vm.sendtext(";".join(f"{_script_name(parameter)}={value}" for parameter, value in changes.items()))
+            # The next sync() may come after another recall, which has to diff against what was just sent
+            for parameter, value in changes.items():
+                _store_mirrored_value(self.mirror, parameter, value)
+            self.mirror.version += 1
+        self.last_latency = time.perf_counter() - start_time
+        self.logger.info(f"Recalled scene {name}: {len(changes)} parameters sent in {self.last_latency * 1000:.2f}ms")
+        return len(changes)
+
+    def capture(self, name: str, parameters: list[str] = None, save: bool = True):
+        """
+        Store the current mirrored values as a scene.
+
+        :param name: Name of the scene, an existing scene is replaced.
+        :param parameters: Parameters to capture, defaults to the parameters of the existing scene or all mutes.
+        :param save: Write the config file.
+        :return: The captured scene.
+        :raises ValueError: If a parameter is not mirrored.
+        """
+        scenes = self.config.settings["scenes"]
+        if parameters is None:
+            parameters = list(scenes.get(name, ())) or [f"strip[{i}].mute" for i in range(8)] + [f"bus[{i}].mute" for i in range(8)]
+        scene = {}
+        for parameter in parameters:
+            value = _mirrored_value(self.mirror, parameter)
+            if value is None:
+                raise ValueError(f"Parameter is not mirrored and can not be captured: {parameter}")
+            scene[parameter] = value
+        settings = dict(self.config.settings)
+        settings["scenes"] = {**scenes, name: scene}
+        self.config.settings = settings
+        if save:
+            self.config.save_config()
+        return scene
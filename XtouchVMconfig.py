@@ -1,16 +1,125 @@
 import json
 import os
 import logging
+import re
+import time
+from threading import Event, Lock, Thread
+from typing import Callable, NamedTuple
 from XTouchLibTypes import XTouchColor
 
 def type_string_generator(channel):
         return f"{"Physical" if channel%8 < 5 else "Virtual"}{"Input" if channel < 8 else "Output"}{(channel%8)+1}"
 
+class CompiledChannels(NamedTuple):
+    """Per channel data ready to be sent, indexed by channel (0-15)."""
+    # 7 character names, cut or padded, non ASCII characters replaced
+    names: tuple
+    # The same as ASCII bytes
+    name_bytes: tuple
+    colors: tuple
+
+
+# field: (expected type, check, description of the check)
+channel_schema = {
+    "type": (str, None, None),
+    "name": (str, None, None),
+    "color": (int, lambda value: 0 <= value <= 7, "0-7"),
+}
+
+
+# Shortcut scenes, sparse maps of Voicemeeter parameters like strip[0].mute
+default_scenes = {
+    "DESKTOP": {"strip[0].mute": 0, "strip[1].mute": 1, "bus[4].mute": 1, "bus[2].mute": 0, "bus[3].mute": 0},
+    "VR": {"strip[0].mute": 1, "strip[1].mute": 0, "bus[4].mute": 0, "bus[2].mute": 1, "bus[3].mute": 1},
+}
+scene_parameter_pattern = re.compile(r"^(strip|bus)\[[0-7]\]\.[a-z_.]+$")
+
+
+def validate_scenes(scenes, errors):
+    """
+    :return: Validated scenes, errors are appended to the given list.
+    """
+    if not isinstance(scenes, dict):
+        errors.append("'scenes' is not an object.")
+        return {}
+    validated = {}
+    for name, parameters in scenes.items():
+        if not isinstance(parameters, dict):
+            errors.append(f"Scene {name} is not an object.")
+            continue
+        for parameter, value in parameters.items():
+            if not scene_parameter_pattern.match(parameter):
+                errors.append(f"Unknown parameter {parameter} in scene {name}.")
+            elif not isinstance(value, (int, float)) or isinstance(value, bool):
+                errors.append(f"Value of {parameter} in scene {name} is not a number, got {type(value).__name__}.")
+        validated[name] = dict(parameters)
+    return validated
+
+
+def validate_settings(json_settings):
+    """
+    Validate a parsed config file in one pass over the channels and fields, collecting all errors.
+
+    :return: (settings, list of errors, True if outdated values were updated)
+    """
+    errors = []
+    config_update = False
+    settings = {"channels": {}}
+    channels = json_settings.get("channels") if isinstance(json_settings, dict) else None
+    if not isinstance(channels, dict):
+        return settings, ["'channels' key not found."], False
+    for i in range(16):
+        channel = channels.get(str(i))
+        if not isinstance(channel, dict):
+            errors.append(f"Missing channel {i} in \"channels\" key.")
+            continue
+        parsed = {}
+        for field, (expected_type, check, check_text) in channel_schema.items():
+            if field not in channel:
+                errors.append(f"Missing {field} for channel {i}.")
+                continue
+            value = channel[field]
+            # bool is an int, but not a color
+            if not isinstance(value, expected_type) or isinstance(value, bool):
+                errors.append(f"{field} of channel {i} is not {expected_type.__name__}, got {type(value).__name__}.")
+            elif check is not None and not check(value):
+                errors.append(f"{field} of channel {i} out of range. Expected {check_text}, got {value}.")
+            else:
+                parsed[field] = value
+        if parsed.get("type", None) != type_string_generator(i):
+            config_update = True
+        parsed["type"] = type_string_generator(i)
+        if len(parsed.get("name", "")) > 7:
+            logging.getLogger(__name__).warning(f"Name too long in config file for channel {i}. The name will not fit on the XTouch.")
+        settings["channels"][i] = parsed
+    if "scenes" in json_settings:
+        settings["scenes"] = validate_scenes(json_settings["scenes"], errors)
+    else:
+        settings["scenes"] = dict(default_scenes)
+        config_update = True
+    return settings, errors, config_update
+
+
+def compile_channels(settings):
+    """
+    :return: CompiledChannels of the given settings.
+    """
+    channels = settings["channels"]
+    names = []
+    colors = []
+    for i in range(16):
+        name = channels[i]["name"].encode("ascii", errors="replace").decode("ascii")
+        names.append(name[:7].ljust(7, " "))
+        colors.append(channels[i]["color"])
+    return CompiledChannels(tuple(names), tuple(name.encode("ascii") for name in names), tuple(colors))
+
+
 class Config:
     def __init__(self, config_file='config.json'):
         self.logger = logging.getLogger(__name__)
         self.config_file = config_file
-        self.__settings = {
+        # (settings, compiled channels), replaced as one so readers never see a mix. Compiled once the defaults are complete
+        settings = {
             "channels": {
                 0:{"type": "input" , "name": "WaveMIC", "color": XTouchColor.GREEN.value},
                 1:{"type": "input" , "name": "RiftMIC", "color": XTouchColor.GREEN.value},
@@ -28,96 +137,148 @@ class Config:
                 13:{"type": "output", "name": "Output6", "color": XTouchColor.WHITE.value},
                 14:{"type": "output", "name": "Visual", "color": XTouchColor.WHITE.value},
                 15:{"type": "output", "name": "Record", "color": XTouchColor.WHITE.value},
-            }
+            },
+            "scenes": dict(default_scenes),
         }
-        self.generate_default_config()
+        self.generate_default_config(settings)
+        self._publish(settings)
         self.load_config()
 
     
     
-    def generate_default_config(self):
+    def generate_default_config(self, settings: dict):
         for i in range(1, 16):
-            self.__settings["channels"][i] = {
+            settings["channels"][i] = {
                 "type": type_string_generator(i),
                 "name": f"Input {i+1}" if i <= 7 else f"Output{i-7}",
                 "color": XTouchColor.GREEN.value if i <= 7 else XTouchColor.RED.value
             }
     
     def load_config(self):
-        if os.path.exists(self.config_file):
+        """
+        Load and validate the config file. An invalid file is logged and leaves the current settings in place.
+
+        :return: True if the settings were replaced.
+        """
+        if not os.path.exists(self.config_file):
+            self.save_config()
+            return False
+        try:
             with open(self.config_file, 'r') as file:
                 json_settings = json.load(file)
-                settings = {}
-                parse_error = False
-                config_update = False
-                if "channels" in json_settings:
-                    settings["channels"] = {}
-                    for i in range(16):
-                        if str(i) in json_settings["channels"]:
-                            settings["channels"][i] = {}
-                            # Check if the channel is a dictionary and has the required keys
-                            if "type" in json_settings["channels"][str(i)]:
-                                if json_settings["channels"][str(i)]["type"] != type_string_generator(i):
-                                    self.logger.info(f"Outdated type in config file for channel {i}. Expected {type_string_generator(i)}, got {json_settings['channels'][str(i)]['type']}. Type will be updated.")
-                                    config_update = True
-                                settings["channels"][i]["type"] = type_string_generator(i)
-                            else:
-                                self.logger.error(f"Invalid config file format: Missing type for channel {i}.")
-                                parse_error = True
-                                break
-                            if "name" in json_settings["channels"][str(i)]:
-                                if len(json_settings["channels"][str(i)]["name"]) > 7:
-                                    self.logger.warning(f"Name too long in config file for channel {i}. The name will not fit on the XTouch.")
-                                settings["channels"][i]["name"] = json_settings["channels"][str(i)]["name"]
-                            else:
-                                self.logger.error(f"Invalid config file format: Missing name for channel {i}.")
-                                parse_error = True
-                                break
-                            if "color" in json_settings["channels"][str(i)]:
-                                if isinstance(json_settings["channels"][str(i)]["color"], int):
-                                    if json_settings["channels"][str(i)]["color"] in range(0, 8):
-                                        settings["channels"][i]["color"] = json_settings["channels"][str(i)]["color"]
-                                    else:
-                                        self.logger.error(f"Invalid config file format: Color value out of range for channel {i}. Expected 0-7, got {json_settings['channels'][str(i)]['color']}.")
-                                        parse_error = True
-                                        break
-                                else:
-                                    self.logger.error(f"Invalid config file format: Color value not an integer for channel {i}. Expected int, got {type(json_settings['channels'][str(i)]['color'])}.")
-                                    parse_error = True
-                                    break
-                            else:
-                                self.logger.error(f"Invalid config file format: Missing color for channel {i}.")
-                                parse_error = True
-                                break
-                                    
-                        else:
-                            self.logger.error(f"Invalid config file format: Missing channel {i} in \"channels\" key: {self.config_file}")
-                            parse_error = True
-                            break
-                else:
-                    self.logger.error(f"Invalid config file format: {self.config_file}. 'channels' key not found.")
-                    parse_error = True
-                if not parse_error:
-                    self.__settings = settings
-                    if config_update:
-                        self.logger.info("Saving updated config file.")
-                        self.save_config()
-        else:
+        except (OSError, ValueError) as e:
+            self.logger.error(f"Could not read config file {self.config_file}: {e}")
+            return False
+        settings, errors, config_update = validate_settings(json_settings)
+        if errors:
+            for error in errors:
+                self.logger.error(f"Invalid config file format: {error} ({self.config_file})")
+            return False
+        self.settings = settings
+        if config_update:
+            self.logger.info("Saving updated config file.")
             self.save_config()
+        return True
 
     def save_config(self):
         with open(self.config_file, 'w') as file:
-            json.dump(self.__settings, file, indent=4)
+            json.dump(self.settings, file, indent=4)
 
     @property
     def settings(self):
-        return self.__settings
+        return self.__snapshot[0]
     
     @settings.setter
     def settings(self, value):
-        self.__settings = value
+        self._publish(value)
         #self.save_config()
 
+    def _publish(self, settings):
+        # One assignment swaps the settings and their compiled form
+        self.__snapshot = (settings, compile_channels(settings))
+
+    @property
+    def compiled(self) -> "CompiledChannels":
+        """Render-ready data of the current settings."""
+        return self.__snapshot[1]
+
+
+class ConfigService:
+    """
+    Watches the config file by modification time and reloads it when it changed.
+    Listeners are called with the set of channels whose name or color changed, from the watcher thread.
+    """
+
+    def __init__(self, config: Config, interval: float = 1.0):
+        """
+        :param config: The config to keep up to date.
+        :param interval: Seconds between two checks of the file.
+        """
+        self.logger = logging.getLogger(__name__)
+        self.config = config
+        self.interval = interval
+        self.__listeners = []
+        self.__lock = Lock()
+        self.__stop = Event()
+        self.__thread = None
+        self.__mtime = self.__get_mtime()
+
+    def __get_mtime(self):
+        try:
+            return os.stat(self.config.config_file).st_mtime_ns
+        except OSError:
+            return None
+
+    def add_listener(self, callback: Callable[[set[int]], None]):
+        with self.__lock:
+            self.__listeners.append(callback)
+
+    def check(self):
+        """
+        Reload the config if the file changed since the last check.
+
+        :return: Set of changed channels, empty if nothing changed.
+        """
+        mtime = self.__get_mtime()
+        if mtime == self.__mtime:
+            return set()
+        self.__mtime = mtime
+        old = self.config.compiled
+        start_time = time.perf_counter()
+        if not self.config.load_config():
+            return set()
+        new = self.config.compiled
+        # Saving an updated file changes the mtime again, that is not a change to reload
+        self.__mtime = self.__get_mtime()
+        changed = {i for i in range(16) if old.names[i] != new.names[i] or old.colors[i] != new.colors[i]}
+        self.logger.info(f"Config reloaded in {(time.perf_counter() - start_time) * 1000:.1f}ms, changed channels: {sorted(changed)}")
+        if changed:
+            with self.__lock:
+                listeners = list(self.__listeners)
+            for callback in listeners:
+                callback(changed)
+        return changed
+
+    def start(self):
+        if self.__thread is not None:
+            return
+        self.__stop.clear()
+        self.__thread = Thread(target=self.__watch, name="ConfigService", daemon=True)
+        self.__thread.start()
+
+    def stop(self):
+        self.__stop.set()
+        if self.__thread is not None:
+            self.__thread.join()
+            self.__thread = None
+
+    def __watch(self):
+        while not self.__stop.wait(self.interval):
+            try:
+                self.check()
+            except Exception as e:
+                self.logger.exception(f"Config reload failed: {e}")
+
 
 # Example usage
 if __name__ == "__main__":
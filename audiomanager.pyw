@@ -1,30 +1,41 @@
 import voicemeeterlib
-import pyaudio
 import time
 from threading import Thread
-import mido
+from collections import deque
 import logging
 import pystray
 from pystray import MenuItem as item, Menu as menu
 from PIL import Image, ImageDraw, ImageFont
 import coloredlogs
 import os
-from win11toast import toast
 import customtkinter as ctk
 import asyncio
 import XTouchVM
 import subprocess
+from MidiTransport import MidiTransport, MidoTransport, QueuedOutputPort
+from ServiceSupervisor import Service, ServiceSupervisor
+from MidiRouter import MidiRouter
+import AudioDevices
+from LogBuffer import RingBufferHandler, rotating_file_handler, start_queue_logging
+from ExceptionHooks import install_exception_hooks, install_tk_exception_hook
+import Notifications
 
 # Set to True to restart the script after closing the tray icon
 reboot = False
 
-# Configure logging to write to a file
-logging.basicConfig(level=logging.INFO, 
-                    format='[%(asctime)s][%(levelname)s][%(name)s] %(message)s', 
-                    filename='logfile.log',
-                    filemode='w'
-                    )
-coloredlogs.install(level='INFO', fmt='[%(asctime)s][%(levelname)s][%(name)s] %(message)s')
+# Log to a rotating file, the console and the log window. The handlers run on the thread of the queue listener,
+# the threads that log only put records on a queue
+log_format = '[%(asctime)s][%(levelname)s][%(name)s] %(message)s'
+log_file = rotating_file_handler('logfile.log')
+log_file.setFormatter(logging.Formatter(log_format))
+log_console = logging.StreamHandler()
+log_console.setFormatter(coloredlogs.ColoredFormatter(log_format))
+# Recent records for the log window
+log_buffer = RingBufferHandler()
+log_buffer.setFormatter(logging.Formatter(log_format))
+log_listener = start_queue_logging(log_file, log_console, log_buffer, level=logging.INFO)
+# Exceptions are logged where threads and services end, see ServiceSupervisor for the services
+install_exception_hooks()
 
 class StateStore:
     def __init__(self):
@@ -33,47 +44,27 @@ class StateStore:
 
 
 
-def log_exceptions(logger):
-    def decorator(func):
-        def wrapper(*args, **kwargs):
-            try:
-                return func(*args, **kwargs)
-            except Exception as e:
-                logger.error(f"Exception in {func.__name__}: {e}", exc_info=True)
-                raise
-        return wrapper
-    return decorator
-
-class ExceptionLoggingMeta(type):
-    def __new__(cls, name, bases, dct):
-        logger = logging.getLogger(name)
-        for attr, value in dct.items():
-            if callable(value):
-                dct[attr] = log_exceptions(logger)(value)
-        return super().__new__(cls, name, bases, dct)
-
-class Notificator(metaclass=ExceptionLoggingMeta):
+class Notificator:
+    # NotifierService shows the notifications, the ones posted while it does not run wait in pending
+    service = None
+    pending = deque(maxlen=20)
+
     def __init__(self):
         self.logger = logging.getLogger(__class__.__name__)
         self.logger.info("Initializing...")
 
-    async def show_notification_async(self, title, message):
-        self.logger.debug(f"Showing notification: {title} - {message}")
-        toast(title, message, duration="short")
-        self.logger.debug("Notification shown.")
-
-    def show_notification_thread(self, title, message):
-        asyncio.run(self.show_notification_async(title, message))
-
     def notification(self, title, message):
-        notification_thread = Thread(target=self.show_notification_thread, args=(title, message))
-        notification_thread.start()
+        if Notificator.service is not None and Notificator.service.post(title, message):
+            return
+        Notificator.pending.append((title, message))
 
-class VoicemeeterHandler(metaclass=ExceptionLoggingMeta):
+class VoicemeeterHandler:
     def __init__(self, api_type):
         self.logger = logging.getLogger(__class__.__name__)
         self.logger.info("Initializing...")
         self.vm = voicemeeterlib.api(api_type)
+        self.restart_count = 0
+        self.restart_time = 0.0
 
     def connect(self):
         self.logger.info("Connecting to Voicemeeter...")
@@ -85,81 +76,141 @@ class VoicemeeterHandler(metaclass=ExceptionLoggingMeta):
     
     def restart(self):
         self.logger.info("Restarting Voicemeeter...")
+        start_time = time.perf_counter()
         self.vm.command.restart()
+        duration = time.perf_counter() - start_time
+        self.restart_count += 1
+        self.restart_time += duration
+        self.logger.info(f"Voicemeeter restart #{self.restart_count} took {duration:.3f}s (total {self.restart_time:.3f}s)")
+
+    def device_names(self):
+        """
+        :return: Names of the hardware devices assigned to the physical strips and buses.
+        """
+        strips = [self.vm.strip[i] for i in range(self.vm.kind.phys_in)]
+        buses = [self.vm.bus[i] for i in range(self.vm.kind.phys_out)]
+        return {channel.device.name for channel in strips + buses if channel.device.name}
+
+    def uses_any(self, devices):
+        """
+        Check if Voicemeeter is configured to use one of the devices.
+        PortAudio cuts MME names at 31 characters, so a prefix match is enough.
+
+        :param devices: Iterable of AudioDevices.AudioDevice.
+        """
+        try:
+            names = self.device_names()
+        except Exception as e:
+            self.logger.warning(f"Could not read the Voicemeeter devices, assuming they are affected: {e}")
+            return True
+        for device in devices:
+            for name in names:
+                if name.startswith(device.name) or device.name.startswith(name):
+                    return True
+        return False
         
 
-class XTouchHandler(metaclass=ExceptionLoggingMeta):
+class XTouchHandler:
     def __init__(self):
         self.logger = logging.getLogger(__class__.__name__)
         self.logger.info("Initializing...")
         self.xtouch: XTouchVM.App = None
         self.running = False
+        # Set when the bridge stopped with an error other than a disconnect
+        self.failed = False
+        self.thread = None
         
     def main_thread(self):
+        xtouch = self.xtouch
         try:
-            self.xtouch.run()
+            xtouch.run()
         except Exception as e:
             if isinstance(e, OSError):
                 self.logger.info(f"XTouch disconnected: {e}", exc_info=False)
             else:
                 self.logger.error(f"Error in XTouchVM: {e}", exc_info=True)
+                self.failed = True
+        finally:
+            # Stops the lock provider, config service and automation threads and closes the ports
+            try:
+                xtouch.close()
+            except Exception as e:
+                self.logger.warning(f"Closing XTouchVM failed: {e}")
             self.running = False
-        self.running = False
-        self.xtouch = None
+            self.xtouch = None
     
     def start(self, vm):
+        """
+        :return: True if the bridge was started, False if it runs already or no X-Touch is connected.
+        """
         if self.running:
             return False
+        self.failed = False
         try:
             self.xtouch = XTouchVM.App(vm)
-        except Exception as e:
+        except OSError as e:
+            # No X-Touch connected, other errors are real failures
+            self.logger.debug(f"XTouch not available: {e}")
             return False
         self.logger.info("Starting XTouchVM...")
-        Thread(target=self.main_thread).start()
         self.running = True
+        self.thread = Thread(target=self.main_thread, name="XTouchVM", daemon=True)
+        self.thread.start()
+        return True
     
     def stop(self):
         self.logger.info("Stopping XTouchVM...")
         if self.running:
-            if self.xtouch:
-                self.xtouch.running = False
-                self.xtouch.close()
-                time.sleep(0.1)
-                self.xtouch = None
+            xtouch = self.xtouch
+            if xtouch:
+                # The bridge thread closes it when run() returns
+                xtouch.running = False
+            if self.thread is not None:
+                self.thread.join(2)
+                self.thread = None
+            if xtouch:
+                xtouch.close()
+            self.xtouch = None
             self.running = False
         return True
     
         
         
 
-class FantomMidiHandler(metaclass=ExceptionLoggingMeta):
-    def __init__(self):
+class FantomMidiHandler:
+    def __init__(self, transport: MidiTransport = None, router: MidiRouter = None):
         self.logger = logging.getLogger("FANTOM-08 MIDI Handler")
         self.logger.info("Initializing...")
+        self.transport = transport if transport is not None else MidoTransport()
+        self.router = router if router is not None else MidiRouter.load()
         self.notify = Notificator()
         self.fantom_device = None
         self.fantom_output = None
         self.running = False
         self.inport = None
-        self.outport = None
-        self.current_program = 0
-        self.current_bank_msb = 0
-        self.current_bank_lsb = 0
+        self.outports = {}
 
     def is_running(self):
         return self.running
 
     def find_fantom(self):
-        for port in mido.get_input_names():
+        for port in self.transport.get_input_names():
             if 'FANTOM-06' in port and all(keyword not in port for keyword in ['MIDI', 'DAW']):
                 return port
         return None
 
     def find_loop_output(self):
-        for port in mido.get_output_names():
-            if 'FANTOM filterd' in port:
-                return port
-        return None
+        """
+        :return: dict of the routing destinations to the output ports they match, None if one is missing.
+        """
+        output_names = self.transport.get_output_names()
+        outputs = {}
+        for destination in self.router.destinations:
+            port = next((port for port in output_names if destination in port), None)
+            if port is None:
+                return None
+            outputs[destination] = port
+        return outputs
 
     def check_fantom_devices(self):
         if self.running:
@@ -170,7 +221,7 @@ class FantomMidiHandler(metaclass=ExceptionLoggingMeta):
             self.logger.info("Fantom device not found. Please connect the Fantom to the computer.")
             return False
         if self.fantom_output is None:
-            self.logger.info("Fantom loopmidi output not found. Please create a loopmidi port named 'FANTOM filterd'.")
+            self.logger.info(f"Fantom loopmidi output not found. Please create loopmidi ports named {', '.join(self.router.destinations)}.")
             return False
         self.notify.notification("Fantom Connected", "Fantom device connected.")
         self.handle_midi()
@@ -191,9 +242,20 @@ class FantomMidiHandler(metaclass=ExceptionLoggingMeta):
             if self.inport:
                 self.inport.close()
                 self.inport = None
-            if self.outport:
-                self.outport.close()
-                self.outport = None
+            self.log_output_stats()
+            for outport in self.outports.values():
+                outport.close()
+            self.outports = {}
+
+    def log_output_stats(self):
+        """Log sent and dropped messages and the queue latency of each destination since the last call."""
+        for destination, outport in self.outports.items():
+            stats = outport.stats(reset=True)
+            if not stats.sent and not stats.dropped:
+                continue
+            log = self.logger.warning if stats.dropped else self.logger.debug
+            log(f"{destination}: {stats.sent} sent, {stats.dropped} dropped, {stats.queued} queued, "
+                f"latency avg {stats.average_latency * 1000:.2f}ms max {stats.max_latency * 1000:.2f}ms")
 
     def handle_midi(self):
         if self.running:
@@ -203,128 +265,232 @@ class FantomMidiHandler(metaclass=ExceptionLoggingMeta):
         if not fantom_output:
             self.logger.info("Fantom output port not set.")
             return
+        # Each destination sends from its own thread, a stalled loopMIDI port only drops its own messages
+        outports = {}
         try:
-            self.outport = mido.open_output(fantom_output)
+            for destination, port in fantom_output.items():
+                outports[destination] = QueuedOutputPort(self.transport.open_output(port))
         except Exception as e:
             self.logger.error(f"Error opening output port: {e}", exc_info=True)
+            # Close the ports opened so far and their writer threads
+            for outport in outports.values():
+                outport.close()
+            self.running = False
             return
-        self.current_program = 10880.001
-        whitelisted_programs = [10880.001]
-        whitelisted_types = ['note_on', 'note_off', 'control_change']
-
-        def forward_midi(msg):
-            if self.current_program in whitelisted_programs:
-                self.outport.send(msg)
+        self.outports = outports
+        route = self.router.bind(self.fantom_device).route
 
         def message_callback(msg):
-            if msg.type == 'control_change':
-                if msg.control == 0:  # Bank Select MSB
-                    self.current_bank_msb = msg.value
-                elif msg.control == 32:  # Bank Select LSB
-                    self.current_bank_lsb = msg.value
-            elif msg.type == 'program_change':
-                prog = (msg.program + 1) / 1000.0
-                programm = (self.current_bank_msb << 7) + self.current_bank_lsb + prog
-                if 10880.001 <= programm <= 10883.128: 
-                    self.current_program = programm
-                    self.logger.info(f"Current Scene: {self.current_program}")
+            # Raw message bytes, the compiled routing table decides with one lookup
+            for destination, transform in route(msg):
+                if transform is not None:
+                    msg_out = transform(msg)
+                    if msg_out is not None:
+                        outports[destination].send(msg_out)
                 else:
-                    self.logger.debug(f"Programm Change: {programm}")
-            if msg.type in whitelisted_types:
-                forward_midi(msg)
-            self.logger.debug(f"MIDI Message: {msg}")
+                    outports[destination].send(msg)
         try:
-            self.inport = mido.open_input(self.fantom_device, callback=message_callback)
+            self.inport = self.transport.open_input(self.fantom_device, message_callback)
         except Exception as e:
             self.logger.error(f"Error opening input port: {e}", exc_info=True)
             return
         self.logger.info("FANTOM device connected.")
 
-class AudioDeviceMonitor(metaclass=ExceptionLoggingMeta):
-    def __init__(self, fantom_handler=FantomMidiHandler, voicemeeter_handler=VoicemeeterHandler, state_store: StateStore = StateStore()):
+class AudioDeviceMonitor:
+    def __init__(self, fantom_handler=FantomMidiHandler, voicemeeter_handler=VoicemeeterHandler, state_store: StateStore = StateStore(),
+                 device_backend: AudioDevices.AudioDeviceBackend = None):
         self.logger = logging.getLogger(__class__.__name__)
         self.logger.info("Initializing...")
         self.state_store = state_store
         self.notify = Notificator()
-        pii = pyaudio.PyAudio()
-        self.previous_devices = pii.get_device_count()
-        pii.terminate()
-        self.running = False
+        self.device_backend = device_backend if device_backend is not None else AudioDevices.default_backend()
+        self.device_backend.start()
+        self.devices = AudioDevices.DeviceWatcher(self.device_backend)
+        self.debouncer = AudioDevices.DeviceChangeDebouncer()
+        self.ticks = 0
         self.fantom_handler = fantom_handler
         self.vm_handler = voicemeeter_handler
-        self.change_in_previous_check = False
-        self.xtouch_handler = XTouchHandler()
 
     def get_device_count(self):
-        return self.p.get_device_count()
-
-    def monitor_devices(self):
-        while self.running:
+        return len(self.devices.devices)
+
+    def handle_device_burst(self, change: AudioDevices.DeviceChange, events: int):
+        """Act once on all device changes of a burst."""
+        self.logger.info(f"Audio device change detected! {events} changes in this burst.")
+        was_fantom = False
+        if change.added:
+            self.logger.info(f"New device connected: {', '.join(device.name for device in change.added)}")
+            if self.state_store.run_fantom:
+                was_fantom = self.fantom_handler.check_fantom_devices()
+            if not was_fantom:
+                self.notify.notification("Audio Device Change", "New audio device connected.")
+            # Voicemeeter picks up devices it lost by itself, only a new device needs a restart
+            if self.vm_handler.uses_any(change.added):
+                self.vm_handler.restart()
+            else:
+                self.logger.info("No device used by Voicemeeter changed, not restarting.")
+        if change.removed:
+            self.logger.info(f"Device disconnected: {', '.join(device.name for device in change.removed)}")
+            if self.state_store.run_fantom:
+                was_fantom = self.fantom_handler.check_if_fantom_disconnected()
+            if not was_fantom:
+                self.notify.notification("Audio Device Change", "Audio device disconnected.")
+
+    def poll(self):
+        """One check of the devices and the handlers, called every second by DeviceMonitorService."""
+        # Without system notifications every check enumerates the devices, do that less often
+        check_interval = 1 if self.device_backend.notifies else 5
+        if self.ticks % check_interval == 0:
             self.logger.debug("Checking audio devices...")
             start_time = time.time()
-            p = pyaudio.PyAudio()
-            current_devices = p.get_device_count()
-            p.terminate()
-            end_time = time.time()
-            wait_time = 5
-            self.logger.debug(f"Current audio devices: {current_devices} (Time taken: {end_time - start_time:.4f}s)")
-            if current_devices != self.previous_devices:
-                self.logger.info("Audio device change detected!")
-                
-                if current_devices > self.previous_devices:
-                    self.logger.info(f"New device connected.{current_devices} > {self.previous_devices}")
-                    if self.state_store.run_fantom:
-                        was_fantom = self.fantom_handler.check_fantom_devices()
-                    if not self.change_in_previous_check and not was_fantom:
-                        self.notify.notification("Audio Device Change", "New audio device connected.")
-                    self.vm_handler.restart()
-                    
-                elif current_devices < self.previous_devices:
-                    self.logger.info(f"Device disconnected.{current_devices} > {self.previous_devices}")
-                    if self.state_store.run_fantom:
-                        was_fantom = self.fantom_handler.check_if_fantom_disconnected()
-                    if not self.change_in_previous_check and not was_fantom:
-                        self.notify.notification("Audio Device Change", "Audio device disconnected.")
-                        
-                self.previous_devices = current_devices
-                self.change_in_previous_check = True
-                wait_time = 10
-            else:
-                if self.change_in_previous_check:
-                    self.change_in_previous_check = False
-            frequency = 1
-            while self.running and wait_time > 0:
-                if wait_time % 5 == 0 and not self.change_in_previous_check:
-                    if self.fantom_handler.is_running():
-                        if self.state_store.run_fantom:
-                            self.fantom_handler.check_if_fantom_disconnected()
-                        else:
-                            self.fantom_handler.stop()
-                if self.state_store.run_xtouch:
-                    if not self.xtouch_handler.running:
-                        self.xtouch_handler.start(vm=self.vm_handler.vm)
+            change = self.devices.check()
+            self.logger.debug(f"Current audio devices: {change.fingerprint} (Time taken: {time.time() - start_time:.4f}s)")
+            self.debouncer.add(change)
+        if self.debouncer.due():
+            # Audio endpoints often register after WM_DEVICECHANGE used up the generation, look once more.
+            # Anything new extends the burst
+            self.debouncer.add(self.devices.check(force=True))
+        burst = self.debouncer.poll()
+        if burst is not None:
+            self.handle_device_burst(*burst)
+        if self.ticks % 5 == 0 and not self.debouncer.pending:
+            if self.fantom_handler.is_running():
+                if self.state_store.run_fantom:
+                    self.fantom_handler.check_if_fantom_disconnected()
                 else:
-                    self.xtouch_handler.stop()
-                
-                time.sleep(frequency)
-                wait_time -= frequency
+                    self.fantom_handler.stop()
+        self.ticks += 1
 
-    def start_monitoring(self):
-        self.logger.info("Starting monitoring thread...")
-        self.running = True
-        self.monitor_thread = Thread(target=self.monitor_devices)
-        self.monitor_thread.daemon = True
-        self.monitor_thread.start()
 
-    def stop_monitoring(self):
-        self.logger.info("Stopping monitoring thread...")
-        self.running = False
+class NotifierService(Service):
+    """Shows the notifications of all Notificators from one queue, equal ones merged and rate limited."""
+    name = "Notifier"
+
+    def __init__(self, backend: Notifications.NotificationBackend = None, coalescer: Notifications.NotificationCoalescer = None):
+        self.logger = logging.getLogger(__class__.__name__)
+        self.backend = backend if backend is not None else Notifications.default_backend()
+        self.coalescer = coalescer if coalescer is not None else Notifications.NotificationCoalescer()
+        self.loop = None
+        self.queue = None
+        self.__shown = set()
+
+    def post(self, title, message):
+        """
+        Queue a notification, callable from any thread.
+
+        :return: False if the service does not run.
+        """
+        loop = self.loop
+        if loop is None or loop.is_closed():
+            return False
+        loop.call_soon_threadsafe(self.queue.put_nowait, (title, message))
+        return True
+
+    async def __show(self, title, message):
+        self.logger.debug(f"Showing notification: {title} - {message}")
+        # A toast blocks until it is gone
+        await asyncio.to_thread(self.backend.show, title, message)
+
+    async def serve(self):
+        self.queue = asyncio.Queue()
+        self.loop = asyncio.get_running_loop()
+        Notificator.service = self
+        coalescer = self.coalescer
+        try:
+            while True:
+                while Notificator.pending:
+                    coalescer.add(*Notificator.pending.popleft())
+                try:
+                    title, message = await asyncio.wait_for(self.queue.get(), coalescer.next_due())
+                    coalescer.add(title, message)
+                except asyncio.TimeoutError:
+                    pass
+                notification = coalescer.poll()
+                if notification is not None:
+                    task = asyncio.create_task(self.__show(*notification))
+                    self.__shown.add(task)
+                    task.add_done_callback(self.__shown.discard)
+        finally:
+            Notificator.service = None
+            self.loop = None
+            if coalescer.merged or coalescer.dropped:
+                self.logger.info(f"{coalescer.released} notifications shown, {coalescer.merged} merged, {coalescer.dropped} dropped")
+
+
+class DeviceMonitorService(Service):
+    name = "AudioDeviceMonitor"
+
+    def __init__(self, monitor: AudioDeviceMonitor):
+        self.monitor = monitor
+
+    async def tick(self):
+        await asyncio.to_thread(self.monitor.poll)
+
+
+class FantomService(Service):
+    """Connects follow the device monitor, the ticks only log the output queues."""
+    name = "FantomMidiHandler"
+    interval = 60.0
+
+    def __init__(self, fantom_handler: FantomMidiHandler, state_store: StateStore):
+        self.fantom_handler = fantom_handler
+        self.state_store = state_store
+
+    def start(self):
+        if self.state_store.run_fantom:
+            self.fantom_handler.check_fantom_devices()
+
+    def stop(self):
+        self.fantom_handler.stop()
+
+    async def tick(self):
+        self.fantom_handler.log_output_stats()
+
+
+class XTouchService(Service):
+    """
+    Runs the X-Touch bridge while it is enabled. No X-Touch connected is the normal idle state,
+    the service looks for one every interval. A bridge that failed with an error is restarted with backoff.
+    """
+    name = "XTouchVM"
+    interval = 1.0
+
+    def __init__(self, xtouch_handler: XTouchHandler, vm_handler: VoicemeeterHandler, state_store: StateStore):
+        self.xtouch_handler = xtouch_handler
+        self.vm_handler = vm_handler
+        self.state_store = state_store
+
+    def start(self):
+        if self.state_store.run_xtouch:
+            self.xtouch_handler.start(vm=self.vm_handler.vm)
+
+    def stop(self):
         self.xtouch_handler.stop()
-        if hasattr(self, 'monitor_thread'):
-            self.monitor_thread.join()
 
-class LogWindow(metaclass=ExceptionLoggingMeta):
-    def __init__(self, root):
+    async def tick(self):
+        if not self.state_store.run_xtouch:
+            if self.xtouch_handler.running:
+                await asyncio.to_thread(self.xtouch_handler.stop)
+        elif not self.xtouch_handler.running and not self.xtouch_handler.failed:
+            # Connected or reconnected X-Touch
+            await asyncio.to_thread(self.xtouch_handler.start, self.vm_handler.vm)
+
+    def healthy(self):
+        return not self.xtouch_handler.failed
+
+
+class LogWindow:
+    """Shows the records of the log buffer, the textbox keeps the last max_lines lines."""
+    max_lines = 2000
+    color_map = {
+        'DEBUG': 'purple',
+        'INFO': 'white',
+        'WARNING': 'yellow',
+        'ERROR': 'red',
+        'CRITICAL': 'dark_red'
+    }
+
+    def __init__(self, root, log_buffer: RingBufferHandler = log_buffer):
         self.logger = logging.getLogger(__class__.__name__)
         self.logger.info("Initializing...")
         self.root = root
@@ -336,6 +502,8 @@ class LogWindow(metaclass=ExceptionLoggingMeta):
         self.text_area.bind("<Key>", lambda e: "break")  # Prevent user from typing
         self.text_area.pack(padx=10, pady=10, expand=True, fill="both")
         self.text_area.bind("<MouseWheel>", self.disable_autoscroll)
+        for level, color in self.color_map.items():
+            self.text_area.tag_config(level, foreground=color)
 
         self.log_level_var = ctk.StringVar(value='INFO')
         self.log_level_menu = ctk.CTkOptionMenu(root, variable=self.log_level_var, values=['DEBUG', 'INFO', 'WARNING', 'ERROR', 'CRITICAL'], command=self.change_log_level)
@@ -345,7 +513,8 @@ class LogWindow(metaclass=ExceptionLoggingMeta):
         self.auto_scroll_check = ctk.CTkCheckBox(root, text="Auto Scroll", variable=self.auto_scroll_var)
         self.auto_scroll_check.pack(padx=10, pady=10, fill="x")
 
-        self.line_count = 0
+        self.log_buffer = log_buffer
+        self.sequence = 0
         self.update_log()
         self.closed = True
 
@@ -353,46 +522,38 @@ class LogWindow(metaclass=ExceptionLoggingMeta):
         self.auto_scroll_var.set(False)
 
     def change_log_level(self, level):
+        # The handlers pass everything, the root logger decides
         logging.getLogger().setLevel(level)
-        coloredlogs.set_level(level)
 
     def update_log(self):
         try:
-            with open('logfile.log', 'r') as f:
-                f.seek(self.line_count)
-                lines = f.readlines()
-                for line in lines:
-                    self.apply_coloredlogs(line)
-                self.line_count = f.tell()
-                if self.auto_scroll_var.get():
-                    self.text_area.yview(ctk.END)
-        except FileNotFoundError:
-            print("Log file not found.")
+            self.show_new_records()
         except Exception as e:
-            print(f"Error reading log file: {e}")
-        self.root.after(500, self.update_log)
-
-    def apply_coloredlogs(self, line):
-        color_map = {
-            'DEBUG': 'purple',
-            'INFO': 'white',
-            'WARNING': 'yellow',
-            'ERROR': 'red',
-            'CRITICAL': 'dark_red'
-        }
-
-        # Extract the log level from the line
-        split_line = line.split(']')
-        if len(split_line) < 3:
-            return
-        level = split_line[1].strip('[').strip()
-
-        # Insert the line into the text area
-        self.text_area.insert(ctk.END, line , level)
-
-        # Configure the tag for the log level
-        self.text_area.tag_config(level, foreground=color_map.get(level, 'white'))
-        #print(f"Inserted line with level {level} and color {color_map.get(level, 'black')}")  # Debug print
+            # Tk would print it to the missing console, log it and keep refreshing
+            self.logger.error(f"Error updating the log window: {e}", exc_info=True)
+        finally:
+            self.root.after(500, self.update_log)
+
+    def show_new_records(self):
+        self.sequence, records, dropped = self.log_buffer.since(self.sequence)
+        # Consecutive lines of one level go in with one insert
+        runs = []
+        if dropped:
+            runs.append(("WARNING", [f"... {dropped} messages not shown\n"]))
+        for record in records:
+            line = self.log_buffer.format(record) + "\n"
+            if runs and runs[-1][0] == record.levelname:
+                runs[-1][1].append(line)
+            else:
+                runs.append((record.levelname, [line]))
+        for level, lines in runs:
+            self.text_area.insert(ctk.END, "".join(lines), level)
+        if runs:
+            lines = int(self.text_area.index("end-1c").split(".")[0]) - 1
+            if lines > self.max_lines:
+                self.text_area.delete("1.0", f"{lines - self.max_lines + 1}.0")
+            if self.auto_scroll_var.get():
+                self.text_area.yview(ctk.END)
 
 class TrayIcon():
     def __init__(self, state_store: StateStore = StateStore()):
@@ -446,6 +607,7 @@ class TrayIcon():
         if self.lwh is None:
             self.logger.info("Creating log window...")
             root = ctk.CTk()
+            install_tk_exception_hook(root, self.logger)
             self.lwh = LogWindow(root)
             self.lwh.closed = False
             root.protocol("WM_DELETE_WINDOW", self.on_close_log_window)
@@ -477,16 +639,21 @@ def main():
     vmh.connect()
     fantom_handler = FantomMidiHandler()
     monitor = AudioDeviceMonitor(fantom_handler, vmh, state)
-    monitor.start_monitoring()
-    fantom_handler.check_fantom_devices()
+    supervisor = ServiceSupervisor()
+    supervisor.add(NotifierService())
+    supervisor.add(FantomService(fantom_handler, state))
+    supervisor.add(DeviceMonitorService(monitor))
+    supervisor.add(XTouchService(XTouchHandler(), vmh, state))
+    supervisor.start()
     tray_icon = TrayIcon(state_store=state)    
 
     def exit():
         logger.info("Stopping...")
-        monitor.stop_monitoring()
+        # Stops the X-Touch bridge, the monitor, the Fantom handler and the notifier in this order
+        supervisor.stop()
+        monitor.device_backend.stop()
         tray_icon.icon.stop()
         vmh.disconnect()
-        fantom_handler.stop()
         tray_icon.close_log_window()
         logger.info("Stopped.")
     
@@ -507,6 +674,8 @@ if __name__ == "__main__":
         reboot = main()
     except Exception as e:
         logging.error(f"Exception in main: {e}", exc_info=True)
+    # Write out what is still queued
+    log_listener.stop()
     if reboot:
         subprocess.Popen(
             [".\\.venv\\Scripts\\pythonw.exe", ".\\audiomanager.pyw"],
@@ -1,19 +1,35 @@
-import win32gui
-import win32api
-import win32con
-import win32process
+import importlib.util
 import logging
+import sys
+import time
+from threading import Event, Lock, Thread
+from typing import Callable
 
 logger = logging.getLogger("islocked")
 
+__all__ = ["islocked", "LockProvider", "Win32LockProvider", "StubLockProvider", "FakeLockProvider", "default_provider"]
+
+
 def islocked():
+    """
+    Check if the Windows lock screen is in the foreground. Makes several Win32 calls, do not use on a hot path.
+    """
+    import win32api
+    import win32con
+    import win32gui
+    import win32process
+
     _, pid = win32process.GetWindowThreadProcessId(win32gui.GetForegroundWindow())
 
     try:
-        handle = win32api.OpenProcess(win32con.PROCESS_ALL_ACCESS, False, pid)
-        filename = win32process.GetModuleFileNameEx(handle, 0)
+        handle = win32api.OpenProcess(win32con.PROCESS_QUERY_INFORMATION | win32con.PROCESS_VM_READ, False, pid)
+        try:
+            filename = win32process.GetModuleFileNameEx(handle, 0)
+        finally:
+            win32api.CloseHandle(handle)
     except Exception as _e:
-        logger.error("Failed to get Process Name of Foreground Window: %s", _e)
+        # Expected on the lock screen (pid 0) and with elevated windows in front, the provider polls this
+        logger.debug("Failed to get Process Name of Foreground Window: %s", _e)
         if "(5," in str(_e):
             # Access Denied
             filename = ""
@@ -24,23 +40,121 @@ def islocked():
     current_status = "LockApp" in filename
     return current_status
 
-if __name__ == "__main__":
-    import time
-    prev_app = 0
-    while True:
-        _, pid = win32process.GetWindowThreadProcessId(win32gui.GetForegroundWindow())
 
-        try:
-            handle = win32api.OpenProcess(win32con.PROCESS_ALL_ACCESS, False, pid)
-            filename = win32process.GetModuleFileNameEx(handle, 0)
-        except Exception as e:
-            filename = "LockApp.exe"
-            print("Error: ", e)
-            del e
-
-        current_status = "LockApp" in filename
-        if pid != prev_app:
-            prev_app = pid
-            print(f"Current status: {current_status} filename: {filename} pid: {pid} time: {time.asctime(time.localtime())}")
-        time.sleep(0.5)
-        
+class LockProvider:
+    """
+    Publishes whether the screen is locked. locked is a cached flag and cheap to read from any thread.
+    Listeners are called with the new state whenever it changes, from the thread that detected the change.
+    """
+
+    def __init__(self):
+        self.__locked = False
+        self.__listeners = []
+        self.__lock = Lock()
+
+    @property
+    def locked(self) -> bool:
+        return self.__locked
+
+    def add_listener(self, callback: Callable[[bool], None]):
+        with self.__lock:
+            self.__listeners.append(callback)
+
+    def remove_listener(self, callback: Callable[[bool], None]):
+        with self.__lock:
+            if callback in self.__listeners:
+                self.__listeners.remove(callback)
+
+    def _publish(self, locked: bool):
+        if locked == self.__locked:
+            return
+        self.__locked = locked
+        logger.info("Screen %s", "locked" if locked else "unlocked")
+        with self.__lock:
+            listeners = list(self.__listeners)
+        for callback in listeners:
+            try:
+                callback(locked)
+            except Exception as e:
+                logger.exception("Lock listener failed: %s", e)
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+
+class Win32LockProvider(LockProvider):
+    """Polls islocked() in a background thread."""
+
+    def __init__(self, interval: float = 0.5):
+        """
+        :param interval: Seconds between two checks.
+        """
+        super().__init__()
+        self.interval = interval
+        self.__stop = Event()
+        self.__thread = None
+
+    def start(self):
+        if self.__thread is not None:
+            return
+        self.__stop.clear()
+        self.__thread = Thread(target=self.__poll, name="Win32LockProvider", daemon=True)
+        self.__thread.start()
+
+    def stop(self):
+        self.__stop.set()
+        if self.__thread is not None:
+            self.__thread.join()
+            self.__thread = None
+
+    def __poll(self):
+        failing = False
+        while not self.__stop.is_set():
+            try:
+                self._publish(islocked())
+                if failing:
+                    logger.info("Lock check works again")
+                failing = False
+            except Exception as e:
+                # Log when the check starts failing, not on every poll
+                if not failing:
+                    logger.exception("Lock check failed: %s", e)
+                failing = True
+            self.__stop.wait(self.interval)
+
+
+class StubLockProvider(LockProvider):
+    """Never locked. Used where there is no way to detect the lock screen."""
+
+
+class FakeLockProvider(LockProvider):
+    """Locked state set by hand, for tests."""
+
+    def set_locked(self, locked: bool):
+        self._publish(locked)
+
+
+def default_provider() -> LockProvider:
+    """
+    :return: Win32LockProvider on Windows with pywin32 installed, StubLockProvider elsewhere.
+    """
+    if sys.platform == "win32":
+        if importlib.util.find_spec("win32gui") is not None:
+            return Win32LockProvider()
+        logger.warning("pywin32 not installed, lock screen detection disabled")
+    return StubLockProvider()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO)
+    provider = default_provider()
+    provider.add_listener(lambda locked: print(f"Current status: {locked} time: {time.asctime(time.localtime())}"))
+    provider.start()
+    try:
+        while True:
+            time.sleep(1)
+    except KeyboardInterrupt:
+        provider.stop()